@@ -4,10 +4,14 @@ Core module for connection management.
 Provides centralized connection factories for:
 - RDBMS (MySQL, MariaDB, PostgreSQL) via SQLAlchemy
 - In-Memory Caches (Redis, Valkey, Memcached)
+- Distributed locks with fencing tokens (Valkey/Redis)
+- Shared rate limiting and circuit breaking for upstream calls
 """
 
 from .rdbms import RDBMSConnection, get_db_engine, get_db_connection
 from .inmemory import InMemoryCache, get_cache_client
+from .distributed_lock import DistributedLock, LockMetrics, get_lock_metrics
+from .resilience import RateLimiter, CircuitBreaker, CircuitOpenError
 
 __all__ = [
     "RDBMSConnection",
@@ -15,4 +19,10 @@ __all__ = [
     "get_db_connection",
     "InMemoryCache",
     "get_cache_client",
+    "DistributedLock",
+    "LockMetrics",
+    "get_lock_metrics",
+    "RateLimiter",
+    "CircuitBreaker",
+    "CircuitOpenError",
 ]
@@ -0,0 +1,404 @@
+"""
+Distributed Lock for Valkey/Redis
+
+Safe single-instance distributed lock used to prevent cache stampedes:
+- Random token per holder, so only the holder can release or extend the lock
+- Compare-and-delete release and compare-and-extend lease via Lua scripts
+- Monotonic fencing token issued atomically with every acquisition, and a
+  fenced write that storage-side rejects holders superseded by a newer token
+- Context manager support with optional blocking and automatic lease renewal
+- Process-wide contention and hold-time histograms (get_lock_metrics)
+"""
+
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# Fencing counters outlive any lease and any value written under them, but
+# are not kept forever for keys that are never locked again
+FENCE_TTL_MS = 7 * 24 * 3600 * 1000
+
+# Acquire the lock and issue the next fencing token in one atomic step
+# KEYS: lock key, fence counter; ARGV: token, lease ms, fence counter TTL ms
+ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    local fencing_token = redis.call('INCR', KEYS[2])
+    redis.call('PEXPIRE', KEYS[2], ARGV[3])
+    return fencing_token
+end
+return 0
+"""
+
+# Published on the release channel (if any) when a holder releases, so waiters
+# blocked on the resource wake up and retry instead of waiting out the lease
+RELEASE_MESSAGE = ""
+
+# Delete the lock only if it is still held with our token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lease only if the lock is still held with our token
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+# Write a value only if no newer fencing token has been issued for the lock
+# KEYS: fence counter, target key; ARGV: fencing token, value, TTL ms (0 = none)
+FENCED_SET_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current > tonumber(ARGV[1]) then
+    return 0
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+else
+    redis.call('SET', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+class LockMetrics:
+    """Thread-safe counters and latency histograms for distributed locks."""
+    
+    # Histogram bucket upper bounds in milliseconds
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+    
+    def __init__(self):
+        """Initialize empty counters and histograms."""
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Reset all counters and histograms."""
+        with self._lock:
+            self.acquired = 0
+            self.contended = 0
+            self.failed = 0
+            self.released = 0
+            self.lost = 0
+            self.extended = 0
+            self.fenced = 0
+            self.wait_histogram = [0] * len(self.BUCKETS_MS)
+            self.hold_histogram = [0] * len(self.BUCKETS_MS)
+            self.wait_total_ms = 0.0
+            self.hold_total_ms = 0.0
+    
+    def _observe(self, histogram: list, value_ms: float) -> None:
+        """Add a value to the first bucket whose upper bound contains it."""
+        for i, upper_bound in enumerate(self.BUCKETS_MS):
+            if value_ms <= upper_bound:
+                histogram[i] += 1
+                return
+    
+    def record_acquire(self, wait_ms: float, attempts: int, acquired: bool) -> None:
+        """Record the outcome of an acquisition (wait_ms = time until success or give-up)."""
+        with self._lock:
+            if attempts > 1 or not acquired:
+                self.contended += 1
+            if acquired:
+                self.acquired += 1
+                self.wait_total_ms += wait_ms
+                self._observe(self.wait_histogram, wait_ms)
+            else:
+                self.failed += 1
+    
+    def record_release(self, hold_ms: float, still_held: bool) -> None:
+        """Record a release; still_held is False when the lease had already expired."""
+        with self._lock:
+            self.released += 1
+            if not still_held:
+                self.lost += 1
+            self.hold_total_ms += hold_ms
+            self._observe(self.hold_histogram, hold_ms)
+    
+    def record_extend(self) -> None:
+        """Record a successful lease extension."""
+        with self._lock:
+            self.extended += 1
+    
+    def record_fenced(self) -> None:
+        """Record a write rejected because a newer fencing token exists."""
+        with self._lock:
+            self.fenced += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Export current counters and histograms.
+        
+        Returns:
+            Dictionary with counters plus "wait_ms" and "hold_ms" histograms,
+            each mapping bucket upper bound ("le") to cumulative count.
+        """
+        def _cumulative(histogram):
+            buckets = {}
+            running = 0
+            for upper_bound, count in zip(self.BUCKETS_MS, histogram):
+                running += count
+                label = "+Inf" if upper_bound == float("inf") else str(upper_bound)
+                buckets[label] = running
+            return buckets
+        
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "contended": self.contended,
+                "failed": self.failed,
+                "released": self.released,
+                "lost": self.lost,
+                "extended": self.extended,
+                "fenced": self.fenced,
+                "avg_wait_ms": self.wait_total_ms / self.acquired if self.acquired else 0.0,
+                "avg_hold_ms": self.hold_total_ms / self.released if self.released else 0.0,
+                "wait_ms": _cumulative(self.wait_histogram),
+                "hold_ms": _cumulative(self.hold_histogram),
+            }
+
+
+_LOCK_METRICS = LockMetrics()
+
+
+def get_lock_metrics() -> LockMetrics:
+    """Get the process-wide lock metrics registry."""
+    return _LOCK_METRICS
+
+
+class DistributedLock:
+    """
+    Token-based distributed lock with fencing tokens.
+    
+    Usage:
+        with DistributedLock(client, "weather:us:10001", ttl_ms=10000) as lock:
+            if lock.acquired:
+                lock.fenced_set("weather:us:10001", json.dumps(data), ttl_ms=900000)
+    
+    fenced_set is the storage-side check for writes that land in Valkey; other
+    storage can compare fencing_token against the highest token it has seen.
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        key: str,
+        ttl_ms: int = 10000,
+        blocking: bool = False,
+        blocking_timeout: float = 10.0,
+        retry_interval: float = 0.05,
+        auto_renew: bool = False,
+        metrics: Optional[LockMetrics] = None,
+        fence_ttl_ms: int = FENCE_TTL_MS,
+        release_channel: Optional[str] = None
+    ):
+        """
+        Initialize a lock on a resource key (nothing is acquired yet).
+        
+        Args:
+            client: Valkey/Redis client
+            key: Resource key to protect; the lock is stored at lock:<key>
+            ttl_ms: Lease duration in milliseconds
+            blocking: Retry until acquired or blocking_timeout elapses
+            blocking_timeout: Maximum seconds to wait when blocking
+            retry_interval: Seconds between attempts when blocking
+            auto_renew: Extend the lease in the background while held
+            metrics: Metrics registry (defaults to the process-wide one)
+            fence_ttl_ms: Lifetime of the lock:<key>:fence counter, renewed on
+                          every acquisition (must exceed the TTL of fenced values)
+            release_channel: Pub/sub channel that receives RELEASE_MESSAGE on release
+        """
+        self.client = client
+        self.key = key
+        self.lock_key = f"lock:{key}"
+        self.fence_key = f"lock:{key}:fence"
+        self.ttl_ms = int(ttl_ms)
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.retry_interval = retry_interval
+        self.auto_renew = auto_renew
+        self.metrics = metrics or _LOCK_METRICS
+        self.fence_ttl_ms = int(fence_ttl_ms)
+        self.release_channel = release_channel
+        
+        self.token = secrets.token_hex(16)
+        self.fencing_token: Optional[int] = None
+        self.acquired = False
+        self._acquired_at = 0.0
+        self._renew_stop = threading.Event()
+        self._renew_thread: Optional[threading.Thread] = None
+        
+        self._acquire_script = client.register_script(ACQUIRE_SCRIPT)
+        self._release_script = client.register_script(RELEASE_SCRIPT)
+        self._extend_script = client.register_script(EXTEND_SCRIPT)
+        self._fenced_set_script = client.register_script(FENCED_SET_SCRIPT)
+    
+    def acquire(self, blocking: Optional[bool] = None) -> bool:
+        """
+        Try to acquire the lock.
+        
+        Args:
+            blocking: Override the instance blocking setting
+        
+        Returns:
+            True if acquired (fencing_token is then set), False otherwise
+        """
+        if blocking is None:
+            blocking = self.blocking
+        
+        start = time.perf_counter()
+        deadline = start + self.blocking_timeout
+        attempts = 0
+        
+        while True:
+            attempts += 1
+            fencing_token = int(self._acquire_script(
+                keys=[self.lock_key, self.fence_key],
+                args=[self.token, self.ttl_ms, self.fence_ttl_ms]
+            ))
+            
+            if fencing_token:
+                self.acquired = True
+                self.fencing_token = fencing_token
+                self._acquired_at = time.perf_counter()
+                self.metrics.record_acquire((self._acquired_at - start) * 1000, attempts, True)
+                if self.auto_renew:
+                    self._start_renewal()
+                return True
+            
+            if not blocking or time.perf_counter() + self.retry_interval > deadline:
+                self.metrics.record_acquire((time.perf_counter() - start) * 1000, attempts, False)
+                return False
+            
+            time.sleep(self.retry_interval)
+    
+    def release(self) -> bool:
+        """
+        Release the lock if this instance still holds it.
+        
+        With a release_channel, RELEASE_MESSAGE is published afterwards (also
+        when the lease had expired) so waiters retry the resource right away.
+        
+        Returns:
+            True if our lock was deleted, False if it had expired (or was never held)
+        """
+        if not self.acquired:
+            return False
+        
+        self._stop_renewal()
+        self.acquired = False
+        released = bool(self._release_script(keys=[self.lock_key], args=[self.token]))
+        self.metrics.record_release((time.perf_counter() - self._acquired_at) * 1000, released)
+        if self.release_channel:
+            self.client.publish(self.release_channel, RELEASE_MESSAGE)
+        return released
+    
+    def extend(self, ttl_ms: Optional[int] = None) -> bool:
+        """
+        Reset the lease to ttl_ms from now if this instance still holds the lock.
+        
+        Args:
+            ttl_ms: New lease duration (defaults to the original ttl_ms)
+        
+        Returns:
+            True if the lease was extended, False if the lock was lost
+        """
+        if not self.acquired:
+            return False
+        
+        extended = bool(self._extend_script(
+            keys=[self.lock_key],
+            args=[self.token, int(ttl_ms or self.ttl_ms)]
+        ))
+        if extended:
+            self.metrics.record_extend()
+        return extended
+    
+    def fenced_set(self, key: str, value: Any, ttl_ms: Optional[int] = None) -> bool:
+        """
+        Write a value unless a newer holder has acquired the lock since.
+        
+        Checked and written atomically against the fence counter, so a holder
+        that stalled past its lease cannot overwrite the newer holder's value.
+        
+        Args:
+            key: Key to write (usually the protected resource key)
+            value: Serialized value
+            ttl_ms: Time-to-live of the written key (None = no expiry)
+        
+        Returns:
+            True if written, False if rejected (or the lock was never acquired)
+        """
+        if self.fencing_token is None:
+            return False
+        
+        written = bool(self._fenced_set_script(
+            keys=[self.fence_key, key],
+            args=[self.fencing_token, value, int(ttl_ms or 0)]
+        ))
+        if not written:
+            self.metrics.record_fenced()
+        return written
+    
+    def _start_renewal(self) -> None:
+        """Extend the lease every third of its TTL until released."""
+        self._renew_stop.clear()
+        interval = max(self.ttl_ms / 3000, 0.01)
+        
+        def _renew():
+            while not self._renew_stop.wait(interval):
+                try:
+                    if not self.extend():
+                        return
+                except Exception:
+                    return
+        
+        self._renew_thread = threading.Thread(target=_renew, name=f"lock-renew:{self.key}", daemon=True)
+        self._renew_thread.start()
+    
+    def _stop_renewal(self) -> None:
+        """Stop the background renewal thread if running."""
+        if self._renew_thread:
+            self._renew_stop.set()
+            self._renew_thread.join()
+            self._renew_thread = None
+    
+    def __enter__(self):
+        """Context manager entry: attempt acquisition (check .acquired)."""
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit: release if held."""
+        self.release()
+
+
+# Example usage
+if __name__ == "__main__":
+    from inmemory import get_cache_client
+    
+    print("=" * 60)
+    print("Distributed Lock Test")
+    print("=" * 60)
+    
+    cache = get_cache_client()
+    
+    with DistributedLock(cache.client, "test:resource", ttl_ms=2000) as lock:
+        print(f"\n1. Lock acquired: {lock.acquired} (fencing token {lock.fencing_token})")
+        
+        other = DistributedLock(cache.client, "test:resource", ttl_ms=2000)
+        print(f"2. Second holder acquired: {other.acquire()}")
+        print(f"3. Second holder release (must not delete ours): {other.release()}")
+        print(f"4. Lease extended: {lock.extend(5000)}")
+    
+    print(f"5. Lock released, metrics: {get_lock_metrics().snapshot()}")
+    
+    cache.close()
+    print("\n" + "=" * 60)
@@ -0,0 +1,241 @@
+"""
+Micro-Batching Embedding Server
+
+Concurrent callers that each run the embedding model on one text waste CPU on
+batches of one and contend on the GIL. EmbeddingBatcher queues their texts and
+a single worker thread encodes them together: a batch is flushed when it
+reaches max_batch_size or when the oldest text has waited max_wait_ms.
+
+Every caller gets its own Future, resolved with its row of the batch (or with
+the exception raised by the encoder), so the batcher works from threads
+(embed / submit) and from asyncio (embed_async) alike. Once the worker has
+stopped, submit() raises and any text still queued fails with RuntimeError,
+so no caller waits on a future nobody will resolve.
+
+This module provides:
+- EmbeddingBatcher: Time/size-bounded micro-batcher around a batch encode function
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from concurrent callers and encodes them in batches.
+    
+    Usage:
+        batcher = EmbeddingBatcher(semantic_search.generate_embeddings, max_wait_ms=5)
+        batcher.start()
+        vector = batcher.embed("Show me all passengers on flight 115")
+        vector = await batcher.embed_async("Get passenger list for flight 115")
+        batcher.stop()
+    """
+    
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Sequence[np.ndarray]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "embedding-batcher"
+    ):
+        """
+        Initialize the batcher (call start() before submitting).
+        
+        Args:
+            encode_batch: Function mapping a list of texts to one vector per text
+            max_batch_size: Flush as soon as this many texts are queued
+            max_wait_ms: Flush when the oldest queued text has waited this long
+            name: Worker thread name
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be at least 1, got {max_batch_size}")
+        
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # Guards _running so nothing is queued once the worker stops taking texts
+        self._state_lock = threading.Lock()
+        self._running = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "errors": 0, "encode_time": 0.0}
+    
+    def start(self) -> "EmbeddingBatcher":
+        """Start the worker thread."""
+        with self._state_lock:
+            if self._running and self._thread and self._thread.is_alive():
+                return self
+            
+            self._stop_event.clear()
+            self._running = True
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after it has flushed the texts already queued."""
+        with self._state_lock:
+            self._running = False
+            self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def __enter__(self) -> "EmbeddingBatcher":
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+    
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for the next batch.
+        
+        Returns:
+            Future resolved with the text's embedding
+        
+        Raises:
+            RuntimeError: If the batcher is not running
+        """
+        future: Future = Future()
+        with self._state_lock:
+            if not self._running:
+                raise RuntimeError("EmbeddingBatcher is not running; call start() first")
+            self._queue.put((text, future))
+        return future
+    
+    def embed(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """Embed one text, blocking the calling thread until its batch is encoded."""
+        return self.submit(text).result(timeout)
+    
+    def embed_many(self, texts: List[str], timeout: Optional[float] = None) -> List[np.ndarray]:
+        """Queue several texts at once and wait for all of them."""
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout) for future in futures]
+    
+    async def embed_async(self, text: str) -> np.ndarray:
+        """Embed one text without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+    
+    def _collect(self) -> List[tuple]:
+        """Wait for a first text, then gather more until the batch is full or the window closes."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _loop(self) -> None:
+        """Worker: encode batches until stopped and the queue is drained."""
+        try:
+            while not (self._stop_event.is_set() and self._queue.empty()):
+                batch = self._collect()
+                if not batch:
+                    continue
+                
+                # Callers that gave up (cancelled futures) are not encoded
+                batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                
+                start = time.perf_counter()
+                try:
+                    vectors = self.encode_batch([text for text, _ in batch])
+                    if len(vectors) != len(batch):
+                        raise ValueError(f"encode_batch returned {len(vectors)} vectors for {len(batch)} texts")
+                except Exception as e:
+                    with self._stats_lock:
+                        self._stats["errors"] += 1
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+                
+                with self._stats_lock:
+                    self._stats["batches"] += 1
+                    self._stats["items"] += len(batch)
+                    self._stats["encode_time"] += time.perf_counter() - start
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+        finally:
+            # Reject new texts, then fail whatever is still queued
+            with self._state_lock:
+                self._running = False
+            self._fail_queued(RuntimeError("EmbeddingBatcher stopped before encoding this text"))
+    
+    def _fail_queued(self, error: Exception) -> None:
+        """Resolve every queued future with error."""
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Batches, items, errors, average batch size and average encode time."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        encode_time = stats.pop("encode_time")
+        stats["avg_batch_size"] = round(stats["items"] / batches, 2) if batches else 0.0
+        stats["avg_encode_ms"] = round(encode_time * 1000 / batches, 3) if batches else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    
+    print("=" * 60)
+    print("Embedding Batcher Test")
+    print("=" * 60)
+    
+    def fake_encode(texts):
+        # Fixed per-call overhead plus a small per-text cost, like a model forward pass
+        time.sleep(0.005 + 0.0005 * len(texts))
+        return [np.full(4, len(text), dtype=np.float32) for text in texts]
+    
+    with EmbeddingBatcher(fake_encode, max_batch_size=16, max_wait_ms=2) as batcher:
+        texts = [f"prompt {i}" for i in range(200)]
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            vectors = list(pool.map(batcher.embed, texts))
+        elapsed = time.perf_counter() - start
+        
+        print(f"\n1. 200 texts from 32 threads: {elapsed * 1000:.0f} ms "
+              f"(unbatched: ~{200 * 5.5:.0f} ms)")
+        print(f"   Results match: {all(v[0] == len(t) for v, t in zip(vectors, texts))}")
+        print(f"   Stats: {batcher.get_stats()}")
+        
+        async def main():
+            return await asyncio.gather(*(batcher.embed_async(text) for text in texts[:50]))
+        
+        vectors = asyncio.run(main())
+        print(f"\n2. 50 texts from asyncio tasks: {len(vectors)} vectors")
+        print(f"   Stats: {batcher.get_stats()}")
+    
+    print("\n" + "=" * 60)
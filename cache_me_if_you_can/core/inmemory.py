@@ -6,7 +6,7 @@ Supports multiple cache backends via environment variables.
 """
 
 import os
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -120,6 +120,59 @@ class InMemoryCache:
             print(f"Cache DELETE error: {e}")
             return False
     
+    def set_many(self, items: Dict[str, str], ttl: Optional[int] = None) -> List[str]:
+        """
+        Set several values in one round trip.
+        
+        Args:
+            items: Mapping of cache key to value
+            ttl: Time-to-live in seconds (optional)
+            
+        Returns:
+            Keys that could not be set (empty on success)
+        """
+        if not items:
+            return []
+        try:
+            if self.cache_type in ["redis", "valkey"]:
+                pipe = self.client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.set(key, value, ex=ttl or None)
+                replies = pipe.execute(raise_on_error=False)
+                return [key for key, reply in zip(items, replies) if reply is not True]
+            elif self.cache_type == "memcached":
+                return list(self.client.set_many(
+                    {key: value.encode() for key, value in items.items()},
+                    expire=ttl or 0,
+                    noreply=False
+                ))
+        except Exception as e:
+            print(f"Cache SET_MANY error: {e}")
+        return list(items)
+    
+    def delete_many(self, keys: Iterable[str]) -> bool:
+        """
+        Delete several keys in one round trip.
+        
+        Args:
+            keys: Cache keys to delete
+            
+        Returns:
+            True if the delete reached the cache, False otherwise
+        """
+        keys = list(keys)
+        if not keys:
+            return True
+        try:
+            if self.cache_type in ["redis", "valkey"]:
+                self.client.delete(*keys)
+            elif self.cache_type == "memcached":
+                self.client.delete_many(keys, noreply=False)
+            return True
+        except Exception as e:
+            print(f"Cache DELETE_MANY error: {e}")
+            return False
+    
     def flush_all(self) -> None:
         """Flush all keys from cache."""
         try:
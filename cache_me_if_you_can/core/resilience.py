@@ -0,0 +1,331 @@
+"""
+Upstream Protection: Shared Rate Limiter and Circuit Breaker
+
+Guards calls to slow or fragile upstream services (weather API, LLMs, ...):
+- RateLimiter: Token bucket stored in Valkey/Redis, so the QPS budget is shared
+  by every thread and process using the same name
+- CircuitBreaker: CLOSED / OPEN / HALF_OPEN state machine that stops calling an
+  upstream after repeated failures or slow calls, so callers can serve stale data
+- Counters for allowed, throttled and short-circuited calls
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+# Refill the bucket from elapsed server time, then try to take the requested tokens.
+# Returns {allowed, wait_ms} where wait_ms is the time until enough tokens exist.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local server_time = redis.call('TIME')
+local now = tonumber(server_time[1]) * 1000 + math.floor(tonumber(server_time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local allowed = 0
+local wait_ms = 0
+if tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+else
+    wait_ms = math.ceil((requested - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, wait_ms}
+"""
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the breaker is open."""
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared across processes through Valkey/Redis.
+    
+    Usage:
+        limiter = RateLimiter(cache.client, "weather-api", rate=5, capacity=10)
+        if limiter.acquire(timeout=1.0):
+            call_upstream()
+    """
+    
+    KEY_PREFIX = "ratelimit:"
+    
+    def __init__(self, client: Any, name: str, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize a named rate limiter.
+        
+        Args:
+            client: Valkey/Redis client
+            name: Budget name; limiters with the same name share one bucket
+            rate: Sustained calls per second
+            capacity: Maximum burst size (defaults to rate, minimum 1)
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        
+        self.client = client
+        self.name = name
+        self.key = f"{self.KEY_PREFIX}{name}"
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        
+        self.allowed = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+    
+    def try_acquire(self, tokens: float = 1) -> Tuple[bool, float]:
+        """
+        Take tokens from the bucket without waiting.
+        
+        Args:
+            tokens: Number of tokens to take
+        
+        Returns:
+            Tuple of (allowed, wait_seconds until enough tokens are available)
+        """
+        allowed, wait_ms = self._script(
+            keys=[self.key],
+            args=[self.rate, self.capacity, tokens]
+        )
+        return bool(int(allowed)), int(wait_ms) / 1000
+    
+    def acquire(self, tokens: float = 1, timeout: float = 0.0) -> bool:
+        """
+        Take tokens from the bucket, waiting up to timeout seconds for a refill.
+        
+        Args:
+            tokens: Number of tokens to take
+            timeout: Maximum seconds to wait (0 = fail fast)
+        
+        Returns:
+            True if the call is allowed, False if it was throttled
+        """
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            allowed, wait = self.try_acquire(tokens)
+            if allowed:
+                with self._lock:
+                    self.allowed += 1
+                return True
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                with self._lock:
+                    self.throttled += 1
+                return False
+            
+            time.sleep(wait)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get local allowed/throttled counters."""
+        with self._lock:
+            return {"allowed": self.allowed, "throttled": self.throttled}
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for upstream calls.
+    
+    After failure_threshold consecutive failures (or calls slower than
+    slow_call_threshold) the breaker opens and calls are short-circuited with
+    CircuitOpenError. After recovery_timeout one trial call is let through
+    (HALF_OPEN); success closes the breaker, failure re-opens it.
+    """
+    
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+    
+    def __init__(
+        self,
+        name: str = "upstream",
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        slow_call_threshold: Optional[float] = None,
+        expected_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+        verbose: bool = False
+    ):
+        """
+        Initialize a circuit breaker.
+        
+        Args:
+            name: Name used in log messages
+            failure_threshold: Consecutive failures before opening
+            recovery_timeout: Seconds to stay open before a trial call
+            slow_call_threshold: Calls slower than this (seconds) count as failures
+            expected_exceptions: Exception types that count as failures
+            verbose: Print state transitions
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.expected_exceptions = expected_exceptions
+        self.verbose = verbose
+        
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+    
+    def _transition(self, state: str) -> None:
+        """Change state (caller holds the lock)."""
+        if state == self.state:
+            return
+        if self.verbose:
+            print(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        if state == self.OPEN:
+            self.opened += 1
+            self.opened_at = time.monotonic()
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go through, counting it as short-circuited if not.
+        
+        Returns:
+            True if the call may proceed (report the outcome with
+            record_success/record_failure), False if it must be skipped
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self._transition(self.HALF_OPEN)
+            
+            if self.state == self.CLOSED:
+                return True
+            
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            
+            self.short_circuited += 1
+            return False
+    
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            self.successes += 1
+            self.failure_count = 0
+            self._trial_in_flight = False
+            self._transition(self.CLOSED)
+    
+    def record_failure(self) -> None:
+        """Record a failed (or too slow) call."""
+        with self._lock:
+            self.failures += 1
+            self.failure_count += 1
+            
+            if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self._trial_in_flight = False
+                self._transition(self.OPEN)
+    
+    def cancel(self) -> None:
+        """Give back a permission from allow_request without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute func after allow_request() returned True, recording the outcome.
+        
+        Returns:
+            Result of func
+        """
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except self.expected_exceptions:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Not an upstream failure, but a HALF_OPEN trial slot must be freed
+            self.cancel()
+            raise
+        
+        if self.slow_call_threshold is not None and time.perf_counter() - start > self.slow_call_threshold:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+    
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute func with circuit breaker protection.
+        
+        Returns:
+            Result of func
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is OPEN")
+        return self.run(func, *args, **kwargs)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get state and counters."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "successes": self.successes,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "opened": self.opened,
+            }
+
+
+# Example usage
+if __name__ == "__main__":
+    from inmemory import get_cache_client
+    
+    print("=" * 60)
+    print("Rate Limiter and Circuit Breaker Test")
+    print("=" * 60)
+    
+    cache = get_cache_client()
+    cache.delete("ratelimit:demo")
+    
+    limiter = RateLimiter(cache.client, "demo", rate=5, capacity=5)
+    results = [limiter.acquire() for _ in range(10)]
+    print(f"\n1. 10 fail-fast calls at 5/s (burst 5): {results.count(True)} allowed")
+    print(f"2. Waiting for refill: {limiter.acquire(timeout=1.0)}")
+    print(f"   Stats: {limiter.get_stats()}")
+    
+    breaker = CircuitBreaker("demo", failure_threshold=3, recovery_timeout=1.0, verbose=True)
+    
+    def flaky():
+        raise ConnectionError("upstream down")
+    
+    print("\n3. Failing calls:")
+    for _ in range(5):
+        try:
+            breaker.call(flaky)
+        except CircuitOpenError as e:
+            print(f"   Short-circuited: {e}")
+        except ConnectionError as e:
+            print(f"   Failed: {e}")
+    
+    time.sleep(1.1)
+    print(f"\n4. Trial call after recovery timeout: {breaker.call(lambda: 'ok')}")
+    print(f"   Stats: {breaker.get_stats()}")
+    
+    cache.close()
+    print("\n" + "=" * 60)
@@ -1,10 +1,18 @@
 """
 Semantic Search Core Module
 Provides embedding-based similarity search with optional MMR reranking
+
+sentence_transformers is imported and the model loaded on the first embedding,
+so constructing SemanticSearch (and creating the index, whose dimension comes
+from configuration) costs milliseconds instead of seconds.
 """
 
 import os
+import time
+import asyncio
 import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 import numpy as np
 from dotenv import load_dotenv
@@ -18,8 +26,12 @@ try:
 except ImportError:
     import redis as valkey
 
-# Import embedding model
-from sentence_transformers import SentenceTransformer
+try:
+    from core.embedding_index import EmbeddingIndex
+    from core.embedding_batcher import EmbeddingBatcher
+except ModuleNotFoundError:
+    from embedding_index import EmbeddingIndex
+    from embedding_batcher import EmbeddingBatcher
 
 
 class SemanticSearch:
@@ -27,19 +39,58 @@ class SemanticSearch:
     Core semantic search functionality using embeddings and vector similarity.
     
     Supports:
-    - Embedding generation using SentenceTransformers
-    - Vector similarity search (with Valkey/Redis vector search or brute force fallback)
+    - Embedding generation using SentenceTransformers, batched and cached by
+      content (local LRU + emb:<sha1> keys holding the raw float32 bytes)
+    - Vector similarity search (with Valkey/Redis vector search or an in-process
+      EmbeddingIndex fallback), with FLOAT32 or FLOAT16 vector storage and an
+      optional int8-quantized in-process index
+    - Hybrid queries: TAG/NUMERIC pre-filters applied before the KNN ranking
     - MMR (Maximal Marginal Relevance) reranking for diversity
     - Cosine similarity calculations
     """
     
+    # Hash fields returned by FT.SEARCH with each result (besides the score)
+    RETURN_FIELDS = ["prompt", "query_key"]
+    
+    # Content-addressed embedding cache: emb:<sha1(model:text)> -> float32 bytes
+    EMBEDDING_KEY_PREFIX = "emb:"
+    
+    # Output dimension of common models, so the index can be created without
+    # loading the model (others: pass vector_dim or set EMBEDDING_DIM)
+    KNOWN_DIMENSIONS = {
+        "all-MiniLM-L6-v2": 384,
+        "all-MiniLM-L12-v2": 384,
+        "paraphrase-MiniLM-L6-v2": 384,
+        "multi-qa-MiniLM-L6-cos-v1": 384,
+        "all-mpnet-base-v2": 768,
+        "BAAI/bge-small-en-v1.5": 384,
+        "BAAI/bge-base-en-v1.5": 768,
+    }
+    
+    # Storage type of indexed embeddings (FT.CREATE ... TYPE <type>) -> NumPy dtype
+    VECTOR_TYPES = {
+        "FLOAT32": np.float32,
+        "FLOAT16": np.float16,
+    }
+    
+    # Vector index algorithms: HNSW (approximate, default) or FLAT (exact scan)
+    VECTOR_ALGORITHMS = ("HNSW", "FLAT")
+    
+    # Characters escaped with a backslash inside TAG filter values
+    TAG_ESCAPE_CHARS = set(",.<>{}[]\"':;!@#$%^&*()-+=~|/\\ ")
+    
     def __init__(
         self,
         valkey_client: Optional[valkey.Valkey] = None,
         embedding_model: str = None,
         use_mmr: bool = False,
         mmr_lambda: float = 0.5,
-        verbose: bool = False
+        verbose: bool = False,
+        embedding_cache_size: int = None,
+        embedding_cache_ttl: int = None,
+        vector_dim: int = None,
+        vector_type: str = None,
+        local_index_precision: str = None
     ):
         """
         Initialize semantic search.
@@ -50,12 +101,52 @@ class SemanticSearch:
             use_mmr: Whether to use MMR reranking for diversity
             mmr_lambda: MMR lambda parameter (0=diversity, 1=relevance)
             verbose: Enable verbose output
+            embedding_cache_size: Embeddings kept in the local LRU (0 disables it)
+            embedding_cache_ttl: Seconds emb:<sha1> keys live in Valkey
+                                (0 disables the Valkey embedding cache)
+            vector_dim: Embedding dimension (defaults to EMBEDDING_DIM, then
+                       KNOWN_DIMENSIONS, then loading the model)
+            vector_type: Storage type of indexed embeddings, "FLOAT32" or
+                        "FLOAT16" (defaults to VECTOR_TYPE, then FLOAT32)
+            local_index_precision: Precision of the in-process fallback index,
+                                  "float32" or "int8" (defaults to
+                                  LOCAL_INDEX_PRECISION, then float32)
         """
         self.verbose = verbose
         
         # Use environment variables with fallbacks
         if embedding_model is None:
             embedding_model = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        if embedding_cache_size is None:
+            embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+        if embedding_cache_ttl is None:
+            embedding_cache_ttl = int(os.getenv("EMBEDDING_CACHE_TTL", "604800"))
+        if vector_dim is None and os.getenv("EMBEDDING_DIM"):
+            vector_dim = int(os.getenv("EMBEDDING_DIM"))
+        if vector_dim is None:
+            vector_dim = self.KNOWN_DIMENSIONS.get(embedding_model)
+        if vector_type is None:
+            vector_type = os.getenv("VECTOR_TYPE", "FLOAT32")
+        if local_index_precision is None:
+            local_index_precision = os.getenv("LOCAL_INDEX_PRECISION", "float32")
+        
+        vector_type = vector_type.upper()
+        if vector_type not in self.VECTOR_TYPES:
+            raise ValueError(f"vector_type must be one of {list(self.VECTOR_TYPES)}, got {vector_type!r}")
+        if local_index_precision not in EmbeddingIndex.PRECISIONS:
+            raise ValueError(
+                f"local_index_precision must be one of {EmbeddingIndex.PRECISIONS}, got {local_index_precision!r}"
+            )
+        
+        self.embedding_model_name = embedding_model
+        self.vector_type = vector_type
+        self.local_index_precision = local_index_precision
+        self.embedding_cache_size = embedding_cache_size
+        self.embedding_cache_ttl = embedding_cache_ttl
+        self._embedding_lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._embedding_lru_lock = threading.Lock()
+        self.embedding_stats = {"local_hits": 0, "valkey_hits": 0, "encoded": 0}
+        self._batcher: Optional[EmbeddingBatcher] = None
         
         # Connect to Valkey if not provided
         if valkey_client is None:
@@ -86,20 +177,19 @@ class SemanticSearch:
         else:
             self.valkey_client = valkey_client
         
-        # Initialize embedding model
-        if verbose:
-            print(f"\n{'='*70}")
-            print(f"Embedding Model")
-            print(f"{'='*70}")
-        print(f"Loading embedding model: {embedding_model}...")
-        self.embedding_model = SentenceTransformer(embedding_model)
-        self.vector_dim = self.embedding_model.get_sentence_embedding_dimension()
-        print(f"✅ Embedding model loaded. Vector dimension: {self.vector_dim}")
+        # Embedding model is loaded on first use (see embedding_model)
+        self._embedding_model = None
+        self._vector_dim = vector_dim
+        self._model_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
         
         # MMR configuration
         self.use_mmr = use_mmr
         self.mmr_lambda = mmr_lambda
         
+        # In-process indexes (key prefix -> EmbeddingIndex) for the fallback search
+        self._local_indexes: Dict[str, EmbeddingIndex] = {}
+        
         if verbose:
             print(f"\n{'='*70}")
             print(f"Configuration")
@@ -107,15 +197,232 @@ class SemanticSearch:
             print(f"Use MMR reranking: {use_mmr}")
             if use_mmr:
                 print(f"MMR lambda (relevance/diversity): {mmr_lambda}")
+            print(f"Vector storage type: {vector_type}")
+            print(f"Local index precision: {local_index_precision}")
+    
+    @property
+    def embedding_model(self):
+        """Lazy-load the SentenceTransformer model (thread-safe, loaded once)"""
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    if self.verbose:
+                        print(f"\n{'='*70}")
+                        print(f"Embedding Model")
+                        print(f"{'='*70}")
+                    print(f"Loading embedding model: {self.embedding_model_name}...")
+                    start = time.perf_counter()
+                    
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(self.embedding_model_name)
+                    
+                    dim = model.get_sentence_embedding_dimension()
+                    if self._vector_dim is not None and self._vector_dim != dim:
+                        raise ValueError(
+                            f"Embedding model {self.embedding_model_name} produces {dim}-dimensional "
+                            f"vectors, but {self._vector_dim} was configured"
+                        )
+                    self._vector_dim = dim
+                    self._embedding_model = model
+                    print(
+                        f"✅ Embedding model loaded in {time.perf_counter() - start:.2f}s. "
+                        f"Vector dimension: {dim}"
+                    )
+        return self._embedding_model
+    
+    @property
+    def vector_dim(self) -> int:
+        """Embedding dimension (from configuration, or from the model when unknown)"""
+        if self._vector_dim is None:
+            return self.embedding_model.get_sentence_embedding_dimension()
+        return self._vector_dim
+    
+    @property
+    def model_loaded(self) -> bool:
+        """Whether the embedding model has been loaded"""
+        return self._embedding_model is not None
+    
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load the model and run one encode so the first real lookup is fast.
+        
+        Args:
+            background: Load in a daemon thread and return it instead of blocking
+            
+        Returns:
+            The warm-up thread when background is set
+        """
+        def _warm():
+            try:
+                self.embedding_model.encode("warm up", convert_to_numpy=True)
+            except Exception as e:
+                print(f"⚠️  Embedding model warm-up failed: {e}")
+        
+        if not background:
+            _warm()
+            return None
+        
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=_warm, name="embedding-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
     
     @staticmethod
     def hash_text(text: str) -> str:
         """Generate SHA1 hash of text"""
         return hashlib.sha1(text.encode('utf-8')).hexdigest()
     
+    def embedding_key(self, text: str) -> str:
+        """Valkey key of the cached embedding of text (scoped to the model)"""
+        return f"{self.EMBEDDING_KEY_PREFIX}{self.hash_text(f'{self.embedding_model_name}:{text}')}"
+    
+    def _remember_embedding(self, text: str, embedding: np.ndarray) -> None:
+        """Put an embedding in the local LRU, evicting the least recently used"""
+        if self.embedding_cache_size <= 0:
+            return
+        with self._embedding_lru_lock:
+            self._embedding_lru[text] = embedding
+            self._embedding_lru.move_to_end(text)
+            while len(self._embedding_lru) > self.embedding_cache_size:
+                self._embedding_lru.popitem(last=False)
+    
     def generate_embedding(self, text: str) -> np.ndarray:
-        """Generate embedding vector for text"""
-        return self.embedding_model.encode(text, convert_to_numpy=True)
+        """
+        Generate embedding vector for text (served from cache when possible).
+        
+        With batching enabled (start_batching), texts missing from the local
+        LRU are queued and encoded together with those of concurrent callers.
+        """
+        if self._batcher is not None:
+            with self._embedding_lru_lock:
+                cached = self._embedding_lru.get(text)
+                if cached is not None:
+                    self._embedding_lru.move_to_end(text)
+                    self.embedding_stats["local_hits"] += 1
+                    return cached
+            return self._batcher.embed(text)
+        return self.generate_embeddings([text])[0]
+    
+    async def generate_embedding_async(self, text: str) -> np.ndarray:
+        """Generate an embedding from asyncio code without blocking the event loop"""
+        if self._batcher is not None:
+            return await self._batcher.embed_async(text)
+        return await asyncio.get_running_loop().run_in_executor(None, self.generate_embedding, text)
+    
+    def start_batching(self, max_wait_ms: float = 5.0, max_batch_size: int = 32) -> EmbeddingBatcher:
+        """
+        Route generate_embedding() through a micro-batcher.
+        
+        Args:
+            max_wait_ms: Longest time a text waits for others to join its batch
+            max_batch_size: Batch size that triggers an immediate flush
+            
+        Returns:
+            The running EmbeddingBatcher (see get_stats())
+        """
+        self.stop_batching()
+        self._batcher = EmbeddingBatcher(
+            lambda texts: self.generate_embeddings(texts, batch_size=max_batch_size),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        ).start()
+        return self._batcher
+    
+    def stop_batching(self) -> None:
+        """Flush pending texts and go back to encoding on the caller's thread"""
+        if self._batcher is not None:
+            batcher, self._batcher = self._batcher, None
+            batcher.stop()
+    
+    def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Generate embeddings for several texts with one batched model call.
+        
+        Each text is looked up in the local LRU, then in Valkey (one MGET for
+        all misses); only texts missing from both are encoded, in batches of
+        batch_size, and the new vectors are written back in one pipeline.
+        
+        Args:
+            texts: Texts to embed (duplicates are encoded once)
+            batch_size: SentenceTransformer batch size
+            
+        Returns:
+            float32 array with one row per text
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        
+        with self._embedding_lru_lock:
+            for position, text in enumerate(texts):
+                cached = self._embedding_lru.get(text)
+                if cached is not None:
+                    self._embedding_lru.move_to_end(text)
+                    results[position] = cached
+                    self.embedding_stats["local_hits"] += 1
+                else:
+                    missing.setdefault(text, []).append(position)
+        
+        def resolve(text: str, embedding: np.ndarray) -> None:
+            for position in missing.pop(text):
+                results[position] = embedding
+            self._remember_embedding(text, embedding)
+        
+        use_valkey = self.embedding_cache_ttl > 0
+        if missing and use_valkey:
+            pending = list(missing)
+            try:
+                stored = self.valkey_client.mget([self.embedding_key(text) for text in pending])
+                for text, embedding_bytes in zip(pending, stored):
+                    if embedding_bytes:
+                        resolve(text, np.frombuffer(embedding_bytes, dtype=np.float32))
+                        self.embedding_stats["valkey_hits"] += 1
+            except Exception as e:
+                if self.verbose:
+                    print(f"   ⚠️  Embedding cache read failed: {e}")
+        
+        if missing:
+            pending = list(missing)
+            encoded = self.embedding_model.encode(
+                pending,
+                batch_size=batch_size,
+                convert_to_numpy=True
+            ).astype(np.float32)
+            self.embedding_stats["encoded"] += len(pending)
+            
+            if use_valkey:
+                try:
+                    pipe = self.valkey_client.pipeline(transaction=False)
+                    for text, embedding in zip(pending, encoded):
+                        pipe.set(self.embedding_key(text), embedding.tobytes(), ex=self.embedding_cache_ttl)
+                    pipe.execute()
+                except Exception as e:
+                    if self.verbose:
+                        print(f"   ⚠️  Embedding cache write failed: {e}")
+            
+            for text, embedding in zip(pending, encoded):
+                resolve(text, embedding)
+        
+        if not results:
+            return np.empty((0, self.vector_dim), dtype=np.float32)
+        return np.vstack(results)
+    
+    def clear_embedding_cache(self) -> None:
+        """Forget locally cached embeddings (emb:* keys are left to their TTL)"""
+        with self._embedding_lru_lock:
+            self._embedding_lru.clear()
+    
+    @property
+    def vector_dtype(self) -> type:
+        """NumPy dtype of stored (and query) vector bytes."""
+        return self.VECTOR_TYPES[self.vector_type]
+    
+    def vector_bytes(self, embedding: np.ndarray) -> bytes:
+        """Encode an embedding for an embedding hash or a KNN query ($vec)."""
+        return np.asarray(embedding).astype(self.vector_dtype).tobytes()
+    
+    def vector_from_bytes(self, data: bytes) -> np.ndarray:
+        """Decode stored embedding bytes to a float32 vector."""
+        return np.frombuffer(data, dtype=self.vector_dtype).astype(np.float32)
     
     @staticmethod
     def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
@@ -150,55 +457,138 @@ class SemanticSearch:
         if not candidates or len(candidates) <= 1:
             return candidates[:top_k]
         
-        # Extract embeddings from candidates
-        candidate_embeddings = []
-        for candidate in candidates:
-            # If embedding is stored as bytes, convert it
-            if 'embedding' in candidate:
-                emb = candidate['embedding']
-                if isinstance(emb, bytes):
-                    emb = np.frombuffer(emb, dtype=np.float32)
-                candidate_embeddings.append(emb)
-            else:
-                # If no embedding stored, we can't do MMR, return original
-                return candidates[:top_k]
+        # If any candidate has no embedding we can't do MMR, return original
+        if any('embedding' not in candidate for candidate in candidates):
+            return candidates[:top_k]
         
-        selected_indices = []
-        remaining_indices = list(range(len(candidates)))
+        # Embeddings may be stored as bytes
+        embeddings = np.vstack([
+            self.vector_from_bytes(c['embedding']) if isinstance(c['embedding'], bytes) else c['embedding']
+            for c in candidates
+        ])
+        relevance = np.array([c['similarity'] for c in candidates], dtype=np.float32)
         
-        # Select first item with highest similarity to query
-        first_idx = max(remaining_indices, key=lambda i: candidates[i]['similarity'])
-        selected_indices.append(first_idx)
-        remaining_indices.remove(first_idx)
+        selected_indices = self.mmr_select(relevance, embeddings, lambda_param, top_k)
+        
+        # Return reranked results
+        return [candidates[i] for i in selected_indices]
+    
+    @staticmethod
+    def mmr_select(
+        relevance: np.ndarray,
+        embeddings: np.ndarray,
+        lambda_param: float,
+        top_k: int
+    ) -> List[int]:
+        """
+        Vectorized MMR selection.
         
-        # Iteratively select remaining items
-        while len(selected_indices) < min(top_k, len(candidates)) and remaining_indices:
-            mmr_scores = []
+        Candidates are normalized once and their pairwise similarities computed
+        in one matrix product. A running "max similarity to the selected set"
+        vector is updated with each pick, so every step is O(n) NumPy work
+        instead of O(n * selected) Python-level cosine calls.
+        
+        Args:
+            relevance: Similarity of each candidate to the query
+            embeddings: Candidate embeddings, one row per candidate
+            lambda_param: Trade-off between relevance (1.0) and diversity (0.0)
+            top_k: Number of candidates to select
             
-            for idx in remaining_indices:
-                # Relevance: similarity to query
-                relevance = candidates[idx]['similarity']
-                
-                # Diversity: max similarity to already selected items (we want to minimize this)
-                max_sim_to_selected = max(
-                    self.cosine_similarity(
-                        candidate_embeddings[idx],
-                        candidate_embeddings[selected_idx]
-                    )
-                    for selected_idx in selected_indices
-                )
-                
-                # MMR score: balance relevance and diversity
-                mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected
-                mmr_scores.append((idx, mmr_score))
+        Returns:
+            Selected candidate indices in selection order
+        """
+        n = len(relevance)
+        top_k = min(top_k, n)
+        if top_k <= 0:
+            return []
+        
+        normalized = EmbeddingIndex.normalize(embeddings)
+        pairwise = normalized @ normalized.T
+        
+        # Select first item with highest similarity to query
+        first = int(np.argmax(relevance))
+        selected = [first]
+        max_sim_to_selected = pairwise[first].copy()
+        available = np.ones(n, dtype=bool)
+        available[first] = False
+        
+        relevance_term = lambda_param * np.asarray(relevance, dtype=np.float32)
+        while len(selected) < top_k:
+            mmr_scores = relevance_term - (1 - lambda_param) * max_sim_to_selected
+            mmr_scores[~available] = -np.inf
+            best = int(np.argmax(mmr_scores))
+            selected.append(best)
+            available[best] = False
+            np.maximum(max_sim_to_selected, pairwise[best], out=max_sim_to_selected)
+        
+        return selected
+    
+    @classmethod
+    def escape_tag(cls, value: Any) -> str:
+        """Escape a TAG filter value (e.g., "codellama:7b" -> "codellama\\:7b")."""
+        return "".join(f"\\{char}" if char in cls.TAG_ESCAPE_CHARS else char for char in str(value))
+    
+    @classmethod
+    def build_filter(cls, filters: Optional[Dict[str, Any]]) -> str:
+        """
+        Build the pre-filter part of a hybrid KNN query.
+        
+        Conditions per field:
+        - str: TAG match, e.g. {"model": "codellama"} -> @model:{codellama}
+        - list/set/tuple of str: TAG match on any value
+        - (min, max) with numbers or None: NUMERIC range, None for an open end
+        - int/float: NUMERIC equality
+        
+        Args:
+            filters: Mapping of indexed field name to condition
             
-            # Select item with highest MMR score
-            best_idx = max(mmr_scores, key=lambda x: x[1])[0]
-            selected_indices.append(best_idx)
-            remaining_indices.remove(best_idx)
+        Returns:
+            "*" (no filter) or a parenthesized filter expression
+        """
+        if not filters:
+            return "*"
         
-        # Return reranked results
-        return [candidates[i] for i in selected_indices]
+        clauses = []
+        for field, condition in filters.items():
+            if isinstance(condition, tuple) and len(condition) == 2 and not any(
+                isinstance(bound, str) for bound in condition
+            ):
+                low, high = condition
+                clauses.append(f"@{field}:[{'-inf' if low is None else low} {'+inf' if high is None else high}]")
+            elif isinstance(condition, (int, float)) and not isinstance(condition, bool):
+                clauses.append(f"@{field}:[{condition} {condition}]")
+            elif isinstance(condition, (list, set, tuple)):
+                clauses.append(f"@{field}:{{{' | '.join(cls.escape_tag(value) for value in condition)}}}")
+            else:
+                clauses.append(f"@{field}:{{{cls.escape_tag(condition)}}}")
+        return f"({' '.join(clauses)})"
+    
+    @staticmethod
+    def matches_filters(fields: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+        """Evaluate build_filter() conditions against stored hash fields (brute-force fallback)."""
+        for field, condition in (filters or {}).items():
+            value = fields.get(field)
+            if value is None:
+                return False
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            
+            if isinstance(condition, tuple) and len(condition) == 2 and not any(
+                isinstance(bound, str) for bound in condition
+            ):
+                low, high = condition
+                number = float(value)
+                if (low is not None and number < low) or (high is not None and number > high):
+                    return False
+            elif isinstance(condition, (int, float)) and not isinstance(condition, bool):
+                if float(value) != condition:
+                    return False
+            elif isinstance(condition, (list, set, tuple)):
+                if str(value) not in {str(option) for option in condition}:
+                    return False
+            elif str(value) != str(condition):
+                return False
+        return True
     
     def search_similar(
         self,
@@ -206,11 +596,19 @@ class SemanticSearch:
         index_name: str,
         key_prefix: str,
         k: int = 5,
-        return_embeddings: bool = None
+        return_embeddings: bool = None,
+        return_fields: List[str] = None,
+        filters: Dict[str, Any] = None
     ) -> List[Dict]:
         """
         Search for similar items using vector search or fallback to brute force.
         
+        The similarity comes from the KNN score returned by FT.SEARCH and the
+        requested fields from its RETURN clause, so a lookup is a single round
+        trip. Embeddings are only fetched (in one pipeline) when they are needed.
+        With filters the KNN only ranks vectors whose TAG/NUMERIC fields match
+        (a hybrid query), so entries of other models or tenants never compete.
+        
         Args:
             embedding: Query embedding vector
             index_name: Name of the vector search index
@@ -218,16 +616,21 @@ class SemanticSearch:
             k: Number of results to return
             return_embeddings: Whether to include embeddings in results. 
                               If None, returns embeddings only if MMR is enabled.
+            return_fields: Hash fields to return with each result.
+                          If None, uses self.RETURN_FIELDS.
+            filters: Pre-filter conditions on indexed fields (see build_filter)
             
         Returns:
             List of similar items with similarity scores
         """
         if return_embeddings is None:
             return_embeddings = self.use_mmr
+        if return_fields is None:
+            return_fields = self.RETURN_FIELDS
         
         try:
-            # Convert embedding to bytes
-            embedding_bytes = embedding.astype(np.float32).tobytes()
+            # The query vector must use the index's storage type
+            embedding_bytes = self.vector_bytes(embedding)
             
             # Perform vector search - fetch more results if using MMR
             search_k = k * 3 if self.use_mmr else k
@@ -236,8 +639,9 @@ class SemanticSearch:
             from valkey.commands.search.query import Query
             
             query_obj = (
-                Query(f"*=>[KNN {search_k} @embedding $vec AS score]")
-                .return_fields("*")  # Return all fields
+                Query(f"{self.build_filter(filters)}=>[KNN {search_k} @embedding $vec AS score]")
+                .return_fields("score", *return_fields)
+                .paging(0, search_k)
                 .dialect(2)
             )
             
@@ -250,60 +654,23 @@ class SemanticSearch:
             if self.verbose:
                 print(f"   Vector search executed: {results.total if hasattr(results, 'total') else 'unknown'} results")
             
-            # Parse results from the Query API
-            # Following the pattern from valkey_bundle_demo.py:
-            # 1. Get document IDs from search results
-            # 2. Fetch embeddings for each document
-            # 3. Calculate cosine similarity manually
+            # With DISTANCE_METRIC COSINE the KNN score is the cosine distance,
+            # so similarity = 1 - score; no need to refetch and recompute
             similar_items = []
-            if results and hasattr(results, 'docs'):
-                candidate_ids = [doc.id if hasattr(doc, 'id') else str(doc) for doc in results.docs]
+            for doc in getattr(results, 'docs', []):
+                item = {field: getattr(doc, field, None) for field in return_fields}
+                item['id'] = doc.id
+                item['similarity'] = 1.0 - float(doc.score)
                 
                 if self.verbose:
-                    print(f"   Found {len(candidate_ids)} candidate documents")
+                    print(f"   Doc: {doc.id[:50]}... | Similarity: {item['similarity']:.3f}")
                 
-                # Fetch embeddings and other fields for all candidates
-                for doc_id in candidate_ids:
-                    # Fetch the full hash data for this document
-                    hash_data = self.valkey_client.hgetall(doc_id)
-                    if not hash_data:
-                        if self.verbose:
-                            print(f"   ⚠️  No hash data found for {doc_id}")
-                        continue
-                    
-                    item = {}
-                    candidate_embedding = None
-                    
-                    # Parse hash fields
-                    for field_name, field_value in hash_data.items():
-                        # Decode field name if bytes
-                        if isinstance(field_name, bytes):
-                            field_name = field_name.decode('utf-8')
-                        
-                        if field_name == "embedding" and field_value:
-                            # Always get embedding to calculate similarity
-                            candidate_embedding = np.frombuffer(field_value, dtype=np.float32)
-                            if return_embeddings:
-                                item['embedding'] = candidate_embedding
-                        else:
-                            # Decode bytes to string if needed
-                            if isinstance(field_value, bytes):
-                                item[field_name] = field_value.decode('utf-8')
-                            else:
-                                item[field_name] = field_value
-                    
-                    # Calculate cosine similarity manually
-                    if candidate_embedding is not None:
-                        similarity = self.cosine_similarity(embedding, candidate_embedding)
-                        item['similarity'] = float(similarity)
-                        
-                        if self.verbose:
-                            print(f"   Doc: {doc_id[:50]}... | Similarity: {similarity:.3f}")
-                        
-                        similar_items.append(item)
-                    else:
-                        if self.verbose:
-                            print(f"   ⚠️  No embedding found for {doc_id}")
+                similar_items.append(item)
+            
+            similar_items.sort(key=lambda x: x['similarity'], reverse=True)
+            
+            if return_embeddings and similar_items:
+                self._attach_embeddings(similar_items)
             
             # Apply MMR reranking if enabled
             if self.use_mmr and similar_items:
@@ -318,72 +685,95 @@ class SemanticSearch:
             if self.verbose:
                 print(f"   ⚠️  Vector search failed, using brute-force fallback")
                 print(f"   Error: {type(e).__name__}: {str(e)}")
-            return self._brute_force_search(embedding, key_prefix, k, return_embeddings)
+            return self._brute_force_search(embedding, key_prefix, k, return_embeddings, filters)
+    
+    def _attach_embeddings(self, items: List[Dict]) -> None:
+        """Fetch the stored embedding of each item (by 'id') in one pipeline."""
+        pipe = self.valkey_client.pipeline(transaction=False)
+        for item in items:
+            pipe.hget(item['id'], "embedding")
+        
+        for item, embedding_bytes in zip(items, pipe.execute()):
+            if embedding_bytes:
+                item['embedding'] = self.vector_from_bytes(embedding_bytes)
+    
+    def local_index(self, key_prefix: str, reload: bool = False) -> EmbeddingIndex:
+        """
+        Get the in-process embedding index for a key prefix, loading it on first use.
+        
+        Args:
+            key_prefix: Prefix of the embedding hashes
+            reload: Reload from Valkey (picks up vectors written by other processes)
+            
+        Returns:
+            Loaded EmbeddingIndex
+        """
+        index = self._local_indexes.get(key_prefix)
+        if index is None:
+            index = self._local_indexes.setdefault(
+                key_prefix,
+                EmbeddingIndex(dim=self._vector_dim, precision=self.local_index_precision)
+            )
+        if reload or not index.loaded:
+            start = time.perf_counter()
+            count = index.load(self.valkey_client, key_prefix, dtype=self.vector_dtype)
+            if self.verbose:
+                print(f"   Loaded {count} embeddings for '{key_prefix}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return index
+    
+    def index_embedding(self, key_prefix: str, key: str, embedding: np.ndarray, fields: Dict = None) -> None:
+        """
+        Add a newly stored embedding to the in-process index of its prefix.
+        
+        Indexes that were never loaded are left alone; their first load
+        reads the vector from Valkey.
+        """
+        index = self._local_indexes.get(key_prefix)
+        if index is not None and index.loaded:
+            index.add(key, embedding, fields)
+    
+    def unindex_embedding(self, key_prefix: str, key: str) -> None:
+        """Remove an evicted embedding from the in-process index of its prefix (if loaded)."""
+        index = self._local_indexes.get(key_prefix)
+        if index is not None:
+            index.remove(key)
+    
+    def drop_local_index(self, key_prefix: str) -> None:
+        """Forget the in-process index of a prefix (e.g., after the keys were deleted)."""
+        self._local_indexes.pop(key_prefix, None)
     
     def _brute_force_search(
         self,
         embedding: np.ndarray,
         key_prefix: str,
         k: int = 5,
-        return_embeddings: bool = True
+        return_embeddings: bool = True,
+        filters: Dict[str, Any] = None
     ) -> List[Dict]:
         """
-        Fallback: Brute force similarity search when vector search unavailable.
+        Fallback: Exact similarity search when vector search is unavailable.
+        
+        Searches the in-process EmbeddingIndex of the prefix (one matrix-vector
+        product) instead of fetching and scoring every stored vector.
         
         Args:
             embedding: Query embedding vector
             key_prefix: Prefix for keys to search
             k: Number of results to return
             return_embeddings: Whether to include embeddings in results
+            filters: Pre-filter conditions on stored fields (see build_filter)
             
         Returns:
             List of similar items with similarity scores
         """
         try:
-            similar_items = []
-            
-            # Get all keys with the prefix
-            keys = list(self.valkey_client.scan_iter(f"{key_prefix}*", count=100))
-            
-            if not keys:
-                return []
-            
-            # Calculate similarity for each
-            for key in keys:
-                try:
-                    data = self.valkey_client.hgetall(key)
-                    if not data:
-                        continue
-                    
-                    # Parse stored data
-                    item = {}
-                    stored_embedding = None
-                    
-                    for field_name, field_value in data.items():
-                        field_name = field_name.decode('utf-8') if isinstance(field_name, bytes) else field_name
-                        
-                        if field_name == 'embedding':
-                            stored_embedding = np.frombuffer(field_value, dtype=np.float32)
-                            if return_embeddings:
-                                item['embedding'] = stored_embedding
-                        else:
-                            item[field_name] = (
-                                field_value.decode('utf-8') if isinstance(field_value, bytes) else field_value
-                            )
-                    
-                    if stored_embedding is not None:
-                        # Calculate cosine similarity
-                        similarity = self.cosine_similarity(embedding, stored_embedding)
-                        item['similarity'] = float(similarity)
-                        similar_items.append(item)
-                        
-                except Exception as e:
-                    if self.verbose:
-                        print(f"Warning: Error processing key {key}: {e}")
-                    continue
-            
-            # Sort by similarity
-            similar_items.sort(key=lambda x: x['similarity'], reverse=True)
+            search_k = k * 3 if self.use_mmr else k
+            similar_items = self.local_index(key_prefix).search(
+                embedding,
+                k=search_k,
+                return_embeddings=return_embeddings or self.use_mmr,
+                where=(lambda fields: self.matches_filters(fields, filters)) if filters else None
+            )
             
             # Apply MMR reranking if enabled
             if self.use_mmr and similar_items:
@@ -401,75 +791,188 @@ class SemanticSearch:
         index_name: str,
         key_prefix: str,
         additional_fields: List[tuple] = None,
-        verbose: bool = None
+        verbose: bool = None,
+        algorithm: str = None,
+        m: int = None,
+        ef_construction: int = None,
+        ef_runtime: int = None,
+        initial_cap: int = None,
+        recreate: bool = False
     ) -> bool:
         """
         Create a vector search index.
         
+        HNSW parameters left as None use the environment (HNSW_M,
+        HNSW_EF_CONSTRUCTION, HNSW_EF_RUNTIME, VECTOR_INITIAL_CAP) and are
+        otherwise omitted, so the search module's defaults apply.
+        
         Args:
             index_name: Name for the index
             key_prefix: Prefix for keys to index
             additional_fields: List of (field_name, field_type) tuples for additional fields
                               field_type can be "TAG", "TEXT", "NUMERIC", etc.
             verbose: Override instance verbose setting
+            algorithm: "HNSW" (approximate) or "FLAT" (exact); defaults to
+                      VECTOR_ALGORITHM, then HNSW
+            m: HNSW edges per node (higher: better recall, more memory)
+            ef_construction: HNSW candidate list size while building
+            ef_runtime: HNSW candidate list size while querying
+            initial_cap: Vectors to allocate room for up front
+            recreate: Drop and rebuild an existing index that lacks any of
+                     additional_fields (otherwise only warn)
             
         Returns:
             True if index was created or already exists, False otherwise
         """
         if verbose is None:
             verbose = self.verbose
+        if algorithm is None:
+            algorithm = os.getenv("VECTOR_ALGORITHM", "HNSW")
+        algorithm = algorithm.upper()
+        if algorithm not in self.VECTOR_ALGORITHMS:
+            raise ValueError(f"algorithm must be one of {self.VECTOR_ALGORITHMS}, got {algorithm!r}")
+        
+        tuning = {
+            "INITIAL_CAP": initial_cap if initial_cap is not None else os.getenv("VECTOR_INITIAL_CAP")
+        }
+        if algorithm == "HNSW":
+            tuning.update({
+                "M": m if m is not None else os.getenv("HNSW_M"),
+                "EF_CONSTRUCTION": ef_construction if ef_construction is not None else os.getenv("HNSW_EF_CONSTRUCTION"),
+                "EF_RUNTIME": ef_runtime if ef_runtime is not None else os.getenv("HNSW_EF_RUNTIME"),
+            })
+        tuning = {name: str(int(value)) for name, value in tuning.items() if value not in (None, "")}
         
         try:
             # Try to get index info
             info = self.valkey_client.execute_command("FT.INFO", index_name)
-            if verbose:
-                print(f"✅ Index '{index_name}' already exists")
-            return True
         except valkey.ResponseError as e:
-            # Index doesn't exist, try to create it
             error_msg = str(e).lower()
-            if "unknown index" in error_msg or "not found" in error_msg:
-                try:
-                    if verbose:
-                        print(f"Creating vector search index '{index_name}'...")
-                        print(f"   Vector dimension: {self.vector_dim}")
-                        print(f"   Distance metric: COSINE")
-                        print(f"   Algorithm: HNSW")
-                    
-                    command_args = [
-                        "FT.CREATE", index_name,
-                        "ON", "HASH",
-                        "PREFIX", "1", key_prefix,
-                        "SCHEMA"
-                    ]
-                    
-                    # Add additional fields if provided
-                    if additional_fields:
-                        for field_name, field_type in additional_fields:
-                            command_args.extend([field_name, field_type])
-                    
-                    # Add embedding vector field
-                    command_args.extend([
-                        "embedding", "VECTOR", "HNSW", "6",
-                        "TYPE", "FLOAT32",
-                        "DIM", str(self.vector_dim),
-                        "DISTANCE_METRIC", "COSINE"
-                    ])
-                    
-                    self.valkey_client.execute_command(*command_args)
-                    print(f"✅ Index '{index_name}' created successfully")
-                    return True
-                except Exception as create_error:
-                    # Vector search not available
-                    if verbose:
-                        print(f"ℹ️  Vector search not available: {create_error}")
-                        print(f"   Using brute-force similarity search")
-                    return False
-            else:
+            if "unknown index" not in error_msg and "not found" not in error_msg:
                 # Some other error
                 if verbose:
                     print(f"⚠️  Warning: Error checking index: {e}")
                 return False
+            # Index doesn't exist, try to create it
+            info = None
+        
+        if info is not None:
+            if verbose:
+                print(f"✅ Index '{index_name}' already exists")
+            
+            # Stored vectors must keep matching the existing index
+            existing_type = self._index_vector_type(info)
+            if existing_type and existing_type != self.vector_type:
+                print(f"⚠️  Index '{index_name}' stores {existing_type} vectors; "
+                      f"using {existing_type} instead of {self.vector_type} (drop the index to change it)")
+                self.vector_type = existing_type
+            
+            # Filters on fields the index lacks fail (the search module has no FT.ALTER)
+            existing_fields = self._index_attributes(info)
+            missing = [name for name, _ in additional_fields or [] if existing_fields and name not in existing_fields]
+            if not missing:
+                return True
+            if not recreate:
+                print(f"⚠️  Index '{index_name}' has no {', '.join(missing)} field(s); filters on them will fail "
+                      f"(drop the index or pass recreate=True to rebuild it)")
+                return True
+            print(f"⚠️  Index '{index_name}' has no {', '.join(missing)} field(s); recreating it")
+            self.drop_index(index_name, verbose=verbose)
+        
+        try:
+            if verbose:
+                print(f"Creating vector search index '{index_name}'...")
+                print(f"   Vector dimension: {self.vector_dim}")
+                print(f"   Vector type: {self.vector_type}")
+                print(f"   Distance metric: COSINE")
+                print(f"   Algorithm: {algorithm}")
+                for name, value in tuning.items():
+                    print(f"   {name}: {value}")
+            
+            command_args = [
+                "FT.CREATE", index_name,
+                "ON", "HASH",
+                "PREFIX", "1", key_prefix,
+                "SCHEMA"
+            ]
+            
+            # Add additional fields if provided
+            if additional_fields:
+                for field_name, field_type in additional_fields:
+                    command_args.extend([field_name, field_type])
+            
+            # Add embedding vector field
+            attributes = [
+                "TYPE", self.vector_type,
+                "DIM", str(self.vector_dim),
+                "DISTANCE_METRIC", "COSINE"
+            ]
+            for name, value in tuning.items():
+                attributes.extend([name, value])
+            vector_args = ["embedding", "VECTOR", algorithm, str(len(attributes)), *attributes]
+            
+            try:
+                self.valkey_client.execute_command(*command_args, *vector_args)
+            except valkey.ResponseError as type_error:
+                if self.vector_type == "FLOAT32":
+                    raise
+                # Not every search module supports FLOAT16; store FLOAT32 if it does
+                vector_args[5] = "FLOAT32"
+                self.valkey_client.execute_command(*command_args, *vector_args)
+                print(f"⚠️  {self.vector_type} vectors not supported ({type_error}); using FLOAT32")
+                self.vector_type = "FLOAT32"
+            
+            print(f"✅ Index '{index_name}' created successfully ({self.vector_type} vectors)")
+            return True
+        except Exception as create_error:
+            # Vector search not available
+            if verbose:
+                print(f"ℹ️  Vector search not available: {create_error}")
+                print(f"   Using brute-force similarity search")
+            return False
+    
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        """Decode bytes from a raw reply."""
+        return value.decode("utf-8", "ignore") if isinstance(value, bytes) else value
+    
+    @classmethod
+    def _reply_dict(cls, reply: Any) -> Dict[str, Any]:
+        """A flat [name, value, ...] reply (or RESP3 map) as a str-keyed dict."""
+        if isinstance(reply, dict):
+            items = reply.items()
+        elif isinstance(reply, (list, tuple)):
+            items = zip(reply[::2], reply[1::2])
+        else:
+            return {}
+        return {str(cls._decode(name)): value for name, value in items}
+    
+    @classmethod
+    def _index_attributes(cls, info: Any) -> set:
+        """Field names listed under "attributes" in an FT.INFO reply (empty if not found)."""
+        names = set()
+        for attribute in cls._reply_dict(info).get("attributes") or []:
+            attribute = cls._reply_dict(attribute)
+            name = attribute.get("identifier", attribute.get("attribute"))
+            if name is not None:
+                names.add(cls._decode(name))
+        return names
+    
+    @classmethod
+    def _index_vector_type(cls, info: Any) -> Optional[str]:
+        """Find the vector storage type (e.g., FLOAT32) anywhere in an FT.INFO reply."""
+        if isinstance(info, (list, tuple)):
+            for value in info:
+                found = cls._index_vector_type(value)
+                if found:
+                    return found
+        elif isinstance(info, dict):
+            return cls._index_vector_type(list(info.values()))
+        elif isinstance(info, (bytes, str)):
+            value = info.decode("utf-8", "ignore") if isinstance(info, bytes) else info
+            if value.upper() in cls.VECTOR_TYPES:
+                return value.upper()
+        return None
     
     def drop_index(self, index_name: str, verbose: bool = None) -> bool:
         """
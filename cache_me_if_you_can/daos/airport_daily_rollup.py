@@ -0,0 +1,372 @@
+"""
+Airport Daily Rollup
+
+Maintains airport_daily_stats, one row per (date, airport) with departures,
+arrivals, departing/arriving passengers and the number of flights carrying
+passengers, so historical leaderboard queries become a primary-key range read
+instead of aggregating raw flights and bookings. Every rolled-up day is also
+recorded in airport_daily_stats_days, so readers can tell a day without
+flights from a day that was never rolled up.
+
+The rollup job only recomputes days that changed since its last run. Changed
+days are found from watermarks kept in airport_daily_stats_state:
+
+- New flights (flight_id above the last seen maximum)
+- New bookings (booking_id above the last seen maximum), mapped to their flight's day
+- The last RESCAN_IDS flight and booking ids below the watermarks, again on
+  every run: AUTO_INCREMENT ids are handed out at insert time, so a
+  transaction that commits after a later id has been read lands below the
+  watermark. Rows committed later than RESCAN_IDS ids behind need mark_dirty()
+  or backfill()
+- Rescheduled flights (flight_log rows since the last seen log_date, a range
+  read on idx_flight_log_log_date), both the old and the new departure day
+- Days queued explicitly with mark_dirty() (e.g. after booking deletions,
+  which leave no trace the watermarks can see)
+
+Each changed day is rebuilt with DELETE + INSERT ... SELECT in one transaction,
+so readers never see a partially rolled-up day.
+
+The tables are created by scripts/migrate_airport_daily_stats.py.
+
+This module provides:
+- AirportDailyRollup: Incremental rollup job (run_once, backfill, mark_dirty)
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+from sqlalchemy import text
+
+from core import get_db_engine
+
+
+class AirportDailyRollup:
+    """Incrementally maintained airport_daily_stats rollup."""
+    
+    STATS_TABLE = "airport_daily_stats"
+    STATE_TABLE = "airport_daily_stats_state"
+    DAYS_TABLE = "airport_daily_stats_days"
+    DIRTY_TABLE = "airport_daily_stats_dirty"
+    
+    # Ids below the watermarks re-read every run to catch late commits
+    RESCAN_IDS = 1000
+    
+    # Recompute one day: flights of the day with their booking counts, then
+    # attributed to both airports through UNION ALL branches. loop_flights /
+    # loop_pax hold the from = to flights, which totals count only once
+    ROLLUP_DAY_QUERY = """
+        INSERT INTO airport_daily_stats (
+            `date`, airport_id, departures, arrivals, loop_flights,
+            departing_pax, arriving_pax, loop_pax, pax_flights, updated_at
+        )
+        WITH flight_passengers AS (
+            SELECT f.flight_id, f.from as from_id, f.to as to_id, COUNT(b.booking_id) as passengers
+            FROM flight f
+            LEFT JOIN booking b ON b.flight_id = f.flight_id
+            WHERE f.departure >= :day_start AND f.departure < :day_end
+            GROUP BY f.flight_id, f.from, f.to
+        )
+        SELECT
+            :day,
+            airport_id,
+            SUM(departures),
+            SUM(arrivals),
+            SUM(loop_flights),
+            SUM(departing_pax),
+            SUM(arriving_pax),
+            SUM(loop_pax),
+            SUM(pax_flights),
+            NOW()
+        FROM (
+            SELECT fp.from_id as airport_id, COUNT(*) as departures, 0 as arrivals, 0 as loop_flights,
+                   SUM(fp.passengers) as departing_pax, 0 as arriving_pax, 0 as loop_pax,
+                   SUM(fp.passengers > 0) as pax_flights
+            FROM flight_passengers fp
+            GROUP BY fp.from_id
+            UNION ALL
+            -- from = to flights were counted by the departure branch already
+            SELECT fp.to_id as airport_id, 0 as departures, COUNT(*) as arrivals,
+                   SUM(fp.from_id = fp.to_id) as loop_flights,
+                   0 as departing_pax, SUM(fp.passengers) as arriving_pax,
+                   SUM(CASE WHEN fp.from_id = fp.to_id THEN fp.passengers ELSE 0 END) as loop_pax,
+                   SUM(fp.passengers > 0 AND fp.from_id <> fp.to_id) as pax_flights
+            FROM flight_passengers fp
+            GROUP BY fp.to_id
+        ) per_direction
+        GROUP BY airport_id
+    """
+    
+    def __init__(self, db_engine: Optional[Any] = None, verbose: bool = False, rescan_ids: Optional[int] = None):
+        """
+        Initialize the rollup job.
+        
+        Args:
+            db_engine: SQLAlchemy engine (defaults to get_db_engine())
+            verbose: Print the days being rolled up
+            rescan_ids: Ids below the watermarks re-read every run (defaults to RESCAN_IDS)
+        """
+        self.db_engine = db_engine or get_db_engine()
+        self.verbose = verbose
+        self.rescan_ids = self.RESCAN_IDS if rescan_ids is None else rescan_ids
+        
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.last_run: Optional[Dict] = None
+    
+    def _get_state(self, conn: Any) -> Dict[str, str]:
+        """Read the watermarks."""
+        result = conn.execute(text(f"SELECT name, value FROM {self.STATE_TABLE}"))
+        return {row.name: row.value for row in result}
+    
+    def _set_state(self, conn: Any, state: Dict[str, Any]) -> None:
+        """Write the watermarks."""
+        conn.execute(
+            text(f"""
+                INSERT INTO {self.STATE_TABLE} (name, value) VALUES (:name, :value)
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """),
+            [{"name": name, "value": str(value)} for name, value in state.items()]
+        )
+    
+    @staticmethod
+    def _as_date(value: Any) -> date:
+        """Normalize a date/datetime/ISO string to a date."""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    
+    def mark_dirty(self, days: Iterable[Any]) -> None:
+        """
+        Queue days for recomputation on the next run.
+        
+        Args:
+            days: Dates, datetimes or YYYY-MM-DD strings
+        """
+        rows = [{"day": self._as_date(day)} for day in set(days)]
+        if not rows:
+            return
+        with self.db_engine.begin() as conn:
+            conn.execute(
+                text(f"INSERT IGNORE INTO {self.DIRTY_TABLE} (`date`) VALUES (:day)"),
+                rows
+            )
+    
+    def changed_days(self, conn: Any, state: Dict[str, str]) -> tuple[Set[date], Dict[str, Any]]:
+        """
+        Find days changed since the watermarks in state.
+        
+        Returns:
+            Tuple of (days, new_state)
+        """
+        # Read the new high-water marks first; anything written after this is
+        # picked up by the next run because it lands above the new marks (or,
+        # for ids allocated earlier but committed later, within rescan_ids)
+        marks = conn.execute(text("""
+            SELECT
+                (SELECT COALESCE(MAX(flight_id), 0) FROM flight) as max_flight_id,
+                (SELECT COALESCE(MAX(booking_id), 0) FROM booking) as max_booking_id,
+                (SELECT MAX(log_date) FROM flight_log) as max_log_date
+        """)).fetchone()
+        
+        last_flight_id = max(0, int(state.get("max_flight_id", 0)) - self.rescan_ids)
+        last_booking_id = max(0, int(state.get("max_booking_id", 0)) - self.rescan_ids)
+        last_log_date = state.get("max_log_date")
+        
+        days: Set[date] = set()
+        
+        result = conn.execute(
+            text("""
+                SELECT DISTINCT DATE(departure) as day FROM flight
+                WHERE flight_id > :last_id AND flight_id <= :max_id
+            """),
+            {"last_id": last_flight_id, "max_id": marks.max_flight_id}
+        )
+        days.update(row.day for row in result)
+        
+        result = conn.execute(
+            text("""
+                SELECT DISTINCT DATE(f.departure) as day
+                FROM booking b
+                JOIN flight f ON f.flight_id = b.flight_id
+                WHERE b.booking_id > :last_id AND b.booking_id <= :max_id
+            """),
+            {"last_id": last_booking_id, "max_id": marks.max_booking_id}
+        )
+        days.update(row.day for row in result)
+        
+        if marks.max_log_date is not None:
+            # >= because log_date has second precision; re-reading a second is harmless
+            result = conn.execute(
+                text("""
+                    SELECT DATE(departure_old) as old_day, DATE(departure_new) as new_day
+                    FROM flight_log
+                    WHERE log_date >= :last_log_date AND log_date <= :max_log_date
+                """),
+                {"last_log_date": last_log_date or "1970-01-01", "max_log_date": marks.max_log_date}
+            )
+            for row in result:
+                days.update((row.old_day, row.new_day))
+        
+        result = conn.execute(text(f"SELECT `date` as day FROM {self.DIRTY_TABLE}"))
+        days.update(row.day for row in result)
+        
+        new_state = {
+            "max_flight_id": marks.max_flight_id,
+            "max_booking_id": marks.max_booking_id,
+            "max_log_date": marks.max_log_date or last_log_date or "1970-01-01 00:00:00",
+        }
+        return {day for day in days if day is not None}, new_state
+    
+    def rollup_day(self, conn: Any, day: date) -> int:
+        """
+        Rebuild one day of airport_daily_stats inside the caller's transaction.
+        
+        Returns:
+            Number of airport rows written
+        """
+        day_start = datetime.combine(day, datetime.min.time())
+        conn.execute(text(f"DELETE FROM {self.STATS_TABLE} WHERE `date` = :day"), {"day": day})
+        result = conn.execute(
+            text(self.ROLLUP_DAY_QUERY),
+            {"day": day, "day_start": day_start, "day_end": day_start + timedelta(days=1)}
+        )
+        # Days without flights write no stats rows but are still covered
+        conn.execute(
+            text(f"""
+                INSERT INTO {self.DAYS_TABLE} (`date`, rolled_up_at) VALUES (:day, NOW())
+                ON DUPLICATE KEY UPDATE rolled_up_at = VALUES(rolled_up_at)
+            """),
+            {"day": day}
+        )
+        conn.execute(text(f"DELETE FROM {self.DIRTY_TABLE} WHERE `date` = :day"), {"day": day})
+        return result.rowcount
+    
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Recompute every day changed since the last run.
+        
+        The first run has no watermarks and therefore rebuilds every day.
+        
+        Returns:
+            Dictionary with days (list of ISO dates), rows and duration_ms
+        """
+        start = time.perf_counter()
+        
+        with self.db_engine.connect() as conn:
+            state = self._get_state(conn)
+            days, new_state = self.changed_days(conn, state)
+        
+        rows = 0
+        for day in sorted(days):
+            # One transaction per day keeps locks short on large backfills
+            with self.db_engine.begin() as conn:
+                rows += self.rollup_day(conn, day)
+            if self.verbose:
+                print(f"   Rolled up {day}")
+        
+        # Advance the watermarks only after every changed day is rebuilt
+        with self.db_engine.begin() as conn:
+            self._set_state(conn, new_state)
+        
+        self.last_run = {
+            "days": [day.isoformat() for day in sorted(days)],
+            "rows": rows,
+            "duration_ms": (time.perf_counter() - start) * 1000,
+        }
+        return self.last_run
+    
+    def backfill(self, start_day: Optional[Any] = None, end_day: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Queue a range of days (default: every day with flights) and run the job.
+        
+        Args:
+            start_day: First day to rebuild (defaults to the earliest departure)
+            end_day: Last day to rebuild, inclusive (defaults to the latest departure)
+        
+        Returns:
+            Result of run_once()
+        """
+        if start_day is None or end_day is None:
+            with self.db_engine.connect() as conn:
+                bounds = conn.execute(text(
+                    "SELECT DATE(MIN(departure)) as first_day, DATE(MAX(departure)) as last_day FROM flight"
+                )).fetchone()
+            if bounds.first_day is None:
+                return self.run_once()
+            start_day = start_day or bounds.first_day
+            end_day = end_day or bounds.last_day
+        
+        first, last = self._as_date(start_day), self._as_date(end_day)
+        self.mark_dirty(first + timedelta(days=offset) for offset in range((last - first).days + 1))
+        return self.run_once()
+    
+    def start(self, interval: float = 300.0) -> None:
+        """Run the job every interval seconds in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Airport rollup error: {e}")
+                self._stop_event.wait(interval)
+        
+        self._thread = threading.Thread(target=_loop, name="airport-daily-rollup", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def close(self) -> None:
+        """Stop the job and close the database connection."""
+        self.stop()
+        self.db_engine.dispose()
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Airport Daily Rollup Job")
+    parser.add_argument("--backfill", action="store_true", help="Rebuild every day with flights")
+    parser.add_argument("--start", type=str, default=None, help="First backfill day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=str, default=None, help="Last backfill day (YYYY-MM-DD)")
+    args = parser.parse_args()
+    
+    rollup = AirportDailyRollup(verbose=True)
+    
+    print("=" * 60)
+    print("Airport Daily Rollup")
+    print("=" * 60)
+    
+    if args.backfill:
+        print("\nBackfilling...")
+        result = rollup.backfill(args.start, args.end)
+    else:
+        print("\nRolling up changed days...")
+        result = rollup.run_once()
+    
+    print(f"\n   Days rebuilt: {len(result['days'])}")
+    print(f"   Rows written: {result['rows']}")
+    print(f"   Duration: {result['duration_ms']:.0f} ms")
+    
+    rollup.close()
+    print("\n" + "=" * 60)
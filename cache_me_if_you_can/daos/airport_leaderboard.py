@@ -5,6 +5,20 @@ Provides leaderboard and statistics queries for airports including:
 - Flight count for a specific airport on a given date
 - Top airports by flight count on a given date
 - Top airports by passenger count on a given date
+
+All queries filter on a half-open departure range
+(departure >= day AND departure < day + 1) instead of DATE(departure), and
+count departures and arrivals in separate UNION ALL branches instead of an
+OR join, so each branch can use the composite (departure, from, to),
+(from, departure) and (to, departure) indexes added by
+scripts/migrate_leaderboard_indexes.py. A flight with from = to appears in
+both branches; it counts as a departure and an arrival but only once in
+total_flights / total_passengers, as with the former COUNT(DISTINCT ...).
+
+Days before today are read from the airport_daily_stats rollup maintained by
+daos/airport_daily_rollup.py (a primary-key range read) once the rollup has
+recorded them in airport_daily_stats_days, even when the day had no flights.
+Today, future days and days not rolled up yet fall back to the raw queries.
 """
 
 import os
@@ -15,10 +29,11 @@ from pathlib import Path
 if __name__ == "__main__":
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from datetime import date, datetime
-from typing import List, Dict, Optional
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from core import get_db_engine
 
 # Load environment variables
@@ -28,9 +43,220 @@ load_dotenv()
 class AirportLeaderboard:
     """Airport statistics and leaderboard queries."""
     
-    def __init__(self):
-        """Initialize database connection."""
+    # Each count is an index range scan on (from, departure) / (to, departure)
+    AIRPORT_FLIGHTS_QUERY = """
+        SELECT 
+            t.airport_id,
+            t.iata,
+            t.icao,
+            t.name,
+            :flight_date as date,
+            t.departures,
+            t.arrivals,
+            t.departures + t.arrivals - t.loops as total_flights
+        FROM (
+            SELECT 
+                a.airport_id,
+                a.iata,
+                a.icao,
+                a.name,
+                (SELECT COUNT(*) FROM flight f
+                 WHERE f.from = a.airport_id
+                   AND f.departure >= :day_start AND f.departure < :day_end) as departures,
+                (SELECT COUNT(*) FROM flight f
+                 WHERE f.to = a.airport_id
+                   AND f.departure >= :day_start AND f.departure < :day_end) as arrivals,
+                (SELECT COUNT(*) FROM flight f
+                 WHERE f.from = a.airport_id AND f.to = a.airport_id
+                   AND f.departure >= :day_start AND f.departure < :day_end) as loops
+            FROM airport a
+            WHERE a.iata = :airport_iata
+        ) t
+    """
+    
+    # Both branches scan the day's slice of the (departure, from, to) index
+    TOP_FLIGHTS_QUERY = """
+        SELECT 
+            a.airport_id,
+            a.iata,
+            a.icao,
+            a.name,
+            t.departures,
+            t.arrivals,
+            t.departures + t.arrivals - t.loops as total_flights
+        FROM (
+            SELECT 
+                airport_id,
+                CAST(SUM(departures) AS SIGNED) as departures,
+                CAST(SUM(arrivals) AS SIGNED) as arrivals,
+                CAST(SUM(loops) AS SIGNED) as loops
+            FROM (
+                SELECT f.from as airport_id, COUNT(*) as departures, 0 as arrivals, 0 as loops
+                FROM flight f
+                WHERE f.departure >= :day_start AND f.departure < :day_end
+                GROUP BY f.from
+                UNION ALL
+                SELECT f.to as airport_id, 0 as departures, COUNT(*) as arrivals, SUM(f.from = f.to) as loops
+                FROM flight f
+                WHERE f.departure >= :day_start AND f.departure < :day_end
+                GROUP BY f.to
+            ) per_direction
+            GROUP BY airport_id
+        ) t
+        INNER JOIN airport a ON a.airport_id = t.airport_id
+        WHERE a.iata IS NOT NULL
+        ORDER BY total_flights DESC, a.name ASC
+        LIMIT :limit
+    """
+    
+    # Bookings are counted once per flight (booking.flight_id index), then
+    # attributed to both airports through the UNION ALL branches
+    TOP_PASSENGERS_QUERY = """
+        WITH flight_passengers AS (
+            SELECT f.flight_id, f.from as from_id, f.to as to_id, COUNT(*) as passengers
+            FROM flight f
+            INNER JOIN booking b ON b.flight_id = f.flight_id
+            WHERE f.departure >= :day_start AND f.departure < :day_end
+            GROUP BY f.flight_id, f.from, f.to
+        )
+        SELECT 
+            a.airport_id,
+            a.iata,
+            a.icao,
+            a.name,
+            t.departing_passengers,
+            t.arriving_passengers,
+            t.departing_passengers + t.arriving_passengers - t.loop_passengers as total_passengers,
+            t.total_flights
+        FROM (
+            SELECT 
+                airport_id,
+                CAST(SUM(departing_passengers) AS SIGNED) as departing_passengers,
+                CAST(SUM(arriving_passengers) AS SIGNED) as arriving_passengers,
+                CAST(SUM(loop_passengers) AS SIGNED) as loop_passengers,
+                CAST(SUM(flights) AS SIGNED) as total_flights
+            FROM (
+                SELECT fp.from_id as airport_id, SUM(fp.passengers) as departing_passengers,
+                       0 as arriving_passengers, 0 as loop_passengers, COUNT(*) as flights
+                FROM flight_passengers fp
+                GROUP BY fp.from_id
+                UNION ALL
+                -- from = to flights were counted by the departure branch already
+                SELECT fp.to_id as airport_id, 0 as departing_passengers,
+                       SUM(fp.passengers) as arriving_passengers,
+                       SUM(CASE WHEN fp.from_id = fp.to_id THEN fp.passengers ELSE 0 END) as loop_passengers,
+                       SUM(fp.from_id <> fp.to_id) as flights
+                FROM flight_passengers fp
+                GROUP BY fp.to_id
+            ) per_direction
+            GROUP BY airport_id
+        ) t
+        INNER JOIN airport a ON a.airport_id = t.airport_id
+        WHERE a.iata IS NOT NULL
+        ORDER BY total_passengers DESC, a.name ASC
+        LIMIT :limit
+    """
+    
+    # Whether the rollup job has rebuilt a day (rows or not)
+    ROLLUP_COVERAGE_QUERY = """
+        SELECT 1 FROM airport_daily_stats_days WHERE `date` = :flight_date
+    """
+    
+    # Rollup versions for completed days (PRIMARY KEY (date, airport_id)).
+    # Airports without flights that day have no row: LEFT JOIN reports zeros
+    # like the raw query does
+    ROLLUP_AIRPORT_FLIGHTS_QUERY = """
+        SELECT 
+            a.airport_id,
+            a.iata,
+            a.icao,
+            a.name,
+            :flight_date as date,
+            COALESCE(s.departures, 0) as departures,
+            COALESCE(s.arrivals, 0) as arrivals,
+            COALESCE(s.departures + s.arrivals - s.loop_flights, 0) as total_flights
+        FROM airport a
+        LEFT JOIN airport_daily_stats s ON s.airport_id = a.airport_id AND s.`date` = :flight_date
+        WHERE a.iata = :airport_iata
+    """
+    
+    ROLLUP_TOP_FLIGHTS_QUERY = """
+        SELECT 
+            a.airport_id,
+            a.iata,
+            a.icao,
+            a.name,
+            s.departures,
+            s.arrivals,
+            s.departures + s.arrivals - s.loop_flights as total_flights
+        FROM airport_daily_stats s
+        INNER JOIN airport a ON a.airport_id = s.airport_id
+        WHERE s.`date` = :flight_date
+            AND a.iata IS NOT NULL
+        ORDER BY total_flights DESC, a.name ASC
+        LIMIT :limit
+    """
+    
+    ROLLUP_TOP_PASSENGERS_QUERY = """
+        SELECT 
+            a.airport_id,
+            a.iata,
+            a.icao,
+            a.name,
+            s.departing_pax as departing_passengers,
+            s.arriving_pax as arriving_passengers,
+            s.departing_pax + s.arriving_pax - s.loop_pax as total_passengers,
+            s.pax_flights as total_flights
+        FROM airport_daily_stats s
+        INNER JOIN airport a ON a.airport_id = s.airport_id
+        WHERE s.`date` = :flight_date
+            AND s.pax_flights > 0
+            AND a.iata IS NOT NULL
+        ORDER BY total_passengers DESC, a.name ASC
+        LIMIT :limit
+    """
+    
+    def __init__(self, use_rollup: bool = True):
+        """
+        Initialize database connection.
+        
+        Args:
+            use_rollup: Read days before today from airport_daily_stats
+        """
         self.db_engine = get_db_engine()
+        self.use_rollup = use_rollup
+        self.last_source: Optional[str] = None
+    
+    @staticmethod
+    def _day_bounds(flight_date: date) -> Tuple[datetime, datetime]:
+        """Get the half-open [start, end) departure range covering one day."""
+        day_start = datetime.combine(flight_date, datetime.min.time())
+        return day_start, day_start + timedelta(days=1)
+    
+    def _fetch_rows(self, rollup_sql: str, raw_sql: str, params: Dict, flight_date: date) -> List:
+        """
+        Run the rollup query for rolled-up days, falling back to the raw query.
+        
+        A day rolled up without flights returns the (empty) rollup result.
+        Sets last_source to "rollup" or "raw".
+        """
+        with self.db_engine.connect() as conn:
+            if self.use_rollup and flight_date < date.today():
+                try:
+                    covered = conn.execute(text(self.ROLLUP_COVERAGE_QUERY), params).first() is not None
+                    rows = conn.execute(text(rollup_sql), params).fetchall() if covered else None
+                except ProgrammingError:
+                    # Rollup tables not migrated: stop trying
+                    conn.rollback()
+                    self.use_rollup = False
+                    rows = None
+                
+                if rows is not None:
+                    self.last_source = "rollup"
+                    return rows
+            
+            self.last_source = "raw"
+            return conn.execute(text(raw_sql), params).fetchall()
     
     def get_airport_flights_on_date(
         self, 
@@ -61,37 +287,22 @@ class AirportLeaderboard:
         if flight_date is None:
             flight_date = date.today()
         
-        query = text("""
-            SELECT 
-                a.airport_id,
-                a.iata,
-                a.icao,
-                a.name,
-                :flight_date as date,
-                COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN f.flight_id END) as departures,
-                COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN f.flight_id END) as arrivals,
-                COUNT(DISTINCT f.flight_id) as total_flights
-            FROM airport a
-            LEFT JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
-                AND DATE(f.departure) = :flight_date
-            WHERE a.iata = :airport_iata
-                AND a.iata IS NOT NULL
-            GROUP BY a.airport_id, a.iata, a.icao, a.name
-        """)
+        day_start, day_end = self._day_bounds(flight_date)
+        rows = self._fetch_rows(
+            self.ROLLUP_AIRPORT_FLIGHTS_QUERY,
+            self.AIRPORT_FLIGHTS_QUERY,
+            {
+                "airport_iata": airport_iata.upper(),
+                "flight_date": flight_date.strftime("%Y-%m-%d"),
+                "day_start": day_start,
+                "day_end": day_end
+            },
+            flight_date
+        )
         
-        with self.db_engine.connect() as conn:
-            result = conn.execute(
-                query, 
-                {
-                    "airport_iata": airport_iata.upper(),
-                    "flight_date": flight_date.strftime("%Y-%m-%d")
-                }
-            )
-            row = result.fetchone()
-            
-            if row:
-                return dict(row._mapping)
-            return None
+        if rows:
+            return dict(rows[0]._mapping)
+        return None
     
     def get_top_airports_by_flights(
         self, 
@@ -124,40 +335,24 @@ class AirportLeaderboard:
         if flight_date is None:
             flight_date = date.today()
         
-        query = text("""
-            SELECT 
-                a.airport_id,
-                a.iata,
-                a.icao,
-                a.name,
-                COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN f.flight_id END) as departures,
-                COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN f.flight_id END) as arrivals,
-                COUNT(DISTINCT f.flight_id) as total_flights
-            FROM airport a
-            INNER JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
-            WHERE DATE(f.departure) = :flight_date
-                AND a.iata IS NOT NULL
-            GROUP BY a.airport_id, a.iata, a.icao, a.name
-            HAVING total_flights > 0
-            ORDER BY total_flights DESC, a.name ASC
-            LIMIT :limit
-        """)
+        day_start, day_end = self._day_bounds(flight_date)
+        rows = self._fetch_rows(
+            self.ROLLUP_TOP_FLIGHTS_QUERY,
+            self.TOP_FLIGHTS_QUERY,
+            {
+                "flight_date": flight_date.strftime("%Y-%m-%d"),
+                "day_start": day_start,
+                "day_end": day_end,
+                "limit": limit
+            },
+            flight_date
+        )
         
-        with self.db_engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {
-                    "flight_date": flight_date.strftime("%Y-%m-%d"),
-                    "limit": limit
-                }
-            )
-            rows = result.fetchall()
-            
-            # Add rank to results
-            return [
-                {**dict(row._mapping), 'rank': idx + 1}
-                for idx, row in enumerate(rows)
-            ]
+        # Add rank to results
+        return [
+            {**dict(row._mapping), 'rank': idx + 1}
+            for idx, row in enumerate(rows)
+        ]
     
     def get_top_airports_by_passengers(
         self, 
@@ -191,44 +386,26 @@ class AirportLeaderboard:
         if flight_date is None:
             flight_date = date.today()
         
-        query = text("""
-            SELECT 
-                a.airport_id,
-                a.iata,
-                a.icao,
-                a.name,
-                COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN b.booking_id END) as departing_passengers,
-                COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN b.booking_id END) as arriving_passengers,
-                COUNT(DISTINCT b.booking_id) as total_passengers,
-                COUNT(DISTINCT f.flight_id) as total_flights
-            FROM airport a
-            INNER JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
-            INNER JOIN booking b ON b.flight_id = f.flight_id
-            WHERE DATE(f.departure) = :flight_date
-                AND a.iata IS NOT NULL
-            GROUP BY a.airport_id, a.iata, a.icao, a.name
-            HAVING total_passengers > 0
-            ORDER BY total_passengers DESC, a.name ASC
-            LIMIT :limit
-        """)
+        day_start, day_end = self._day_bounds(flight_date)
+        rows = self._fetch_rows(
+            self.ROLLUP_TOP_PASSENGERS_QUERY,
+            self.TOP_PASSENGERS_QUERY,
+            {
+                "flight_date": flight_date.strftime("%Y-%m-%d"),
+                "day_start": day_start,
+                "day_end": day_end,
+                "limit": limit
+            },
+            flight_date
+        )
         
-        with self.db_engine.connect() as conn:
-            result = conn.execute(
-                query,
-                {
-                    "flight_date": flight_date.strftime("%Y-%m-%d"),
-                    "limit": limit
-                }
-            )
-            rows = result.fetchall()
-            
-            # Add rank to results
-            return [
-                {**dict(row._mapping), 'rank': idx + 1}
-                for idx, row in enumerate(rows)
-            ]
+        # Add rank to results
+        return [
+            {**dict(row._mapping), 'rank': idx + 1}
+            for idx, row in enumerate(rows)
+        ]
+    
     
-
     def close(self):
         """Close database connection."""
         self.db_engine.dispose()
@@ -283,6 +460,7 @@ if __name__ == "__main__":
     print(f"\n2. Top 5 Airports by Flight Count on {query_date}:")
     print("-" * 80)
     results = leaderboard.get_top_airports_by_flights(query_date, limit=5)
+    print(f"   Source: {leaderboard.last_source}")
     for airport in results:
         print(f"   #{airport['rank']}: {airport['name']} ({airport['iata']}) - "
               f"{airport['total_flights']} flights "
@@ -15,10 +15,11 @@ if __name__ == "__main__":
 
 import hashlib
 import json
+import re
 from typing import Optional, Tuple
 from dotenv import load_dotenv
 from sqlalchemy import text
-from core import get_db_engine, get_cache_client
+from core import get_db_engine, get_cache_client, DistributedLock
 
 # Load environment variables
 load_dotenv()
@@ -27,17 +28,61 @@ load_dotenv()
 class CacheAside:
     """Cache-aside pattern implementation with pluggable backends."""
     
-    def __init__(self):
-        """Initialize database and cache connections from environment variables."""
+    # Set of query:* keys that read from a table (used for table-level invalidation)
+    TAG_PREFIX = "tag:table:"
+    
+    TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+`?(?:\w+`?\.`?)?(\w+)`?", re.IGNORECASE)
+    
+    def __init__(self, stampede_protection: Optional[bool] = None, lock_ttl: float = 10.0):
+        """
+        Initialize database and cache connections from environment variables.
+        
+        Args:
+            stampede_protection: Let one client per key run the query on a miss
+                                 while the others wait for its result (Valkey/Redis
+                                 only). Defaults to CACHE_STAMPEDE_LOCK env var or False
+            lock_ttl: Lock lease in seconds; waiters give up and query after this long
+        """
         self.db_engine = get_db_engine()
         self.cache = get_cache_client()
         self.default_ttl = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour default
+        if stampede_protection is None:
+            stampede_protection = os.getenv("CACHE_STAMPEDE_LOCK", "false").lower() == "true"
+        self.stampede_protection = stampede_protection and self.cache.cache_type in ["redis", "valkey"]
+        self.lock_ttl = lock_ttl
     
     def _generate_cache_key(self, query: str) -> str:
         """Generate cache key from SQL query using SHA256 hash."""
         query_hash = hashlib.sha256(query.encode()).hexdigest()
         return f"query:{query_hash}"
     
+    @classmethod
+    def extract_tables(cls, query: str) -> set[str]:
+        """Extract table names referenced after FROM/JOIN (schema prefix removed)."""
+        return {table.lower() for table in cls.TABLE_PATTERN.findall(query)}
+    
+    def _tag_cache_key(self, cache_key: str, query: str, ttl: int) -> None:
+        """
+        Register the cache key under a tag set for every table the query reads.
+        
+        Lets change-data-capture consumers invalidate all cached queries for a
+        table without knowing their SQL hashes.
+        """
+        if self.cache.cache_type not in ["redis", "valkey"]:
+            return
+        
+        try:
+            pipe = self.cache.client.pipeline(transaction=False)
+            for table in self.extract_tables(query):
+                tag_key = f"{self.TAG_PREFIX}{table}"
+                pipe.sadd(tag_key, cache_key)
+                # Tag set lives as long as its longest-lived member
+                pipe.expire(tag_key, ttl, nx=True)
+                pipe.expire(tag_key, ttl, gt=True)
+            pipe.execute()
+        except Exception as e:
+            print(f"Cache TAG error: {e}")
+    
     def execute_query(
         self, 
         query: str, 
@@ -75,17 +120,46 @@ class CacheAside:
                 results = json.loads(cached_data)
                 return results, "CACHE_HIT", latency
         
-        # 2. Cache miss - query database
         start = time.time()
-        with self.db_engine.connect() as conn:
-            result = conn.execute(text(query))
-            # Convert rows to list of dicts
-            results = [dict(row._mapping) for row in result]
-        latency = (time.time() - start) * 1000
+        lock = None
+        if self.stampede_protection:
+            # One client per key queries the database; the others wait for the lock
+            # and then read what it cached
+            lock = DistributedLock(
+                self.cache.client,
+                cache_key,
+                ttl_ms=int(self.lock_ttl * 1000),
+                blocking=True,
+                blocking_timeout=self.lock_ttl,
+                auto_renew=True
+            )
+            if lock.acquire() and not force_refresh:
+                cached_data = self.cache.get(cache_key)
+                if cached_data:
+                    lock.release()
+                    return json.loads(cached_data), "CACHE_HIT", (time.time() - start) * 1000
         
-        # 3. Store in cache
-        if results:
-            self.cache.set(cache_key, json.dumps(results, default=str), ttl)
+        try:
+            # 2. Cache miss - query database
+            start = time.time()
+            with self.db_engine.connect() as conn:
+                result = conn.execute(text(query))
+                # Convert rows to list of dicts
+                results = [dict(row._mapping) for row in result]
+            latency = (time.time() - start) * 1000
+            
+            # 3. Store in cache (fenced: a holder whose lease was taken over
+            # cannot overwrite the newer holder's result)
+            if results:
+                serialized_results = json.dumps(results, default=str)
+                if lock is not None and lock.acquired:
+                    lock.fenced_set(cache_key, serialized_results, ttl_ms=ttl * 1000)
+                else:
+                    self.cache.set(cache_key, serialized_results, ttl)
+                self._tag_cache_key(cache_key, query, ttl)
+        finally:
+            if lock is not None:
+                lock.release()
         
         return results, "CACHE_MISS", latency
     
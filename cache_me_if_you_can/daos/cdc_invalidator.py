@@ -0,0 +1,438 @@
+"""
+Change-Data-Capture (CDC) Cache Invalidation
+
+Updates that bypass the DAOs (manual SQL, other services, bug-fix scripts such as
+docs/bug_fixes_flughafendb_large.sql) leave cached entries stale until their TTL
+expires. This module tails MySQL/MariaDB binlog row events for the flight, booking,
+passenger and passengerdetails tables and maps every changed row to the cache
+keys it affects:
+
+- flight            -> flight:<flight_id> (WriteThroughCache / WriteBehindCache)
+- booking           -> bookings:<passenger_id> (per-passenger booking counts)
+- passenger         -> bookings:<passenger_id> (the counts include the name)
+- passengerdetails  -> no per-id keys; only the tagged query:* keys below
+- every watched table -> all query:* keys tagged with that table by CacheAside
+
+Keys are invalidated (or flight:* entries refreshed from the database) in one
+pipeline per batch of events.
+
+Events are normalized to plain dictionaries so they can be recorded to a JSON
+Lines file and replayed later with replay() — no live replica is needed for tests.
+
+Requires the mysql-replication package for live tailing only:
+    uv add mysql-replication
+
+The MySQL server must run with binlog_format=ROW.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import text, bindparam
+
+from core import get_db_engine, get_cache_client
+from daos.cache_aside import CacheAside
+
+# Load environment variables
+load_dotenv()
+
+
+class CDCInvalidator:
+    """Binlog-driven cache invalidation for flight, booking and passenger data."""
+    
+    WATCHED_TABLES = ("flight", "booking", "passenger", "passengerdetails")
+    
+    FLIGHT_QUERY = """
+        SELECT
+            f.flight_id,
+            f.flightno,
+            f.departure,
+            f.arrival,
+            f.airline_id,
+            f.airplane_id,
+            dep.iata as from_airport,
+            arr.iata as to_airport,
+            al.airlinename
+        FROM flight f
+        JOIN airport dep ON f.from = dep.airport_id
+        JOIN airport arr ON f.to = arr.airport_id
+        JOIN airline al ON f.airline_id = al.airline_id
+        WHERE f.flight_id IN :flight_ids
+    """
+    
+    def __init__(
+        self,
+        refresh_flights: bool = False,
+        batch_size: int = 500,
+        batch_interval: float = 0.5,
+        verbose: bool = False
+    ):
+        """
+        Initialize cache connection (and database connection for refreshes).
+        
+        Args:
+            refresh_flights: Rewrite flight:* entries from the database instead of
+                             deleting them (other keys are always deleted)
+            batch_size: Maximum number of row events applied per pipeline
+            batch_interval: Maximum seconds an event waits before its batch is applied
+            verbose: Print every applied batch
+        """
+        self.cache = get_cache_client()
+        self.db_engine = get_db_engine() if refresh_flights else None
+        self.default_ttl = int(os.getenv("CACHE_TTL", "3600"))
+        self.refresh_flights = refresh_flights
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.verbose = verbose
+        
+        self.stats = {
+            "events": 0,
+            "rows": 0,
+            "batches": 0,
+            "keys_invalidated": 0,
+            "flights_refreshed": 0,
+        }
+    
+    @staticmethod
+    def map_row(table: str, row: Dict) -> tuple[set[str], set[int]]:
+        """
+        Map one changed row to the cache keys it affects.
+        
+        Both the before and after images are considered so that updates which
+        change a foreign key (e.g. moving a booking to another flight) invalidate
+        the old and the new entries.
+        
+        Args:
+            table: Table name (lowercase)
+            row: Row change with optional "before" and "after" column dictionaries
+        
+        Returns:
+            Tuple of (cache_keys, flight_ids)
+            - cache_keys: Keys to delete
+            - flight_ids: Flights whose flight:* entry should be deleted or refreshed
+        """
+        keys = set()
+        flight_ids = set()
+        
+        for image in (row.get("before"), row.get("after")):
+            if not image:
+                continue
+            
+            if table == "flight":
+                if image.get("flight_id") is not None:
+                    flight_ids.add(int(image["flight_id"]))
+            
+            elif table in ("booking", "passenger"):
+                if image.get("passenger_id") is not None:
+                    keys.add(f"bookings:{image['passenger_id']}")
+            
+            # passengerdetails rows are only cached through CacheAside
+            # queries, which apply_events invalidates by table tag
+        
+        return keys, flight_ids
+    
+    def _refresh_flights(self, flight_ids: List[int]) -> Dict[int, Dict]:
+        """Load current flight records for a batch with a single IN-list query."""
+        query = text(self.FLIGHT_QUERY).bindparams(bindparam("flight_ids", expanding=True))
+        
+        flights = {}
+        with self.db_engine.connect() as conn:
+            result = conn.execute(query, {"flight_ids": flight_ids})
+            for row in result:
+                flight_data = dict(row._mapping)
+                
+                # Convert datetime objects to strings for JSON serialization
+                for key, value in flight_data.items():
+                    if isinstance(value, datetime):
+                        flight_data[key] = value.isoformat()
+                
+                flights[flight_data["flight_id"]] = flight_data
+        
+        return flights
+    
+    def apply_events(self, events: List[Dict]) -> Dict:
+        """
+        Invalidate or refresh all cache entries affected by a batch of row events.
+        
+        Args:
+            events: Normalized row events (see event_from_binlog)
+        
+        Returns:
+            Dictionary with keys_invalidated, flights_refreshed and tables touched
+        """
+        keys = set()
+        flight_ids = set()
+        tables = set()
+        rows = 0
+        
+        for event in events:
+            table = event.get("table", "").lower()
+            if table not in self.WATCHED_TABLES:
+                continue
+            
+            tables.add(table)
+            for row in event.get("rows", []):
+                rows += 1
+                row_keys, row_flight_ids = self.map_row(table, row)
+                keys.update(row_keys)
+                flight_ids.update(row_flight_ids)
+        
+        result = {"keys_invalidated": 0, "flights_refreshed": 0, "tables": sorted(tables)}
+        if not tables:
+            return result
+        
+        client = self.cache.client
+        tag_keys = [f"{CacheAside.TAG_PREFIX}{table}" for table in sorted(tables)]
+        
+        # Resolve table tags to the cached query:* keys they cover
+        pipe = client.pipeline(transaction=False)
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        tagged = dict(zip(tag_keys, pipe.execute()))
+        for members in tagged.values():
+            keys.update(members or ())
+        
+        refreshed = {}
+        if self.refresh_flights and flight_ids:
+            refreshed = self._refresh_flights(sorted(flight_ids))
+        
+        for flight_id in flight_ids:
+            if flight_id not in refreshed:
+                keys.add(f"flight:{flight_id}")
+        
+        # MULTI: keys and their tags go together. Only the members read above
+        # are removed from the tag sets; queries tagged since then stay tagged
+        pipe = client.pipeline(transaction=True)
+        for key in keys:
+            pipe.delete(key)
+        for tag_key, members in tagged.items():
+            if members:
+                pipe.srem(tag_key, *members)
+        for flight_id, flight_data in refreshed.items():
+            pipe.set(f"flight:{flight_id}", json.dumps(flight_data), ex=self.default_ttl)
+        pipe.execute()
+        
+        result["keys_invalidated"] = len(keys)
+        result["flights_refreshed"] = len(refreshed)
+        
+        self.stats["events"] += len(events)
+        self.stats["rows"] += rows
+        self.stats["batches"] += 1
+        self.stats["keys_invalidated"] += len(keys)
+        self.stats["flights_refreshed"] += len(refreshed)
+        
+        if self.verbose:
+            print(
+                f"CDC batch: {len(events)} event(s), {rows} row(s) on {', '.join(result['tables'])} "
+                f"→ {len(keys)} key(s) invalidated, {len(refreshed)} flight(s) refreshed"
+            )
+        
+        return result
+    
+    def _consume(self, events: Iterable[Optional[Dict]]) -> Dict:
+        """
+        Apply a stream of events in batches bounded by size and age.
+        
+        A None item marks an idle tick (e.g. a binlog heartbeat) and flushes
+        the pending batch if it is old enough.
+        """
+        batch = []
+        batch_started = time.monotonic()
+        
+        for event in events:
+            if event is not None:
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(event)
+            
+            if batch and (
+                len(batch) >= self.batch_size
+                or time.monotonic() - batch_started >= self.batch_interval
+            ):
+                self.apply_events(batch)
+                batch = []
+        
+        if batch:
+            self.apply_events(batch)
+        
+        return self.stats
+    
+    @staticmethod
+    def event_from_binlog(binlog_event) -> Dict:
+        """
+        Convert a python-mysql-replication rows event into a JSON-serializable dict.
+        
+        Returns:
+            {"schema", "table", "type" ("insert"|"update"|"delete"), "timestamp",
+             "rows": [{"before": {...} | None, "after": {...} | None}, ...]}
+        """
+        from pymysqlreplication.row_event import UpdateRowsEvent, WriteRowsEvent
+        
+        if isinstance(binlog_event, UpdateRowsEvent):
+            event_type = "update"
+            rows = [{"before": row["before_values"], "after": row["after_values"]} for row in binlog_event.rows]
+        elif isinstance(binlog_event, WriteRowsEvent):
+            event_type = "insert"
+            rows = [{"before": None, "after": row["values"]} for row in binlog_event.rows]
+        else:
+            event_type = "delete"
+            rows = [{"before": row["values"], "after": None} for row in binlog_event.rows]
+        
+        return {
+            "schema": binlog_event.schema,
+            "table": binlog_event.table,
+            "type": event_type,
+            "timestamp": binlog_event.timestamp,
+            "rows": rows,
+        }
+    
+    def tail(
+        self,
+        server_id: int = 4242,
+        max_events: Optional[int] = None,
+        record_to: Optional[str] = None
+    ) -> Dict:
+        """
+        Tail the binlog and invalidate affected cache entries until interrupted.
+        
+        Args:
+            server_id: Unique replica server ID for this consumer
+            max_events: Stop after this many row events (None = run forever)
+            record_to: Optional JSON Lines file to append every event to (for replay)
+        
+        Returns:
+            Cumulative statistics dictionary
+        """
+        try:
+            from pymysqlreplication import BinLogStreamReader
+            from pymysqlreplication.event import HeartbeatLogEvent
+            from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+        except ImportError as e:
+            raise ImportError(
+                "Binlog tailing requires the mysql-replication package: uv add mysql-replication"
+            ) from e
+        
+        stream = BinLogStreamReader(
+            connection_settings={
+                "host": os.getenv("DB_HOST", "localhost"),
+                "port": int(os.getenv("DB_PORT", "3306")),
+                "user": os.getenv("DB_USER", "root"),
+                "passwd": os.getenv("DB_PASSWORD", ""),
+            },
+            server_id=server_id,
+            only_schemas=[os.getenv("DB_NAME", "flughafendb_large")],
+            only_tables=list(self.WATCHED_TABLES),
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, HeartbeatLogEvent],
+            blocking=True,
+            resume_stream=True,
+            slave_heartbeat=max(self.batch_interval, 0.1),
+        )
+        
+        record_file = open(record_to, "a") if record_to else None
+        
+        def _events():
+            count = 0
+            for binlog_event in stream:
+                if isinstance(binlog_event, HeartbeatLogEvent):
+                    yield None
+                    continue
+                
+                event = self.event_from_binlog(binlog_event)
+                if record_file:
+                    record_file.write(json.dumps(event, default=str) + "\n")
+                    record_file.flush()
+                yield event
+                
+                count += 1
+                if max_events is not None and count >= max_events:
+                    return
+        
+        try:
+            return self._consume(_events())
+        except KeyboardInterrupt:
+            return self.stats
+        finally:
+            stream.close()
+            if record_file:
+                record_file.close()
+    
+    @staticmethod
+    def load_recorded_events(path: str) -> List[Dict]:
+        """Load events previously recorded with tail(record_to=...)."""
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    
+    def replay(self, path: str, speed: float = 0.0) -> Dict:
+        """
+        Replay recorded binlog events through the invalidation pipeline.
+        
+        Local test harness: exercises the same mapping and batching as tail()
+        without a live MySQL replica.
+        
+        Args:
+            path: JSON Lines file of normalized events
+            speed: 0 replays as fast as possible; 1.0 honors recorded timestamps
+        
+        Returns:
+            Cumulative statistics dictionary
+        """
+        events = self.load_recorded_events(path)
+        
+        def _events():
+            previous_ts = None
+            for event in events:
+                ts = event.get("timestamp")
+                if speed > 0 and previous_ts is not None and ts is not None:
+                    time.sleep(max(0.0, (ts - previous_ts) / speed))
+                previous_ts = ts
+                yield event
+        
+        return self._consume(_events())
+    
+    def close(self):
+        """Close database and cache connections."""
+        if self.db_engine is not None:
+            self.db_engine.dispose()
+        self.cache.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Binlog-driven cache invalidation")
+    parser.add_argument("--replay", help="Replay a recorded JSON Lines event file instead of tailing")
+    parser.add_argument("--record", help="Append tailed events to this JSON Lines file")
+    parser.add_argument("--refresh", action="store_true", help="Refresh flight:* entries instead of deleting")
+    args = parser.parse_args()
+    
+    invalidator = CDCInvalidator(refresh_flights=args.refresh, verbose=True)
+    
+    print("=" * 60)
+    print("CDC Cache Invalidation")
+    print("=" * 60)
+    
+    if args.replay:
+        stats = invalidator.replay(args.replay)
+    else:
+        print("Tailing binlog (Ctrl+C to stop)...")
+        stats = invalidator.tail(record_to=args.record)
+    
+    print(f"\nEvents:           {stats['events']}")
+    print(f"Rows:             {stats['rows']}")
+    print(f"Batches:          {stats['batches']}")
+    print(f"Keys invalidated: {stats['keys_invalidated']}")
+    print(f"Flights refreshed: {stats['flights_refreshed']}")
+    
+    invalidator.close()
+    print("\n" + "=" * 60)
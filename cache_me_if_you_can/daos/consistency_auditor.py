@@ -0,0 +1,379 @@
+"""
+Consistency Auditor for Write-Through and Write-Behind Caches
+
+verify_consistency(flight_id) checks a single flight synchronously. This module
+measures drift continuously instead: it streams cached `flight:*` keys with SCAN,
+samples a fraction of them, compares each batch against the database with one
+IN-list query and reports the divergence rate. Divergent entries can optionally
+be repaired: they are deleted (only if still unchanged since the audit read
+them) so the next read reloads them from the database.
+
+Database load is bounded by a queries-per-second budget, so the auditor never
+does a full-table scan and never exceeds the configured DB QPS.
+
+This module provides:
+- ConsistencyAuditor: Sampling auditor usable once (run_once) or in a background thread
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text, bindparam
+
+
+class ConsistencyAuditor:
+    """Sampling consistency auditor for cached flight entries."""
+    
+    KEY_PATTERN = "flight:*"
+    
+    # KEYS: cache key; ARGV: cached value seen by the audit
+    # Delete the entry only if nobody rewrote it after the audit read it
+    REPAIR_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+    
+    # Fields of the cached flight record that must match the database
+    COMPARED_FIELDS = (
+        "flightno",
+        "departure",
+        "arrival",
+        "airline_id",
+        "airplane_id",
+        "from_airport",
+        "to_airport",
+        "airlinename",
+    )
+    
+    BATCH_QUERY = """
+        SELECT
+            f.flight_id,
+            f.flightno,
+            f.departure,
+            f.arrival,
+            f.airline_id,
+            f.airplane_id,
+            dep.iata as from_airport,
+            arr.iata as to_airport,
+            al.airlinename
+        FROM flight f
+        JOIN airport dep ON f.from = dep.airport_id
+        JOIN airport arr ON f.to = arr.airport_id
+        JOIN airline al ON f.airline_id = al.airline_id
+        WHERE f.flight_id IN :flight_ids
+    """
+    
+    def __init__(
+        self,
+        dao: Any,
+        sample_rate: float = 0.1,
+        batch_size: int = 100,
+        max_db_qps: float = 5.0,
+        repair: bool = False,
+        scan_count: int = 500,
+        max_pending_age: float = 300.0
+    ):
+        """
+        Initialize the auditor on top of an existing cache DAO.
+        
+        Args:
+            dao: WriteThroughCache or WriteBehindCache instance (provides
+                 db_engine, cache and default_ttl)
+            sample_rate: Fraction of scanned keys to audit (0 < rate <= 1)
+            batch_size: Number of flights compared per database query
+            max_db_qps: Upper bound on database queries per second
+            repair: Delete divergent cache entries (compare-and-delete against
+                    the value audited) so the next read reloads them
+            scan_count: COUNT hint passed to SCAN
+            max_pending_age: Seconds after its latest queued update that a
+                             flight stops counting as pending (longer than
+                             any healthy flush delay; counts left by a dead
+                             worker are then audited again)
+        """
+        self.dao = dao
+        self.db_engine = dao.db_engine
+        self.cache = dao.cache
+        self.default_ttl = dao.default_ttl
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.max_db_qps = max_db_qps
+        self.repair = repair
+        self.scan_count = scan_count
+        self.max_pending_age = max_pending_age
+        
+        # Write-behind caches are expected to lead the database for flights
+        # whose updates are queued or being written
+        self.pending_key = getattr(dao, "PENDING_KEY", None)
+        self.pending_at_key = getattr(dao, "PENDING_AT_KEY", None)
+        self._repair_script = self.cache.client.register_script(self.REPAIR_SCRIPT)
+        
+        self._last_query_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.last_report: Optional[Dict] = None
+    
+    def _throttle(self) -> None:
+        """Sleep as needed so database queries never exceed max_db_qps."""
+        if self.max_db_qps <= 0:
+            return
+        
+        min_interval = 1.0 / self.max_db_qps
+        wait = self._last_query_at + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_query_at = time.monotonic()
+    
+    def _pending_flight_ids(self, flight_ids: List[int], report: Dict) -> set[int]:
+        """
+        Get the flights of a batch with write-behind updates not yet committed.
+        
+        Flights whose latest update was queued more than max_pending_age
+        seconds ago (or at an unknown time) are counted as stale_pending and
+        audited like any other flight.
+        """
+        if not self.pending_key or not flight_ids:
+            return set()
+        
+        pipe = self.cache.client.pipeline(transaction=False)
+        pipe.hmget(self.pending_key, flight_ids)
+        if self.pending_at_key:
+            pipe.hmget(self.pending_at_key, flight_ids)
+        counts, *queued_at = pipe.execute()
+        queued_at = queued_at[0] if queued_at else [None] * len(flight_ids)
+        
+        oldest = time.time() - self.max_pending_age
+        pending = set()
+        for flight_id, count, at in zip(flight_ids, counts, queued_at):
+            if count is None or int(count) <= 0:
+                continue
+            if at is not None and float(at) >= oldest:
+                pending.add(flight_id)
+            else:
+                report["stale_pending"] += 1
+        return pending
+    
+    def _fetch_db_flights(self, flight_ids: List[int]) -> Dict[int, Dict]:
+        """Load a batch of flights from the database with a single IN-list query."""
+        self._throttle()
+        
+        query = text(self.BATCH_QUERY).bindparams(bindparam("flight_ids", expanding=True))
+        
+        db_flights = {}
+        with self.db_engine.connect() as conn:
+            result = conn.execute(query, {"flight_ids": flight_ids})
+            for row in result:
+                flight_data = dict(row._mapping)
+                
+                # Convert datetime objects to strings to match the cached JSON
+                for key, value in flight_data.items():
+                    if isinstance(value, datetime):
+                        flight_data[key] = value.isoformat()
+                
+                db_flights[flight_data["flight_id"]] = flight_data
+        
+        return db_flights
+    
+    def _audit_batch(self, keys: List[str], report: Dict) -> None:
+        """Compare one batch of cached keys against the database."""
+        flight_ids = {}
+        for key in keys:
+            try:
+                flight_ids[key] = int(key.split(":", 1)[1])
+            except (IndexError, ValueError):
+                report["skipped"] += 1
+        
+        if not flight_ids:
+            return
+        
+        keys = list(flight_ids)
+        ids = list(flight_ids.values())
+        
+        # Check pending updates on both sides of the reads: an update that
+        # starts before the MGET or commits before the DB read is skipped
+        pending = self._pending_flight_ids(ids, report)
+        cached_values = self.cache.client.mget(keys)
+        db_flights = self._fetch_db_flights(ids)
+        report["db_queries"] += 1
+        pending |= self._pending_flight_ids(ids, {"stale_pending": 0})
+        
+        stale = {}
+        
+        for key, cached_json in zip(keys, cached_values):
+            if cached_json is None:
+                # Expired or evicted between SCAN and MGET
+                report["skipped"] += 1
+                continue
+            
+            flight_id = flight_ids[key]
+            if flight_id in pending:
+                report["pending"] += 1
+                continue
+            
+            report["checked"] += 1
+            db_flight = db_flights.get(flight_id)
+            
+            if db_flight is None:
+                report["divergent"] += 1
+                report["missing_in_db"] += 1
+                report["divergent_keys"].append(key)
+                stale[key] = cached_json
+                continue
+            
+            cached_flight = json.loads(cached_json)
+            mismatched = [
+                field for field in self.COMPARED_FIELDS
+                if cached_flight.get(field) != db_flight.get(field)
+            ]
+            
+            if mismatched:
+                report["divergent"] += 1
+                report["divergent_keys"].append(key)
+                stale[key] = cached_json
+        
+        if self.repair and stale:
+            # Compare-and-delete: entries rewritten since the MGET (a newer
+            # write-through or write-behind value) are left alone
+            pipe = self.cache.client.pipeline(transaction=False)
+            for key, cached_json in stale.items():
+                self._repair_script(keys=[key], args=[cached_json], client=pipe)
+            report["repaired"] += sum(pipe.execute())
+    
+    def run_once(self, max_keys: Optional[int] = None) -> Dict:
+        """
+        Run one sampling pass over the cached flight keyspace.
+        
+        Args:
+            max_keys: Stop after scanning this many keys (None = whole keyspace)
+        
+        Returns:
+            Dictionary with audit results:
+            - scanned / sampled / checked: Key counts at each stage
+            - pending: Keys skipped because a write-behind update is queued
+            - stale_pending: Pending counts older than max_pending_age (audited)
+            - divergent / missing_in_db / repaired: Drift counters
+            - divergence_rate: divergent / checked
+            - db_queries: Number of IN-list queries issued
+            - divergent_keys: Keys that did not match the database
+            - duration_ms: Wall-clock duration of the pass
+        """
+        report = {
+            "scanned": 0,
+            "sampled": 0,
+            "checked": 0,
+            "skipped": 0,
+            "pending": 0,
+            "stale_pending": 0,
+            "divergent": 0,
+            "missing_in_db": 0,
+            "repaired": 0,
+            "divergence_rate": 0.0,
+            "db_queries": 0,
+            "divergent_keys": [],
+            "duration_ms": 0.0,
+        }
+        start_time = time.perf_counter()
+        
+        batch = []
+        for key in self.cache.client.scan_iter(match=self.KEY_PATTERN, count=self.scan_count):
+            if self._stop_event.is_set():
+                break
+            
+            report["scanned"] += 1
+            if random.random() < self.sample_rate:
+                report["sampled"] += 1
+                batch.append(key)
+            
+            if len(batch) >= self.batch_size:
+                self._audit_batch(batch, report)
+                batch = []
+            
+            if max_keys is not None and report["scanned"] >= max_keys:
+                break
+        
+        if batch:
+            self._audit_batch(batch, report)
+        
+        if report["checked"]:
+            report["divergence_rate"] = report["divergent"] / report["checked"]
+        report["duration_ms"] = (time.perf_counter() - start_time) * 1000
+        
+        with self._lock:
+            self.last_report = report
+        return report
+    
+    def start(self, interval: float = 60.0, max_keys: Optional[int] = None) -> None:
+        """
+        Start auditing continuously in a background daemon thread.
+        
+        Args:
+            interval: Seconds to wait between audit passes
+            max_keys: Keys scanned per pass (None = whole keyspace)
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once(max_keys=max_keys)
+                except Exception as e:
+                    print(f"Consistency audit error: {e}")
+                self._stop_event.wait(interval)
+        
+        self._thread = threading.Thread(target=_loop, name="consistency-auditor", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background auditor thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def get_last_report(self) -> Optional[Dict]:
+        """Get the report of the most recent completed audit pass."""
+        with self._lock:
+            return self.last_report
+
+
+# Example usage
+if __name__ == "__main__":
+    from daos.write_through_cache import WriteThroughCache
+    
+    dao = WriteThroughCache()
+    
+    # Warm a few cache entries so there is something to audit
+    for flight_id in range(100, 130):
+        dao.get_flight(flight_id)
+    
+    print("=" * 60)
+    print("Consistency Auditor Demo")
+    print("=" * 60)
+    
+    auditor = ConsistencyAuditor(dao, sample_rate=1.0, batch_size=10, max_db_qps=2.0)
+    report = auditor.run_once()
+    
+    print(f"\nScanned:         {report['scanned']}")
+    print(f"Checked:         {report['checked']}")
+    print(f"Divergent:       {report['divergent']}")
+    print(f"Divergence rate: {report['divergence_rate']:.2%}")
+    print(f"DB queries:      {report['db_queries']}")
+    print(f"Duration:        {report['duration_ms']:.1f} ms")
+    
+    dao.close()
+    print("\n" + "=" * 60)
@@ -0,0 +1,782 @@
+"""
+Incremental Airport Leaderboards
+
+populate_valkey_leaderboards() in the leaderboard demo rebuilds the sorted sets
+from full GROUP BY queries. This service keeps the same daily sorted sets up to
+date incrementally instead:
+
+- leaderboard:flights:<date>     member = airport IATA, score = flights (dep + arr)
+- leaderboard:passengers:<date>  member = airport IATA, score = bookings (dep + arr)
+
+Writers call record_flight / record_booking (or apply_reschedules for flights
+whose departure moved to another day) right after their database commit, which
+issues ZINCRBY on the affected days. A periodic reconciliation job rebuilds a
+day from SQL and swaps it in atomically, so leaderboard reads never touch the
+RDBMS and drift from missed events is bounded by the reconciliation interval.
+
+As in AirportLeaderboard, a flight (and its bookings) counts for the day of its
+departure at both its origin and destination airport.
+
+Members are bare IATA codes. Display details (the airport name) live in a
+per-day hash leaderboard:details:<date> keyed by IATA, so a count change never
+creates a new member and reads fetch the top-N and their details in one round
+trip (ZREVRANGE + HMGET). Counts are kept in the sorted sets only: ZINCRBY
+cannot leave a copy in the hash stale. publish_snapshot() and reconcile()
+rewrite the hash, so airports first ranked by an increment get their name on
+the next reconciliation.
+
+Days written by older versions of the demo hold "IATA|Name|..." members in
+the same keys. Increments would add bare IATA members next to them, so
+convert those days with scripts/migrate_leaderboard_members.py before
+enabling incremental writers; reconcile() also replaces them and reports
+how many it found.
+
+Weekly, monthly and rolling N-day leaderboards are ZUNIONSTOREs over the daily
+sets. The union of completed days (before today) is cached with period_ttl and
+extended incrementally as days roll: [start, end] is derived from a cached
+[start, end - 1] (add one day) or [start - 1, end - 1] (add one day, subtract
+one with WEIGHTS 1 1 -1) instead of re-reading every day. Days from today on
+keep changing, so they are merged into a short-lived (live_ttl) key on read.
+
+This module provides:
+- LeaderboardService: Incremental ZINCRBY updates, reads, period unions, rank
+  trends and SQL reconciliation
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import text, bindparam
+
+from core import get_cache_client, get_db_engine
+
+
+DayLike = Union[date, datetime, str]
+
+
+# Build the cached union of closed days [start, end] atomically, reusing a cached
+# neighbour range when one exists. A derived range inherits the remaining TTL of
+# its source, so no cached value is older than one TTL since its last full build.
+# KEYS: dest, [start, end-1], [start-1, end-1], day(end), day(start-1), day(start..end)...
+# ARGV: ttl
+# Returns how the range was built: cached, extended, slid or full
+CLOSED_RANGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 'cached'
+end
+
+local mode
+local ttl = tonumber(ARGV[1])
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[2], KEYS[4])
+    ttl = redis.call('TTL', KEYS[2])
+    mode = 'extended'
+elseif redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('ZUNIONSTORE', KEYS[1], 3, KEYS[3], KEYS[4], KEYS[5], 'WEIGHTS', 1, 1, -1)
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', 0)
+    ttl = redis.call('TTL', KEYS[3])
+    mode = 'slid'
+else
+    redis.call('ZUNIONSTORE', KEYS[1], #KEYS - 5, unpack(KEYS, 6))
+    mode = 'full'
+end
+
+redis.call('EXPIRE', KEYS[1], math.max(ttl, 1))
+return mode
+"""
+
+
+# Top-N members with scores plus their details in one round trip
+# KEYS: sorted set, details hash   ARGV: limit
+TOP_WITH_DETAILS_SCRIPT = """
+local members = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+if #members == 0 then
+    return {{}, {}}
+end
+
+local iatas = {}
+for i = 1, #members, 2 do
+    iatas[#iatas + 1] = members[i]
+end
+return {members, redis.call('HMGET', KEYS[2], unpack(iatas))}
+"""
+
+
+class LeaderboardService:
+    """Incrementally maintained daily airport leaderboards in Valkey sorted sets."""
+    
+    FLIGHTS = "flights"
+    PASSENGERS = "passengers"
+    KEY_FORMAT = "leaderboard:{kind}:{day}"
+    RANGE_KEY_FORMAT = "leaderboard:{kind}:range:{start}:{end}"
+    LIVE_KEY_FORMAT = "leaderboard:{kind}:live:{start}:{end}"
+    DETAILS_KEY_FORMAT = "leaderboard:details:{day}"
+    
+    # Airports and booking counts of flights being written (IATA may be NULL)
+    FLIGHT_INFO_QUERY = """
+        SELECT
+            f.flight_id,
+            f.departure,
+            dep.iata as from_iata,
+            arr.iata as to_iata,
+            (SELECT COUNT(*) FROM booking b WHERE b.flight_id = f.flight_id) as passengers
+        FROM flight f
+        JOIN airport dep ON f.from = dep.airport_id
+        JOIN airport arr ON f.to = arr.airport_id
+        WHERE f.flight_id IN :flight_ids
+    """
+    
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        db_engine: Optional[Any] = None,
+        ttl_days: int = 35,
+        period_ttl: int = 3600,
+        live_ttl: int = 60
+    ):
+        """
+        Initialize the leaderboard service.
+        
+        Args:
+            client: Valkey/Redis client (defaults to get_cache_client().client)
+            db_engine: SQLAlchemy engine for lookups and reconciliation
+                       (defaults to get_db_engine() on first use)
+            ttl_days: Days a daily leaderboard is kept after its last update
+                      (bounds how far back period unions can reach)
+            period_ttl: Seconds a cached union of completed days is kept
+            live_ttl: Seconds a union that includes today or later is kept
+        """
+        self._cache = None
+        if client is None:
+            self._cache = get_cache_client()
+            client = self._cache.client
+        self.client = client
+        self._db_engine = db_engine
+        self.ttl_seconds = ttl_days * 86400
+        self.period_ttl = period_ttl
+        self.live_ttl = live_ttl
+        self._closed_range_script = client.register_script(CLOSED_RANGE_SCRIPT)
+        self._top_with_details_script = client.register_script(TOP_WITH_DETAILS_SCRIPT)
+        self.build_stats = {"cached": 0, "extended": 0, "slid": 0, "full": 0, "live": 0}
+        
+        self._leaderboard = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.last_reconciliation: Optional[Dict] = None
+    
+    @property
+    def db_engine(self) -> Any:
+        """Database engine, created on first use."""
+        if self._db_engine is None:
+            self._db_engine = get_db_engine()
+        return self._db_engine
+    
+    @staticmethod
+    def day_of(value: DayLike) -> str:
+        """Normalize a date, datetime or ISO string to YYYY-MM-DD."""
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)[:10]
+    
+    def key(self, kind: str, day: DayLike) -> str:
+        """Build the sorted-set key for a leaderboard kind and day."""
+        return self.KEY_FORMAT.format(kind=kind, day=self.day_of(day))
+    
+    def details_key(self, day: DayLike) -> str:
+        """Build the per-day details hash key."""
+        return self.DETAILS_KEY_FORMAT.format(day=self.day_of(day))
+    
+    @classmethod
+    def as_date(cls, value: DayLike) -> date:
+        """Normalize a date, datetime or ISO string to a date."""
+        return datetime.strptime(cls.day_of(value), "%Y-%m-%d").date()
+    
+    def _queue_incr(self, pipe: Any, kind: str, day: DayLike, airports: Tuple, delta: int) -> None:
+        """Queue ZINCRBY for each known airport of a flight."""
+        key = self.key(kind, day)
+        for iata in {iata for iata in airports if iata}:
+            pipe.zincrby(key, delta, iata)
+        pipe.expire(key, self.ttl_seconds)
+        if delta < 0:
+            # Drop airports whose count fell to zero
+            pipe.zremrangebyscore(key, "-inf", 0)
+    
+    def record_flight(
+        self,
+        from_iata: Optional[str],
+        to_iata: Optional[str],
+        departure: DayLike,
+        delta: int = 1,
+        passengers: int = 0,
+        pipe: Optional[Any] = None
+    ) -> None:
+        """
+        Apply a flight insert (delta=1) or delete (delta=-1).
+        
+        Args:
+            from_iata: Origin airport IATA code
+            to_iata: Destination airport IATA code
+            departure: Departure date/datetime of the flight
+            delta: +1 for a new flight, -1 for a removed one
+            passengers: Bookings carried by the flight (moved with it)
+            pipe: Pipeline to queue on (executed immediately if None)
+        """
+        own_pipe = pipe is None
+        if own_pipe:
+            pipe = self.client.pipeline(transaction=False)
+        
+        self._queue_incr(pipe, self.FLIGHTS, departure, (from_iata, to_iata), delta)
+        if passengers:
+            self._queue_incr(pipe, self.PASSENGERS, departure, (from_iata, to_iata), delta * passengers)
+        
+        if own_pipe:
+            pipe.execute()
+    
+    def record_booking(
+        self,
+        from_iata: Optional[str],
+        to_iata: Optional[str],
+        departure: DayLike,
+        delta: int = 1,
+        pipe: Optional[Any] = None
+    ) -> None:
+        """
+        Apply a booking insert (delta=1) or delete (delta=-1).
+        
+        Args:
+            from_iata: Origin airport IATA code of the booked flight
+            to_iata: Destination airport IATA code of the booked flight
+            departure: Departure date/datetime of the booked flight
+            delta: +1 for a new booking, -1 for a cancelled one
+            pipe: Pipeline to queue on (executed immediately if None)
+        """
+        own_pipe = pipe is None
+        if own_pipe:
+            pipe = self.client.pipeline(transaction=False)
+        
+        self._queue_incr(pipe, self.PASSENGERS, departure, (from_iata, to_iata), delta)
+        
+        if own_pipe:
+            pipe.execute()
+    
+    def _flight_info(self, conn: Any, flight_ids: List[int]) -> Dict[int, Dict]:
+        """Look up airports, departure and booking count for flights."""
+        query = text(self.FLIGHT_INFO_QUERY).bindparams(bindparam("flight_ids", expanding=True))
+        result = conn.execute(query, {"flight_ids": flight_ids})
+        return {row.flight_id: dict(row._mapping) for row in result}
+    
+    def apply_reschedules(self, moves: Dict[int, Tuple[datetime, datetime]], conn: Optional[Any] = None) -> int:
+        """
+        Move rescheduled flights (and their bookings) between daily leaderboards.
+        
+        Only flights whose departure changed day are looked up, with one query.
+        
+        Args:
+            moves: Mapping of flight_id to (old_departure, new_departure)
+            conn: Database connection to use (a new one is opened if None)
+        
+        Returns:
+            Number of flights moved to another day
+        """
+        moved = {
+            flight_id: (old, new) for flight_id, (old, new) in moves.items()
+            if self.day_of(old) != self.day_of(new)
+        }
+        if not moved:
+            return 0
+        
+        if conn is None:
+            with self.db_engine.connect() as own_conn:
+                info = self._flight_info(own_conn, list(moved))
+        else:
+            info = self._flight_info(conn, list(moved))
+        
+        pipe = self.client.pipeline(transaction=False)
+        for flight_id, (old_departure, new_departure) in moved.items():
+            flight = info.get(flight_id)
+            if flight is None:
+                continue
+            airports = (flight["from_iata"], flight["to_iata"])
+            self.record_flight(*airports, old_departure, delta=-1, passengers=flight["passengers"], pipe=pipe)
+            self.record_flight(*airports, new_departure, delta=1, passengers=flight["passengers"], pipe=pipe)
+        pipe.execute()
+        return len(moved)
+    
+    def apply_bookings(self, flight_ids: List[int], delta: int = 1, conn: Optional[Any] = None) -> None:
+        """
+        Apply booking inserts (or deletes) given only the booked flight IDs.
+        
+        Args:
+            flight_ids: Flight ID of each booking (repeat for several bookings)
+            delta: +1 for inserts, -1 for deletes
+            conn: Database connection to use (a new one is opened if None)
+        """
+        if not flight_ids:
+            return
+        
+        if conn is None:
+            with self.db_engine.connect() as own_conn:
+                info = self._flight_info(own_conn, list(set(flight_ids)))
+        else:
+            info = self._flight_info(conn, list(set(flight_ids)))
+        
+        pipe = self.client.pipeline(transaction=False)
+        for flight_id in flight_ids:
+            flight = info.get(flight_id)
+            if flight is not None:
+                self.record_booking(flight["from_iata"], flight["to_iata"], flight["departure"], delta, pipe=pipe)
+        pipe.execute()
+    
+    def get_top(self, kind: str, day: DayLike, limit: int = 10) -> List[Dict]:
+        """
+        Get the top airports of a daily leaderboard (Valkey only).
+        
+        Args:
+            kind: "flights" or "passengers"
+            day: Leaderboard day
+            limit: Number of airports to return
+        
+        Returns:
+            List of {"rank", "iata", "score"} dictionaries
+        """
+        return self._top_from_key(self.key(kind, day), limit)
+    
+    def _top_from_key(self, key: str, limit: int) -> List[Dict]:
+        """Read the top members of any leaderboard key."""
+        members = self.client.zrevrange(key, 0, limit - 1, withscores=True)
+        return [
+            {"rank": idx + 1, "iata": iata, "score": int(score)}
+            for idx, (iata, score) in enumerate(members)
+        ]
+    
+    def get_rank(self, kind: str, day: DayLike, iata: str) -> Optional[Dict]:
+        """
+        Get an airport's 1-based rank and score with one pipelined round trip.
+        
+        Returns:
+            {"rank", "iata", "score"} or None if the airport is not ranked
+        """
+        key = self.key(kind, day)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, iata.upper())
+        pipe.zscore(key, iata.upper())
+        rank, score = pipe.execute()
+        
+        if rank is None:
+            return None
+        return {"rank": rank + 1, "iata": iata.upper(), "score": int(score)}
+    
+    def publish_snapshot(self, day: DayLike, top_by_flights: List[Dict], top_by_passengers: List[Dict]) -> None:
+        """
+        Replace a day's leaderboards and details with AirportLeaderboard results.
+        
+        Both sorted sets and the details hash are swapped in one MULTI/EXEC.
+        
+        Args:
+            day: Leaderboard day
+            top_by_flights: Rows from AirportLeaderboard.get_top_airports_by_flights
+            top_by_passengers: Rows from AirportLeaderboard.get_top_airports_by_passengers
+        """
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_replace(
+            pipe,
+            day,
+            {
+                self.FLIGHTS: {row["iata"]: row["total_flights"] for row in top_by_flights},
+                self.PASSENGERS: {row["iata"]: row["total_passengers"] for row in top_by_passengers},
+            },
+            self._names(top_by_flights, top_by_passengers)
+        )
+        pipe.execute()
+    
+    @staticmethod
+    def _names(*row_lists: List[Dict]) -> Dict[str, str]:
+        """Collect IATA -> airport name from AirportLeaderboard rows."""
+        return {row["iata"]: row["name"] for rows in row_lists for row in rows}
+    
+    def _queue_replace(self, pipe: Any, day: DayLike, counts: Dict[str, Dict[str, int]], names: Dict[str, str]) -> None:
+        """Queue the replacement of a day's sorted sets and details hash."""
+        details_key = self.details_key(day)
+        keys = [self.key(kind, day) for kind in counts]
+        pipe.delete(*keys, details_key)
+        for key, scores in zip(keys, counts.values()):
+            if scores:
+                pipe.zadd(key, scores)
+        if names:
+            pipe.hset(details_key, mapping={iata: json.dumps({"name": name}) for iata, name in names.items()})
+        for key in keys + [details_key]:
+            pipe.expire(key, self.ttl_seconds)
+    
+    def get_top_with_details(self, kind: str, day: DayLike, limit: int = 10) -> List[Dict]:
+        """
+        Get the top airports of a day with their details in one round trip.
+        
+        Returns:
+            List of {"rank", "iata", "score", ...details} dictionaries
+        """
+        members, details = self._top_with_details_script(
+            keys=[self.key(kind, day), self.details_key(day)],
+            args=[limit]
+        )
+        
+        results = []
+        for idx in range(0, len(members), 2):
+            info = details[idx // 2]
+            results.append({
+                "rank": idx // 2 + 1,
+                "iata": members[idx],
+                "score": int(float(members[idx + 1])),
+                **(json.loads(info) if info else {}),
+            })
+        return results
+    
+    def get_airport(self, kind: str, day: DayLike, iata: str) -> Optional[Dict]:
+        """
+        Get an airport's rank, score and details with one pipelined round trip.
+        
+        Returns:
+            {"rank", "iata", "score", ...details} or None if the airport is not ranked
+        """
+        member = iata.upper()
+        key = self.key(kind, day)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        pipe.hget(self.details_key(day), member)
+        rank, score, info = pipe.execute()
+        
+        if rank is None:
+            return None
+        return {"rank": rank + 1, "iata": member, "score": int(score), **(json.loads(info) if info else {})}
+    
+    def _build_closed_range(self, kind: str, start: date, end: date) -> str:
+        """Build (or reuse) the cached union of completed days [start, end]."""
+        one_day = timedelta(days=1)
+        dest = self.RANGE_KEY_FORMAT.format(kind=kind, start=start, end=end)
+        keys = [
+            dest,
+            self.RANGE_KEY_FORMAT.format(kind=kind, start=start, end=end - one_day),
+            self.RANGE_KEY_FORMAT.format(kind=kind, start=start - one_day, end=end - one_day),
+            self.key(kind, end),
+            self.key(kind, start - one_day),
+        ]
+        keys += [self.key(kind, start + timedelta(days=i)) for i in range((end - start).days + 1)]
+        
+        mode = self._closed_range_script(keys=keys, args=[self.period_ttl])
+        mode = mode.decode() if isinstance(mode, bytes) else mode
+        self.build_stats[mode] += 1
+        return dest
+    
+    def build_range(self, kind: str, start_day: DayLike, end_day: DayLike) -> str:
+        """
+        Build the union of daily leaderboards for [start_day, end_day].
+        
+        Completed days come from a cached, incrementally extended union; days
+        from today on are merged live into a key cached for live_ttl.
+        
+        Args:
+            kind: "flights" or "passengers"
+            start_day: First day (inclusive)
+            end_day: Last day (inclusive)
+        
+        Returns:
+            Key of the sorted set holding the period scores
+        """
+        start, end = self.as_date(start_day), self.as_date(end_day)
+        if end < start:
+            raise ValueError(f"end_day {end} is before start_day {start}")
+        
+        today = date.today()
+        closed_end = min(end, today - timedelta(days=1))
+        closed_key = self._build_closed_range(kind, start, closed_end) if closed_end >= start else None
+        if end < today:
+            return closed_key
+        
+        dest = self.LIVE_KEY_FORMAT.format(kind=kind, start=start, end=end)
+        if self.client.exists(dest):
+            self.build_stats["cached"] += 1
+            return dest
+        
+        open_start = max(start, today)
+        sources = [self.key(kind, open_start + timedelta(days=i)) for i in range((end - open_start).days + 1)]
+        if closed_key:
+            sources.append(closed_key)
+        
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zunionstore(dest, sources)
+        pipe.expire(dest, self.live_ttl)
+        pipe.execute()
+        self.build_stats["live"] += 1
+        return dest
+    
+    @staticmethod
+    def week_bounds(day: date) -> Tuple[date, date]:
+        """Monday and Sunday of the ISO week containing day."""
+        monday = day - timedelta(days=day.weekday())
+        return monday, monday + timedelta(days=6)
+    
+    @staticmethod
+    def month_bounds(day: date) -> Tuple[date, date]:
+        """First and last day of the month containing day."""
+        first = day.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return first, next_month - timedelta(days=1)
+    
+    def get_range_top(self, kind: str, start_day: DayLike, end_day: DayLike, limit: int = 10) -> List[Dict]:
+        """Get the top airports summed over [start_day, end_day]."""
+        return self._top_from_key(self.build_range(kind, start_day, end_day), limit)
+    
+    def get_weekly_top(self, kind: str, day: Optional[DayLike] = None, limit: int = 10) -> List[Dict]:
+        """Get the top airports of the ISO week (Monday-Sunday) containing day (default: today)."""
+        return self.get_range_top(kind, *self.week_bounds(self.as_date(day or date.today())), limit=limit)
+    
+    def get_monthly_top(self, kind: str, day: Optional[DayLike] = None, limit: int = 10) -> List[Dict]:
+        """Get the top airports of the calendar month containing day (default: today)."""
+        return self.get_range_top(kind, *self.month_bounds(self.as_date(day or date.today())), limit=limit)
+    
+    def get_rolling_top(
+        self,
+        kind: str,
+        days: int = 7,
+        end_day: Optional[DayLike] = None,
+        limit: int = 10
+    ) -> List[Dict]:
+        """Get the top airports over the N days ending on end_day (default: today)."""
+        end = self.as_date(end_day or date.today())
+        return self.get_range_top(kind, end - timedelta(days=days - 1), end, limit=limit)
+    
+    def get_rank_trend(
+        self,
+        kind: str,
+        iata: str,
+        periods: int = 14,
+        granularity: str = "day",
+        end_day: Optional[DayLike] = None
+    ) -> List[Dict]:
+        """
+        Get an airport's rank and score over consecutive periods.
+        
+        Args:
+            kind: "flights" or "passengers"
+            iata: Airport IATA code
+            periods: Number of periods, oldest first in the result
+            granularity: "day", "week" or "month"
+            end_day: Day inside the last period (default: today)
+        
+        Returns:
+            List of {"start", "end", "rank", "score"} (rank/score None if unranked)
+        """
+        end = self.as_date(end_day or date.today())
+        bounds = []
+        for _ in range(periods):
+            if granularity == "day":
+                period = (end, end)
+            elif granularity == "week":
+                period = self.week_bounds(end)
+            elif granularity == "month":
+                period = self.month_bounds(end)
+            else:
+                raise ValueError(f"granularity must be day, week or month, got {granularity!r}")
+            bounds.append(period)
+            end = period[0] - timedelta(days=1)
+        bounds.reverse()
+        
+        if granularity == "day":
+            keys = [self.key(kind, start) for start, _ in bounds]
+        else:
+            keys = [self.build_range(kind, start, stop) for start, stop in bounds]
+        
+        member = iata.upper()
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrank(key, member)
+            pipe.zscore(key, member)
+        replies = pipe.execute()
+        
+        trend = []
+        for idx, (start, stop) in enumerate(bounds):
+            rank, score = replies[2 * idx], replies[2 * idx + 1]
+            trend.append({
+                "start": start.isoformat(),
+                "end": stop.isoformat(),
+                "rank": rank + 1 if rank is not None else None,
+                "score": int(score) if score is not None else None,
+            })
+        return trend
+    
+    def _sql_counts(self, day: date) -> Tuple[Dict[str, Dict[str, int]], Dict[str, str]]:
+        """
+        Compute the authoritative counts for one day with AirportLeaderboard.
+        
+        Returns:
+            Tuple of (counts per kind, IATA -> airport name)
+        """
+        if self._leaderboard is None:
+            from daos.airport_leaderboard import AirportLeaderboard
+            # Reconciliation must read the raw tables, not the daily rollup
+            self._leaderboard = AirportLeaderboard(use_rollup=False)
+            self._leaderboard.db_engine = self.db_engine
+        
+        flights = self._leaderboard.get_top_airports_by_flights(day, limit=100000)
+        passengers = self._leaderboard.get_top_airports_by_passengers(day, limit=100000)
+        counts = {
+            self.FLIGHTS: {row["iata"]: row["total_flights"] for row in flights},
+            self.PASSENGERS: {row["iata"]: row["total_passengers"] for row in passengers},
+        }
+        return counts, self._names(flights, passengers)
+    
+    def reconcile(self, day: DayLike) -> Dict[str, Dict[str, int]]:
+        """
+        Rebuild one day's leaderboards and details from SQL and swap them in atomically.
+        
+        Increments applied between the SQL read and the swap are overwritten;
+        the next reconciliation picks them up. Cached period unions that
+        include the day catch up within period_ttl.
+        
+        Args:
+            day: Day to reconcile
+        
+        Returns:
+            Per kind: {"airports", "drifted", "abs_drift"} comparing the
+            incremental scores with the SQL counts, and "legacy" (old
+            "IATA|Name|..." members replaced by the rebuild)
+        """
+        day = self.as_date(day)
+        
+        counts, names = self._sql_counts(day)
+        report = {}
+        
+        pipe = self.client.pipeline(transaction=False)
+        for kind in (self.FLIGHTS, self.PASSENGERS):
+            pipe.zrange(self.key(kind, day), 0, -1, withscores=True)
+        current = dict(zip((self.FLIGHTS, self.PASSENGERS), pipe.execute()))
+        
+        for kind, expected in counts.items():
+            actual = {iata: int(score) for iata, score in current[kind] if "|" not in iata}
+            drifted = [iata for iata in set(actual) | set(expected) if actual.get(iata, 0) != expected.get(iata, 0)]
+            report[kind] = {
+                "airports": len(expected),
+                "drifted": len(drifted),
+                "abs_drift": sum(abs(actual.get(iata, 0) - expected.get(iata, 0)) for iata in drifted),
+                "legacy": len(current[kind]) - len(actual),
+            }
+        
+        pipe = self.client.pipeline(transaction=True)
+        self._queue_replace(pipe, day, counts, names)
+        pipe.execute()
+        
+        return report
+    
+    def start_reconciliation(self, interval: float = 300.0, days_back: int = 1) -> None:
+        """
+        Reconcile today and the previous days_back days in a background thread.
+        
+        Args:
+            interval: Seconds between reconciliation passes
+            days_back: Number of past days re-checked each pass
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def _loop():
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                report = {}
+                for offset in range(days_back + 1):
+                    day = date.today() - timedelta(days=offset)
+                    try:
+                        report[day.isoformat()] = self.reconcile(day)
+                    except Exception as e:
+                        print(f"Leaderboard reconciliation error for {day}: {e}")
+                report["duration_ms"] = (time.perf_counter() - started) * 1000
+                self.last_reconciliation = report
+                self._stop_event.wait(interval)
+        
+        self._thread = threading.Thread(target=_loop, name="leaderboard-reconciler", daemon=True)
+        self._thread.start()
+    
+    def stop_reconciliation(self, timeout: Optional[float] = None) -> None:
+        """Stop the background reconciliation thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def close(self) -> None:
+        """Stop reconciliation and close connections this service created."""
+        self.stop_reconciliation()
+        if self._leaderboard is not None:
+            self._leaderboard.close()
+        if self._cache is not None:
+            self._cache.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Incremental Leaderboard Demo")
+    parser.add_argument("--date", type=str, default=None, help="Date in YYYY-MM-DD format (defaults to today)")
+    args = parser.parse_args()
+    
+    query_date = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    service = LeaderboardService()
+    
+    print("=" * 80)
+    print("Incremental Leaderboard Demo")
+    print("=" * 80)
+    
+    print(f"\n1. Reconciling {query_date} from SQL:")
+    start = time.perf_counter()
+    report = service.reconcile(query_date)
+    print(f"   {report} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    
+    print("\n2. Top 5 airports by flights (Valkey only):")
+    start = time.perf_counter()
+    top = service.get_top(LeaderboardService.FLIGHTS, query_date, limit=5)
+    latency = (time.perf_counter() - start) * 1000
+    for row in top:
+        print(f"   #{row['rank']}: {row['iata']} - {row['score']} flights")
+    print(f"   Read latency: {latency:.2f} ms")
+    
+    if top:
+        iata = top[0]["iata"]
+        print(f"\n3. Recording a new booking on a {iata} departure:")
+        service.record_booking(iata, None, query_date)
+        print(f"   {service.get_rank(LeaderboardService.PASSENGERS, query_date, iata)}")
+        
+        print("\n4. Reconciling again (the synthetic booking shows up as drift):")
+        print(f"   {service.reconcile(query_date)}")
+        
+        print("\n5. Rolling 7-day, weekly and monthly leaders (ZUNIONSTORE over daily sets):")
+        for label, rows in (
+            ("7 days ", service.get_rolling_top(LeaderboardService.FLIGHTS, 7, query_date, limit=3)),
+            ("Week   ", service.get_weekly_top(LeaderboardService.FLIGHTS, query_date, limit=3)),
+            ("Month  ", service.get_monthly_top(LeaderboardService.FLIGHTS, query_date, limit=3)),
+        ):
+            print(f"   {label}: " + ", ".join(f"{row['iata']} ({row['score']})" for row in rows))
+        
+        start = time.perf_counter()
+        service.get_rolling_top(LeaderboardService.FLIGHTS, 7, query_date + timedelta(days=1), limit=3)
+        print(f"   Next day's rolling window: {(time.perf_counter() - start) * 1000:.2f} ms")
+        print(f"   Build stats: {service.build_stats}")
+        
+        print(f"\n6. {iata} weekly rank trend:")
+        for point in service.get_rank_trend(LeaderboardService.FLIGHTS, iata, periods=4, granularity="week", end_day=query_date):
+            print(f"   {point['start']}..{point['end']}: rank {point['rank']}, {point['score']} flights")
+    
+    service.close()
+    print("\n" + "=" * 80)
@@ -0,0 +1,275 @@
+"""
+Refresh-Ahead Scheduler for the Weather City Catalog
+
+WeatherService.CITIES is a fixed, known set, so instead of letting the first
+request after expiry pay the full upstream delay, this scheduler re-fetches
+each key shortly before its TTL runs out:
+
+- Every catalog city (or the top-N by request count) is tracked
+- A key is refreshed once its remaining TTL drops below refresh_margin plus a
+  per-key random jitter, and the new TTL is jittered too, so refreshes spread
+  out instead of bursting
+- Refreshes draw from a shared RateLimiter budget; throttled refreshes simply
+  wait for the next tick
+- Requests served through get() are counted, so the fraction served from cache
+  with zero added latency can be reported
+
+This module provides:
+- RefreshAheadScheduler: Background refresher plus a request front-end (get)
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path when running as script
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import RateLimiter
+from daos.weather_api_cache import WeatherAPICache
+from services.weather_service import WeatherService
+
+
+class RefreshAheadScheduler:
+    """Keeps catalog weather keys warm by refreshing them before they expire."""
+    
+    # Sorted set of request counts per catalog city (member: "<country>_<zip>")
+    REQUESTS_KEY = "stats:weather:requests"
+    
+    def __init__(
+        self,
+        cache: WeatherAPICache,
+        refresh_margin: float = 60.0,
+        jitter: float = 30.0,
+        max_refresh_qps: float = 2.0,
+        top_n: Optional[int] = None,
+        tick_interval: float = 1.0,
+        max_workers: int = 4,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            cache: WeatherAPICache used for reads, refreshes and upstream protection
+            refresh_margin: Refresh a key when this many seconds of TTL remain
+            jitter: Maximum random seconds added to the margin and removed from new TTLs
+            max_refresh_qps: Upstream refresh budget (ignored if rate_limiter is given)
+            top_n: Only keep the N most requested cities warm (None = whole catalog)
+            tick_interval: Seconds between TTL scans
+            max_workers: Concurrent refreshes per tick
+            rate_limiter: Shared refresh budget (defaults to "weather-refresh")
+        """
+        self.cache = cache
+        self.client = cache.client
+        self.refresh_margin = refresh_margin
+        self.jitter = jitter
+        self.top_n = top_n
+        self.tick_interval = tick_interval
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or RateLimiter(
+            self.client, "weather-refresh", rate=max_refresh_qps
+        )
+        
+        self.catalog = {
+            f"{city['country']}_{city['zip']}": (city["country"], city["zip"])
+            for city in WeatherService.get_all_cities()
+        }
+        
+        # Fixed per-key jitter so each key refreshes at a stable, spread-out offset
+        self._key_jitter = {member: random.uniform(0, jitter) for member in self.catalog}
+        
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+    
+    def reset_stats(self) -> None:
+        """Reset request and refresh counters."""
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "hits": 0,
+                "misses": 0,
+                "refreshed": 0,
+                "refresh_throttled": 0,
+                "refresh_errors": 0,
+                "ticks": 0,
+            }
+    
+    def get(self, country: str, zip_code: str) -> Optional[Any]:
+        """
+        Serve a weather request and record it for hit-rate and top-N tracking.
+        
+        Args:
+            country: Two-letter country code
+            zip_code: Zip/postal code
+        
+        Returns:
+            Weather data or None if unavailable
+        """
+        key = self.cache.weather_key(country, zip_code)
+        
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.zincrby(self.REQUESTS_KEY, 1, f"{country}_{zip_code}")
+        cached, _ = pipe.execute()
+        
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["hits" if cached is not None else "misses"] += 1
+        
+        if cached is not None:
+            return json.loads(cached)
+        return self.cache.get_weather(country, zip_code)
+    
+    def tracked_cities(self) -> List[Tuple[str, str]]:
+        """Get the (country, zip) pairs kept warm (top-N by requests or whole catalog)."""
+        if self.top_n is None:
+            return list(self.catalog.values())
+        
+        members = self.client.zrevrange(self.REQUESTS_KEY, 0, self.top_n - 1)
+        return [self.catalog[member] for member in members if member in self.catalog]
+    
+    def due_for_refresh(self) -> List[Tuple[str, str]]:
+        """
+        Find tracked cities whose remaining TTL is within their refresh window.
+        
+        Returns:
+            (country, zip) pairs ordered by soonest expiry (missing keys first)
+        """
+        cities = self.tracked_cities()
+        if not cities:
+            return []
+        
+        pipe = self.client.pipeline(transaction=False)
+        for country, zip_code in cities:
+            pipe.pttl(self.cache.weather_key(country, zip_code))
+        remaining_ms = pipe.execute()
+        
+        due = []
+        for (country, zip_code), pttl in zip(cities, remaining_ms):
+            window = self.refresh_margin + self._key_jitter[f"{country}_{zip_code}"]
+            # -2 = missing (refresh now), -1 = no expiry (leave alone)
+            if pttl == -2 or (pttl >= 0 and pttl / 1000 <= window):
+                due.append((pttl, country, zip_code))
+        
+        due.sort()
+        return [(country, zip_code) for _, country, zip_code in due]
+    
+    def _refresh(self, location: Tuple[str, str]) -> Optional[bool]:
+        """Refresh one key if the budget allows (None = throttled or refreshing elsewhere)."""
+        if not self.rate_limiter.acquire():
+            return None
+        
+        # Jittered TTL so keys loaded together drift apart over time
+        ttl = max(1, int(self.cache.default_ttl - random.uniform(0, self.jitter)))
+        return self.cache.refresh(*location, ttl=ttl)
+    
+    def run_once(self) -> Dict[str, int]:
+        """
+        Run one scan-and-refresh tick.
+        
+        Returns:
+            Dictionary with due, refreshed, throttled and errors for this tick
+        """
+        due = self.due_for_refresh()
+        result = {"due": len(due), "refreshed": 0, "throttled": 0, "errors": 0}
+        
+        if due:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(due)))) as executor:
+                for outcome in executor.map(self._refresh, due):
+                    if outcome is None:
+                        result["throttled"] += 1
+                    elif outcome:
+                        result["refreshed"] += 1
+                    else:
+                        result["errors"] += 1
+        
+        with self._lock:
+            self.stats["ticks"] += 1
+            self.stats["refreshed"] += result["refreshed"]
+            self.stats["refresh_throttled"] += result["throttled"]
+            self.stats["refresh_errors"] += result["errors"]
+        return result
+    
+    def start(self) -> None:
+        """Start refreshing in a background daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def _loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Refresh-ahead error: {e}")
+                self._stop_event.wait(self.tick_interval)
+        
+        self._thread = threading.Thread(target=_loop, name="refresh-ahead", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background refresh thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request and refresh counters.
+        
+        Returns:
+            Dictionary with requests, hits, misses, refreshed, refresh_throttled,
+            refresh_errors, ticks and zero_latency_rate (hits / requests)
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["zero_latency_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Refresh-Ahead Scheduler Demo")
+    print("=" * 60)
+    
+    # Short TTL so expiry happens during the demo
+    cache = WeatherAPICache(default_ttl=15)
+    cities = [(c["country"], c["zip"]) for c in WeatherService.get_all_cities()[:10]]
+    for country, zip_code in cities:
+        cache.delete(cache.weather_key(country, zip_code))
+    
+    def simulate(scheduler: RefreshAheadScheduler, duration: float) -> Dict[str, Any]:
+        scheduler.reset_stats()
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            scheduler.get(*random.choice(cities))
+            time.sleep(0.05)
+        return scheduler.get_stats()
+    
+    print("\n1. Without refresh-ahead (30s, TTL 15s):")
+    scheduler = RefreshAheadScheduler(cache, refresh_margin=5, jitter=3, max_refresh_qps=5, top_n=10)
+    stats = simulate(scheduler, 30)
+    print(f"   Requests: {stats['requests']}, zero-latency: {stats['zero_latency_rate']:.1%}")
+    
+    print("\n2. With refresh-ahead (30s, TTL 15s, margin 5s + up to 3s jitter):")
+    scheduler.start()
+    stats = simulate(scheduler, 30)
+    scheduler.stop()
+    print(f"   Requests: {stats['requests']}, zero-latency: {stats['zero_latency_rate']:.1%}")
+    print(f"   Refreshed: {stats['refreshed']}, throttled: {stats['refresh_throttled']}")
+    
+    cache.close()
+    print("\n" + "=" * 60)
@@ -6,6 +6,7 @@ Uses embeddings to find similar queries and caches results in Valkey/Redis
 import json
 import time
 import os
+import threading
 from typing import Optional, Dict, Any, List
 import numpy as np
 from dotenv import load_dotenv
@@ -36,17 +37,116 @@ except ModuleNotFoundError:
     from nlp_to_sql import NLPToSQL
 
 
+# Capacity bookkeeping. An entry is one cached result (db:query:<sql_hash>)
+# together with every embedding and semantic mapping that points at it
+ENTRY_MEMBERS_KEY_FORMAT = "semantic:entry:{sql_hash}"  # SET of mapping keys
+LRU_KEY = "semantic:lru"        # ZSET sql_hash -> last hit (unix time)
+LFU_KEY = "semantic:lfu"        # ZSET sql_hash -> hit count
+SIZE_KEY = "semantic:size"      # ZSET sql_hash -> approximate bytes
+EXPIRY_KEY = "semantic:expiry"  # ZSET sql_hash -> expiry (unix time)
+BYTES_KEY = "semantic:bytes"    # STRING total approximate bytes
+
+# semantic:entry:<hash> outlives its entry by this many seconds, so the janitor
+# still finds the embeddings of an expired entry to drop from the local index
+ENTRY_MEMBERS_GRACE = 86400
+
+EVICTION_POLICIES = {"lru": LRU_KEY, "lfu": LFU_KEY}
+
+
+# Evict entries atomically: the result, its mapping keys and its bookkeeping.
+# A mapping is only deleted while it still points at the evicted result (a
+# prompt may have been re-cached for another result since).
+# KEYS: lru, lfu, size, expiry, bytes   ARGV: sql hashes
+# Returns the embedding keys removed, including those that had already expired
+# The result, entry and mapping keys are derived from ARGV and the entry sets
+# rather than declared in KEYS, so this needs a standalone (non-cluster) Valkey
+EVICT_SCRIPT = """
+local deleted = {}
+for _, sql_hash in ipairs(ARGV) do
+    local query_key = 'db:query:' .. sql_hash
+    local members_key = 'semantic:entry:' .. sql_hash
+    for _, member in ipairs(redis.call('SMEMBERS', members_key)) do
+        if string.sub(member, 1, 17) == 'embedding:prompt:' then
+            if redis.call('HGET', member, 'query_key') == query_key then
+                redis.call('UNLINK', member)
+                table.insert(deleted, member)
+            elseif redis.call('EXISTS', member) == 0 then
+                table.insert(deleted, member)
+            end
+        elseif redis.call('GET', member) == query_key then
+            redis.call('UNLINK', member)
+        end
+    end
+    redis.call('UNLINK', members_key, query_key)
+    
+    local size = redis.call('ZSCORE', KEYS[3], sql_hash)
+    if size then
+        redis.call('DECRBY', KEYS[5], math.floor(tonumber(size)))
+    end
+    for i = 1, 4 do
+        redis.call('ZREM', KEYS[i], sql_hash)
+    end
+end
+return deleted
+"""
+
+# Map another prompt to an entry unless the entry has expired or been evicted
+# (PTTL -2), so no mapping or bookkeeping is left without its result.
+# KEYS: semantic key, query key, entry members, size, bytes   ARGV: sql hash
+# Returns 1 if the mapping was added
+ALIAS_SCRIPT = """
+local ttl = redis.call('PTTL', KEYS[2])
+if ttl == -2 or redis.call('GET', KEYS[1]) == KEYS[2] then
+    return 0
+end
+if ttl > 0 then
+    redis.call('SET', KEYS[1], KEYS[2], 'PX', ttl)
+else
+    redis.call('SET', KEYS[1], KEYS[2])
+end
+redis.call('SADD', KEYS[3], KEYS[1])
+local size = string.len(KEYS[1]) + string.len(KEYS[2])
+redis.call('ZINCRBY', KEYS[4], size, ARGV[1])
+redis.call('INCRBY', KEYS[5], size)
+return 1
+"""
+
+
 class SemanticSQLCache:
     """
     Semantic search cache for SQL queries using embeddings and Valkey/Redis
     
-    Key structure:
+    Key structure (<hash> / <hash2>: SHA1 of the prompt / SQL within the
+    model, schema_version and tenant scope):
     - semantic:prompt:<hash>  -> db:query:<hash2>  (maps prompt to query result key)
     - db:query:<hash2>        -> {sql, time_taken, tokens, etc.}  (NLP result)
     - db:cache:<hash2>        -> <actual query result>  (SQL execution result)
-    - embedding:prompt:<hash> -> <embedding vector>  (prompt embedding)
+    - embedding:prompt:<hash> -> <embedding vector>  (prompt embedding, FLOAT32 or FLOAT16 bytes)
+                                 + model, schema_version, tenant (TAG), created_at (NUMERIC)
+    - emb:<sha1>              -> <float32 bytes>  (content-addressed embedding cache)
+    - semantic:entry:<hash2>  -> {embedding/semantic keys of db:query:<hash2>}
+    - semantic:lru / semantic:lfu / semantic:size / semantic:expiry (ZSETs by <hash2>)
+      and semantic:bytes: capacity bookkeeping
+    
+    The keys of an entry share one TTL (entry_ttl). A background janitor evicts
+    expired entries and, by LRU or LFU, enough others to stay within max_entries
+    and max_bytes; an eviction removes the result and all its mappings atomically.
+    
+    Similarity lookups are hybrid queries: the KNN only ranks embeddings of the
+    same LLM model, schema version and tenant (and, with max_entry_age, recent
+    ones), so SQL generated for another model or schema never matches.
     """
     
+    # Indexed alongside the embedding; the TAG/NUMERIC pre-filter fields
+    INDEX_FIELDS = [
+        ("prompt", "TAG"),
+        ("query_key", "TAG"),
+        ("model", "TAG"),
+        ("schema_version", "TAG"),
+        ("tenant", "TAG"),
+        ("created_at", "NUMERIC"),
+    ]
+    
     def __init__(
         self,
         valkey_host: str = None,
@@ -56,7 +156,19 @@ class SemanticSQLCache:
         ollama_model: str = None,
         use_mmr: bool = False,
         mmr_lambda: float = 0.5,
-        verbose: bool = False
+        verbose: bool = False,
+        embedding_batch_window_ms: float = None,
+        warm_model: bool = None,
+        vector_type: str = None,
+        local_index_precision: str = None,
+        schema_version: str = None,
+        tenant: str = None,
+        max_entry_age: int = None,
+        entry_ttl: int = None,
+        max_entries: int = None,
+        max_bytes: int = None,
+        eviction_policy: str = None,
+        janitor_interval: float = None
     ):
         # Use environment variables with fallbacks
         if valkey_host is None:
@@ -69,11 +181,50 @@ class SemanticSQLCache:
             similarity_threshold = float(os.getenv("SIMILARITY_THRESHOLD", "0.70"))
         if ollama_model is None:
             ollama_model = os.getenv("OLLAMA_MODEL", "codellama")
+        if embedding_batch_window_ms is None:
+            # 0 disables micro-batching of concurrent embedding requests
+            embedding_batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "0"))
+        if warm_model is None:
+            warm_model = os.getenv("EMBEDDING_WARMUP", "false").lower() in ("1", "true", "yes")
+        if schema_version is None:
+            schema_version = os.getenv("SCHEMA_VERSION", "1")
+        if tenant is None:
+            tenant = os.getenv("CACHE_TENANT", "default")
+        if max_entry_age is None:
+            # Seconds; 0 lets entries of any age match
+            max_entry_age = int(os.getenv("SEMANTIC_MAX_AGE_SECONDS", "0"))
+        if entry_ttl is None:
+            # Seconds; 0 keeps entries until evicted
+            entry_ttl = int(os.getenv("SEMANTIC_CACHE_TTL", "604800"))
+        if max_entries is None:
+            max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", "0"))
+        if eviction_policy is None:
+            eviction_policy = os.getenv("SEMANTIC_CACHE_EVICTION", "lru")
+        if janitor_interval is None:
+            # Seconds between janitor passes; 0 disables the background janitor
+            janitor_interval = float(os.getenv("SEMANTIC_CACHE_JANITOR_INTERVAL", "60"))
+        
+        eviction_policy = eviction_policy.lower()
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"eviction_policy must be one of {list(EVICTION_POLICIES)}, got {eviction_policy!r}")
         
         self.verbose = verbose
         self.embedding_model_name = embedding_model
         self.use_mmr = use_mmr
         self.mmr_lambda = mmr_lambda
+        self.embedding_batch_window_ms = embedding_batch_window_ms
+        # None: SemanticSearch reads VECTOR_TYPE / LOCAL_INDEX_PRECISION
+        self.vector_type = vector_type
+        self.local_index_precision = local_index_precision
+        self.schema_version = str(schema_version)
+        self.tenant = tenant
+        self.max_entry_age = max_entry_age
+        self.entry_ttl = entry_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
         
         # Connect to Valkey
         if verbose:
@@ -104,6 +255,12 @@ class SemanticSQLCache:
         # Lazy-loaded semantic search instance
         self._semantic_search = None
         
+        self._evict_script = self.valkey_client.register_script(EVICT_SCRIPT)
+        self._alias_script = self.valkey_client.register_script(ALIAS_SCRIPT)
+        self._janitor_thread: Optional[threading.Thread] = None
+        self._janitor_stop = threading.Event()
+        self.last_janitor_run: Optional[Dict] = None
+        
         # Initialize NLP to SQL converter
         self.nlp_converter = NLPToSQL(model=ollama_model)
         
@@ -116,35 +273,55 @@ class SemanticSQLCache:
             print(f"{'='*70}")
             print(f"Similarity threshold: {similarity_threshold}")
             print(f"Ollama model: {ollama_model}")
+            print(f"Schema version: {self.schema_version}")
+            print(f"Tenant: {tenant}")
+            print(f"Entry TTL: {entry_ttl or 'none'}")
+            print(f"Budget: {max_entries or 'unlimited'} entries, {max_bytes or 'unlimited'} bytes ({eviction_policy.upper()})")
             print(f"Embedding model: {embedding_model}")
             print(f"Use MMR reranking: {use_mmr}")
             if use_mmr:
                 print(f"MMR lambda (relevance/diversity): {mmr_lambda}")
         
-        # Create vector search index if it doesn't exist
+        # Create vector search index if it doesn't exist. The dimension comes
+        # from configuration, so this does not load the embedding model
         self._create_index(verbose=verbose)
+        
+        # Optionally load the model in the background so the first semantic
+        # lookup does not pay for it (exact hits never need it)
+        if warm_model:
+            self.semantic_search.warm_up(background=True)
+        
+        if janitor_interval > 0 and (entry_ttl or max_entries or max_bytes):
+            self.start_janitor(janitor_interval)
     
     @property
     def semantic_search(self) -> SemanticSearch:
-        """Lazy-load the semantic search instance"""
+        """Lazy-load the semantic search instance (the model itself loads on first embedding)"""
         if self._semantic_search is None:
             self._semantic_search = SemanticSearch(
                 valkey_client=self.valkey_client,
                 embedding_model=self.embedding_model_name,
                 use_mmr=self.use_mmr,
                 mmr_lambda=self.mmr_lambda,
-                verbose=self.verbose
+                verbose=self.verbose,
+                vector_type=self.vector_type,
+                local_index_precision=self.local_index_precision
             )
+            if self.embedding_batch_window_ms > 0:
+                self._semantic_search.start_batching(max_wait_ms=self.embedding_batch_window_ms)
         return self._semantic_search
     
     def _create_index(self, verbose=False):
         """Create vector search index for prompt embeddings"""
-        # Lazy load semantic search to create the index
+        # Lazy load semantic search to create the index. An index created
+        # before a filter field was added is rebuilt from the stored hashes,
+        # since every lookup filters on INDEX_FIELDS
         self.semantic_search.create_vector_index(
             index_name="prompt_embeddings",
             key_prefix="embedding:prompt:",
-            additional_fields=[("prompt", "TAG"), ("query_key", "TAG")],
-            verbose=verbose
+            additional_fields=self.INDEX_FIELDS,
+            verbose=verbose,
+            recreate=True
         )
     
     def _hash_text(self, text: str) -> str:
@@ -155,15 +332,45 @@ class SemanticSQLCache:
         """Generate embedding vector for text"""
         return self.semantic_search.generate_embedding(text)
     
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for several prompts in one batched model call"""
+        return self.semantic_search.generate_embeddings(texts)
+    
+    def _entry_scope(self) -> Dict[str, str]:
+        """TAG values every cached entry is stored with and looked up by"""
+        return {
+            "model": self.nlp_converter.model,
+            "schema_version": self.schema_version,
+            "tenant": self.tenant,
+        }
+    
+    def _scoped_hash(self, text: str) -> str:
+        """
+        SHA1 of text within the entry scope.
+        
+        Prompt and SQL keys use this hash, so two models, schema versions or
+        tenants caching the same prompt (or SQL) write separate entries and
+        aliases instead of overwriting each other.
+        """
+        return self._hash_text(json.dumps(self._entry_scope(), sort_keys=True) + "\n" + text)
+    
+    def _lookup_filters(self) -> Dict[str, Any]:
+        """Pre-filter for similarity lookups: same scope, optionally not too old"""
+        filters: Dict[str, Any] = dict(self._entry_scope())
+        if self.max_entry_age > 0:
+            filters["created_at"] = (int(time.time()) - self.max_entry_age, None)
+        return filters
+    
     def _search_similar_prompts(self, embedding: np.ndarray, k: int = 5) -> List[Dict]:
         """Search for similar prompts using vector search or fallback to brute force"""
         return self.semantic_search.search_similar(
             embedding=embedding,
             index_name="prompt_embeddings",
             key_prefix="embedding:prompt:",
-            k=k
+            k=k,
+            filters=self._lookup_filters()
         )
-
+    
     def get_or_generate_sql(self, prompt: str, verbose: bool = True) -> Dict[str, Any]:
         """
         Get SQL for a prompt, using cache if similar query exists
@@ -173,11 +380,8 @@ class SemanticSQLCache:
         """
         start_time = time.time()
         
-        # Generate hash and embedding for the prompt
-        prompt_hash = self._hash_text(prompt)
-        prompt_embedding = self._generate_embedding(prompt)
-        
-        # Check if we have an exact match first
+        # Check if we have an exact match first (no embedding needed)
+        prompt_hash = self._scoped_hash(prompt)
         semantic_key = f"semantic:prompt:{prompt_hash}"
         cached_query_key = self.valkey_client.get(semantic_key)
         
@@ -188,10 +392,18 @@ class SemanticSQLCache:
                 print(f"   Semantic key: {semantic_key}")
                 print(f"   Query key: {cached_query_key}")
             
-            # Get the cached query result
+            # Get the cached query result (keys written before scoped hashes
+            # may still point to another scope's entry: treat those as misses)
             query_data = self.valkey_client.get(cached_query_key)
-            if query_data:
-                result = json.loads(query_data.decode('utf-8'))
+            result = json.loads(query_data.decode('utf-8')) if query_data else None
+            if result and any(
+                result.get(field, value) != value for field, value in self._entry_scope().items()
+            ):
+                if verbose:
+                    print(f"   ↪️  Cached for another model/schema/tenant; ignoring")
+                result = None
+            if result:
+                self._record_hit(cached_query_key)
                 result['cache_hit'] = True
                 result['cache_type'] = 'exact'
                 result['lookup_time'] = round(time.time() - start_time, 3)
@@ -199,6 +411,9 @@ class SemanticSQLCache:
                     print(f"   SQL: {result.get('sql', 'N/A')[:80]}...")
                 return result
         
+        # Only now pay for the embedding (cached by content in emb:<sha1>)
+        prompt_embedding = self._generate_embedding(prompt)
+        
         # Search for similar prompts
         if verbose:
             print(f"🔍 Searching for similar prompts...")
@@ -241,7 +456,8 @@ class SemanticSQLCache:
                     result['lookup_time'] = round(time.time() - start_time, 3)
                     
                     # Also cache this exact prompt for future exact matches
-                    self.valkey_client.set(semantic_key, similar['query_key'])
+                    self._record_hit(similar['query_key'])
+                    self._add_alias(semantic_key, similar['query_key'])
                     
                     return result
         
@@ -250,11 +466,12 @@ class SemanticSQLCache:
             print(f"🤖 No similar prompt found. Generating new SQL with LLM...")
         
         result = self.nlp_converter.generate_sql(prompt)
+        result.update(self._entry_scope())
         result['cache_hit'] = False
         result['lookup_time'] = round(time.time() - start_time, 3)
         
         # Cache the result
-        sql_hash = self._hash_text(result['sql'])
+        sql_hash = self._scoped_hash(result['sql'])
         query_key = f"db:query:{sql_hash}"
         
         if verbose:
@@ -262,30 +479,48 @@ class SemanticSQLCache:
             print(f"💾 Caching new result:")
             print(f"{'─'*70}")
         
-        # Store the query result
-        self.valkey_client.set(query_key, json.dumps(result))
+        # Write the result, the semantic mapping and the embedding (in the
+        # index's storage type) in one transaction, with one TTL for all three
+        embedding_key = f"embedding:prompt:{prompt_hash}"
+        embedding_fields = {
+            "prompt": prompt,
+            "query_key": query_key,
+            **self._entry_scope(),
+            "created_at": str(int(time.time()))
+        }
+        result_json = json.dumps(result)
+        embedding_bytes = self.semantic_search.vector_bytes(prompt_embedding)
+        entry_bytes = (
+            len(query_key) + len(result_json)
+            + len(semantic_key) + len(query_key)
+            + len(embedding_key) + len(embedding_bytes)
+            + sum(len(name) + len(value) for name, value in embedding_fields.items())
+        )
+        
+        ttl = self.entry_ttl or None
+        pipe = self.valkey_client.pipeline(transaction=True)
+        pipe.set(query_key, result_json, ex=ttl)
+        pipe.set(semantic_key, query_key, ex=ttl)
+        pipe.hset(embedding_key, mapping={**embedding_fields, "embedding": embedding_bytes})
+        if ttl:
+            pipe.expire(embedding_key, ttl)
+        self._register_entry(pipe, sql_hash, [embedding_key, semantic_key], entry_bytes)
+        pipe.execute()
+        
         if verbose:
             print(f"\n1️⃣  Query Result Key:")
             print(f"   Key: {query_key}")
             print(f"   Value: {json.dumps(result, indent=2)}")
-        
-        # Store the semantic mapping
-        self.valkey_client.set(semantic_key, query_key)
-        if verbose:
             print(f"\n2️⃣  Semantic Mapping Key:")
             print(f"   Key: {semantic_key}")
             print(f"   Value: {query_key}")
+            print(f"   TTL (all keys): {self.entry_ttl or 'none'}")
         
-        # Store the embedding for vector search
-        embedding_key = f"embedding:prompt:{prompt_hash}"
-        embedding_data = {
-            "prompt": prompt,
-            "query_key": query_key,
-            "embedding": prompt_embedding.astype(np.float32).tobytes()
-        }
-        self.valkey_client.hset(
+        self.semantic_search.index_embedding(
+            "embedding:prompt:",
             embedding_key,
-            mapping=embedding_data
+            prompt_embedding,
+            embedding_fields
         )
         if verbose:
             print(f"\n3️⃣  Embedding Hash Key:")
@@ -293,18 +528,161 @@ class SemanticSQLCache:
             print(f"   Fields:")
             print(f"     - prompt: {prompt}")
             print(f"     - query_key: {query_key}")
-            print(f"     - embedding: <{len(prompt_embedding)} dimensional vector>")
+            print(f"     - model / schema_version / tenant: {self.nlp_converter.model} / {self.schema_version} / {self.tenant}")
+            print(f"     - created_at: {embedding_fields['created_at']}")
+            print(f"     - embedding: <{len(prompt_embedding)} dimensional {self.semantic_search.vector_type} vector>")
             print(f"   Vector preview: [{prompt_embedding[:3].tolist()}...{prompt_embedding[-3:].tolist()}]")
             print(f"{'─'*70}\n")
         
         return result
     
+    @staticmethod
+    def _sql_hash(query_key: Any) -> str:
+        """<sql_hash> of a db:query:<sql_hash> key (str or bytes)"""
+        if isinstance(query_key, bytes):
+            query_key = query_key.decode('utf-8')
+        return query_key.rsplit(":", 1)[-1]
+    
+    def _register_entry(self, pipe, sql_hash: str, member_keys: List[str], entry_bytes: int) -> None:
+        """Queue the capacity bookkeeping of a newly written entry on pipe"""
+        now = time.time()
+        members_key = ENTRY_MEMBERS_KEY_FORMAT.format(sql_hash=sql_hash)
+        pipe.sadd(members_key, *member_keys)
+        pipe.zadd(LRU_KEY, {sql_hash: now})
+        pipe.zadd(LFU_KEY, {sql_hash: 1}, nx=True)
+        pipe.zincrby(SIZE_KEY, entry_bytes, sql_hash)
+        pipe.incrby(BYTES_KEY, entry_bytes)
+        if self.entry_ttl:
+            pipe.expire(members_key, self.entry_ttl + ENTRY_MEMBERS_GRACE)
+            pipe.zadd(EXPIRY_KEY, {sql_hash: now + self.entry_ttl})
+    
+    def _record_hit(self, query_key: Any) -> None:
+        """Update last-hit time and hit count (XX: evicted entries are not revived)"""
+        sql_hash = self._sql_hash(query_key)
+        pipe = self.valkey_client.pipeline(transaction=False)
+        pipe.zadd(LRU_KEY, {sql_hash: time.time()}, xx=True)
+        pipe.zadd(LFU_KEY, {sql_hash: 1}, xx=True, incr=True)
+        pipe.execute()
+    
+    def _add_alias(self, semantic_key: str, query_key: Any) -> bool:
+        """
+        Map another prompt to an entry, expiring together with the entry.
+        
+        Returns:
+            False if the entry is gone (or the prompt already maps to it)
+        """
+        if isinstance(query_key, bytes):
+            query_key = query_key.decode('utf-8')
+        sql_hash = self._sql_hash(query_key)
+        return bool(self._alias_script(
+            keys=[semantic_key, query_key, ENTRY_MEMBERS_KEY_FORMAT.format(sql_hash=sql_hash), SIZE_KEY, BYTES_KEY],
+            args=[sql_hash]
+        ))
+    
+    def evict(self, sql_hashes: List[str]) -> int:
+        """
+        Evict entries (result, embeddings, semantic mappings, bookkeeping) atomically.
+        
+        Args:
+            sql_hashes: <sql_hash> of each db:query:<sql_hash> to evict
+        
+        Returns:
+            Number of embeddings removed (deleted, or already expired)
+        """
+        if not sql_hashes:
+            return 0
+        
+        deleted = self._evict_script(
+            keys=[LRU_KEY, LFU_KEY, SIZE_KEY, EXPIRY_KEY, BYTES_KEY],
+            args=[self._sql_hash(sql_hash) for sql_hash in sql_hashes]
+        )
+        if self._semantic_search is not None:
+            for key in deleted:
+                self._semantic_search.unindex_embedding(
+                    "embedding:prompt:",
+                    key.decode('utf-8') if isinstance(key, bytes) else key
+                )
+        return len(deleted)
+    
+    def enforce_budget(self, batch_size: int = 100) -> Dict[str, Any]:
+        """
+        One janitor pass: evict expired entries, then the least recently (LRU) or
+        least frequently (LFU) hit entries until within max_entries / max_bytes.
+        
+        Returns:
+            Report with expired, evicted, entries, bytes and duration_ms
+        """
+        started = time.perf_counter()
+        report = {"expired": 0, "evicted": 0}
+        
+        # Expired keys are gone already; drop their remaining mappings and bookkeeping
+        while True:
+            expired = self.valkey_client.zrangebyscore(EXPIRY_KEY, "-inf", time.time(), start=0, num=batch_size)
+            if not expired:
+                break
+            self.evict(expired)
+            report["expired"] += len(expired)
+        
+        policy_key = EVICTION_POLICIES[self.eviction_policy]
+        while True:
+            entries = self.valkey_client.zcard(LRU_KEY)
+            total_bytes = int(self.valkey_client.get(BYTES_KEY) or 0)
+            over_entries = self.max_entries and entries > self.max_entries
+            over_bytes = self.max_bytes and total_bytes > self.max_bytes
+            if not (over_entries or over_bytes):
+                break
+            
+            count = min(batch_size, entries - self.max_entries) if over_entries else batch_size
+            victims = self.valkey_client.zrange(policy_key, 0, max(1, count) - 1)
+            if not victims:
+                break
+            self.evict(victims)
+            report["evicted"] += len(victims)
+        
+        report["entries"] = entries
+        report["bytes"] = total_bytes
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+    
+    def start_janitor(self, interval: float = 60.0) -> None:
+        """
+        Start the background janitor thread (enforce_budget every interval seconds).
+        
+        Args:
+            interval: Seconds between janitor passes
+        """
+        if self._janitor_thread and self._janitor_thread.is_alive():
+            return
+        
+        self._janitor_stop.clear()
+        
+        def _loop():
+            while not self._janitor_stop.is_set():
+                try:
+                    self.last_janitor_run = self.enforce_budget()
+                except Exception as e:
+                    print(f"Semantic cache janitor error: {e}")
+                self._janitor_stop.wait(interval)
+        
+        self._janitor_thread = threading.Thread(target=_loop, name="semantic-cache-janitor", daemon=True)
+        self._janitor_thread.start()
+    
+    def stop_janitor(self, timeout: Optional[float] = None) -> None:
+        """Stop the background janitor thread."""
+        self._janitor_stop.set()
+        if self._janitor_thread:
+            self._janitor_thread.join(timeout)
+            self._janitor_thread = None
+    
     def get_cache_stats(self) -> Dict[str, int]:
         """Get cache statistics"""
         stats = {
             "total_prompts": len(self.valkey_client.keys("semantic:prompt:*")),
             "total_queries": len(self.valkey_client.keys("db:query:*")),
             "total_embeddings": len(self.valkey_client.keys("embedding:prompt:*")),
+            "cached_embeddings": len(self.valkey_client.keys(SemanticSearch.EMBEDDING_KEY_PREFIX + "*")),
+            "tracked_entries": self.valkey_client.zcard(LRU_KEY),
+            "tracked_bytes": int(self.valkey_client.get(BYTES_KEY) or 0),
         }
         return stats
     
@@ -322,6 +700,13 @@ class SemanticSQLCache:
         for key in self.valkey_client.scan_iter("embedding:prompt:*"):
             self.valkey_client.delete(key)
         
+        for key in self.valkey_client.scan_iter("semantic:entry:*"):
+            self.valkey_client.delete(key)
+        self.valkey_client.delete(LRU_KEY, LFU_KEY, SIZE_KEY, EXPIRY_KEY, BYTES_KEY)
+        
+        if self._semantic_search is not None:
+            self._semantic_search.drop_local_index("embedding:prompt:")
+        
         print("✅ Cache cleared")
     
     def drop_index(self):
@@ -340,6 +725,7 @@ def main():
     parser.add_argument('--verbose', action='store_true', help='Enable verbose output')
     parser.add_argument('--mmr', action='store_true', help='Enable MMR (Maximal Marginal Relevance) reranking for diversity')
     parser.add_argument('--mmr-lambda', type=float, default=0.5, help='MMR lambda parameter (0=diversity, 1=relevance). Default: 0.5')
+    parser.add_argument('--janitor', action='store_true', help='Run one janitor pass (expiry + LRU/LFU eviction) after the queries')
     args = parser.parse_args()
     
     print("=" * 70)
@@ -398,10 +784,19 @@ def main():
         for key, value in stats.items():
             print(f"{key}: {value}")
         
+        if args.janitor:
+            print(f"\n{'='*70}")
+            print("4. Janitor Pass")
+            print('='*70)
+            for key, value in cache.enforce_budget().items():
+                print(f"{key}: {value}")
+        
+        cache.stop_janitor()
+        
         print(f"\n{'='*70}")
         print("✅ Validation complete!")
         print('='*70)
-        
+    
     except Exception as e:
         print(f"\n❌ Error during validation: {e}")
         import traceback
@@ -7,32 +7,85 @@ featuring distributed locking to prevent cache stampede and TTL-based expiration
 
 import sys
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # Add parent directory to path when running as script
 if __name__ == "__main__":
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core import get_cache_client
+from core import get_cache_client, DistributedLock, RateLimiter, CircuitBreaker
+from core.distributed_lock import RELEASE_MESSAGE
 
 
 class WeatherAPICache:
     """Weather API cache with TTL support and distributed locking."""
     
-    def __init__(self, default_ttl: int = 900, verbose: bool = False):
+    # Pub/sub channel prefix used to wake lock waiters when a key is filled
+    FILL_CHANNEL_PREFIX = "fill:"
+    
+    # Long-lived copy served when the upstream is throttled or unavailable
+    STALE_PREFIX = "stale:"
+    
+    # Geo mode: GEO set of observation keys plus their observation times
+    GEO_KEY = "geo:weather"
+    GEO_OBSERVED_KEY = "geo:weather:observed"
+    
+    def __init__(
+        self,
+        default_ttl: int = 900,
+        verbose: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        stale_ttl: int = 86400,
+        max_upstream_wait: float = 1.0,
+        geo_radius_km: Optional[float] = None,
+        geo_max_age: int = 600
+    ):
         """
         Initialize Valkey/Redis cache connection.
         
         Args:
             default_ttl: Default time-to-live in seconds (default: 900 = 15 minutes)
             verbose: Enable verbose logging (default: False)
+            rate_limiter: Shared upstream QPS budget (None = unlimited)
+            circuit_breaker: Breaker for upstream calls (None = always call)
+            stale_ttl: Time-to-live of the stale fallback copy in seconds
+            max_upstream_wait: Seconds a miss may wait for a rate-limit token
+            geo_radius_km: Reuse an observation within this radius (None = geo mode off)
+            geo_max_age: Maximum age in seconds of a reused observation
         """
         self.default_ttl = default_ttl
         self.verbose = verbose
         self.cache = get_cache_client()
         self.client = self.cache.client  # For backward compatibility with ping()
         
+        # Upstream protection
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.stale_ttl = stale_ttl
+        self.max_upstream_wait = max_upstream_wait
+        self._upstream_lock = threading.Lock()
+        self.stale_served = 0
+        self.upstream_errors = 0
+        
+        # Geo mode (proximity reuse of nearby observations)
+        self.geo_radius_km = geo_radius_km
+        self.geo_max_age = geo_max_age
+        self.geo_reused = 0
+        
+        # Locks held by the current thread (acquire_lock/release_lock API)
+        self._held_locks = threading.local()
+        
+        # Notify-on-fill: one shared subscriber wakes every local waiter
+        self._fill_lock = threading.Lock()
+        self._fill_waiters = {}
+        self._fill_pubsub = None
+        self._fill_thread = None
+        
         # Test connection
         try:
             self.client.ping()
@@ -81,10 +134,605 @@ class WeatherAPICache:
             if self.verbose:
                 print(f"Cache SET error for key '{key}': {e}")
     
-    def acquire_lock(self, key: str, timeout: int = 10) -> bool:
+    @staticmethod
+    def weather_key(country: str, zip_code: str) -> str:
+        """Build the cache key for a city (weather:<country>:<zip>)."""
+        return f"weather:{country.lower()}:{zip_code}"
+    
+    def get_weather_many(
+        self,
+        locations: List[Tuple[str, str]],
+        fetcher: Optional[Callable[[str, str], Any]] = None,
+        ttl: Optional[int] = None,
+        max_workers: int = 8,
+        coords: Optional[List[Optional[Tuple[float, float]]]] = None
+    ) -> Tuple[List[Optional[Any]], Dict[str, Any]]:
+        """
+        Get weather for many cities with one MGET and a concurrent fan-out for misses.
+        
+        Misses are deduplicated, fetched in parallel through a bounded thread
+        pool and written back in a single pipeline, so wall-clock time for N
+        cold cities approaches the slowest fetch instead of the sum of all.
+        In geo mode a miss first reuses a recent observation within the radius,
+        and fresh values are indexed in the GEO set, as in get_weather.
+        
+        Args:
+            locations: List of (country, zip) tuples (duplicates allowed)
+            fetcher: Callable(country, zip) returning weather data
+                     (defaults to WeatherService.get_weather)
+            ttl: Time-to-live in seconds (uses default if None)
+            max_workers: Maximum concurrent upstream fetches
+            coords: (lon, lat) per location, in input order (defaults to the
+                    WeatherService.CITIES entries; only used in geo mode)
+        
+        Returns:
+            Tuple of (results, stats)
+            - results: Weather data per input location, in input order (None on error)
+            - stats: Dictionary with hits, misses (per input location), fetched,
+                     stale, geo_reused, errors (per distinct missed key) and latency_ms
+        """
+        if fetcher is None:
+            from services.weather_service import WeatherService
+            fetcher = WeatherService.get_weather
+        
+        if ttl is None:
+            ttl = self.default_ttl
+        
+        start = time.perf_counter()
+        stats = {"hits": 0, "misses": 0, "fetched": 0, "stale": 0, "geo_reused": 0, "errors": 0, "latency_ms": 0.0}
+        if not locations:
+            return [], stats
+        
+        keys = [self.weather_key(country, zip_code) for country, zip_code in locations]
+        
+        # 1. One round trip for every key
+        try:
+            cached_values = self.client.mget(keys)
+        except Exception as e:
+            if self.verbose:
+                print(f"Cache MGET error: {e}")
+            cached_values = [None] * len(keys)
+        
+        values: Dict[str, Any] = {}
+        missing: Dict[str, Tuple[str, str]] = {}
+        missing_coords: Dict[str, Optional[Tuple[float, float]]] = {}
+        for i, (key, location, cached) in enumerate(zip(keys, locations, cached_values)):
+            if cached is not None:
+                values[key] = json.loads(cached)
+            elif key not in missing:
+                missing[key] = location
+                missing_coords[key] = coords[i] if coords is not None else None
+        
+        # hits + misses == len(locations); fetched/stale/geo_reused/errors count distinct keys
+        stats["hits"] = sum(1 for cached in cached_values if cached is not None)
+        stats["misses"] = len(keys) - stats["hits"]
+        
+        # Geo mode: reuse a nearby, recent observation before calling the upstream
+        if self.geo_radius_km is not None:
+            for key, (country, zip_code) in list(missing.items()):
+                coord = missing_coords[key] or self.city_coord(country, zip_code)
+                missing_coords[key] = coord
+                if coord is None:
+                    continue
+                nearby = self.find_nearby_observation(coord)
+                if nearby is not None:
+                    values[key] = nearby[1]
+                    stats["geo_reused"] += 1
+                    del missing[key]
+            if stats["geo_reused"]:
+                with self._upstream_lock:
+                    self.geo_reused += stats["geo_reused"]
+        
+        # 2. Fetch each distinct miss once, concurrently
+        if missing:
+            def _fetch(location: Tuple[str, str]) -> Tuple[Optional[Any], Optional[str]]:
+                return self.fetch_upstream(location[0], location[1], fetcher)
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+                fetched = dict(zip(missing, executor.map(_fetch, missing.values())))
+            
+            # 3. Write every fresh value back in one pipeline (stale fallbacks are not re-cached)
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for key, (value, source) in fetched.items():
+                    if source == "upstream":
+                        self._queue_set(pipe, key, value, ttl)
+                        if self.geo_radius_km is not None and missing_coords[key] is not None:
+                            self._queue_geo(pipe, key, missing_coords[key])
+                pipe.execute()
+            except Exception as e:
+                if self.verbose:
+                    print(f"Cache pipeline SET error: {e}")
+            
+            for key, (value, source) in fetched.items():
+                if value is None:
+                    stats["errors"] += 1
+                else:
+                    stats["fetched" if source == "upstream" else "stale"] += 1
+                    values[key] = value
+        
+        stats["latency_ms"] = (time.perf_counter() - start) * 1000
+        return [values.get(key) for key in keys], stats
+    
+    @property
+    def _guarded(self) -> bool:
+        """True when upstream calls go through a rate limiter or circuit breaker."""
+        return self.rate_limiter is not None or self.circuit_breaker is not None
+    
+    def _queue_set(self, pipe: Any, key: str, value: Any, ttl: int) -> None:
+        """Queue a fresh value (and its stale fallback copy when guarded) on a pipeline."""
+        serialized_value = json.dumps(value, default=str)
+        pipe.set(key, serialized_value, ex=ttl)
+        if self._guarded:
+            pipe.set(f"{self.STALE_PREFIX}{key}", serialized_value, ex=self.stale_ttl)
+    
+    def _serve_stale(self, key: str) -> Optional[Any]:
+        """Get the stale fallback copy of a key."""
+        value = self.get(f"{self.STALE_PREFIX}{key}")
+        if value is not None:
+            with self._upstream_lock:
+                self.stale_served += 1
+        return value
+    
+    def fetch_upstream(
+        self,
+        country: str,
+        zip_code: str,
+        fetcher: Optional[Callable[[str, str], Any]] = None
+    ) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Call the upstream weather API through the rate limiter and circuit breaker.
+        
+        When the call is throttled, short-circuited or fails, the stale copy of
+        the key is served instead. Nothing is written to the cache here.
+        
+        Args:
+            country: Two-letter country code
+            zip_code: Zip/postal code
+            fetcher: Callable(country, zip) (defaults to WeatherService.get_weather)
+        
+        Returns:
+            Tuple of (value, source)
+            - source: "upstream", "stale" or None when nothing could be served
+        """
+        if fetcher is None:
+            from services.weather_service import WeatherService
+            fetcher = WeatherService.get_weather
+        
+        key = self.weather_key(country, zip_code)
+        breaker = self.circuit_breaker
+        
+        # Short-circuit before spending a rate-limit token on a known-down upstream
+        if breaker is not None and not breaker.allow_request():
+            value = self._serve_stale(key)
+            return value, "stale" if value is not None else None
+        
+        if self.rate_limiter is not None:
+            try:
+                allowed = self.rate_limiter.acquire(timeout=self.max_upstream_wait)
+            except Exception as e:
+                # Limiter unreachable (e.g. Valkey down): treat like a throttled call
+                with self._upstream_lock:
+                    self.upstream_errors += 1
+                if self.verbose:
+                    print(f"Rate limiter error for {country}/{zip_code}: {e}")
+                allowed = False
+            
+            if not allowed:
+                # Give back the breaker's half-open probe slot, if it granted one
+                if breaker is not None:
+                    breaker.cancel()
+                value = self._serve_stale(key)
+                return value, "stale" if value is not None else None
+        
+        try:
+            if breaker is not None:
+                value = breaker.run(fetcher, country, zip_code)
+            else:
+                value = fetcher(country, zip_code)
+            return value, "upstream"
+        except Exception as e:
+            with self._upstream_lock:
+                self.upstream_errors += 1
+            if self.verbose:
+                print(f"Weather fetch error for {country}/{zip_code}: {e}")
+            value = self._serve_stale(key)
+            return value, "stale" if value is not None else None
+    
+    @staticmethod
+    def city_coord(country: str, zip_code: str) -> Optional[Tuple[float, float]]:
+        """Get (lon, lat) of a catalog city from WeatherService.CITIES, if known."""
+        from services.weather_service import WeatherService
+        
+        city = WeatherService.CITIES.get(f"{country}_{zip_code}")
+        if city is None:
+            return None
+        return city["coord"]["lon"], city["coord"]["lat"]
+    
+    def _queue_geo(self, pipe: Any, key: str, coord: Tuple[float, float]) -> None:
+        """Queue indexing of a fresh observation in the GEO set."""
+        lon, lat = coord
+        pipe.geoadd(self.GEO_KEY, [lon, lat, key])
+        pipe.zadd(self.GEO_OBSERVED_KEY, {key: time.time()})
+    
+    def find_nearby_observation(
+        self,
+        coord: Tuple[float, float],
+        radius_km: Optional[float] = None,
+        max_age: Optional[int] = None,
+        count: int = 5
+    ) -> Optional[Tuple[str, Any, float]]:
+        """
+        Find the nearest cached observation within a radius and maximum age.
+        
+        Members whose cache entry has expired are removed from the index.
+        
+        Args:
+            coord: (lon, lat) of the request
+            radius_km: Search radius (defaults to geo_radius_km)
+            max_age: Maximum observation age in seconds (defaults to geo_max_age)
+            count: Number of nearest candidates to consider
+        
+        Returns:
+            Tuple of (key, value, distance_km) or None if nothing qualifies
+        """
+        if radius_km is None:
+            radius_km = self.geo_radius_km
+        if max_age is None:
+            max_age = self.geo_max_age
+        
+        try:
+            candidates = self.client.geosearch(
+                self.GEO_KEY,
+                longitude=coord[0],
+                latitude=coord[1],
+                radius=radius_km,
+                unit="km",
+                sort="ASC",
+                count=count,
+                withdist=True
+            )
+            if not candidates:
+                return None
+            
+            keys = [member for member, _ in candidates]
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zmscore(self.GEO_OBSERVED_KEY, keys)
+            pipe.mget(keys)
+            observed_at, values = pipe.execute()
+            
+            now = time.time()
+            expired = []
+            for (key, distance), observed, value in zip(candidates, observed_at, values):
+                if value is None:
+                    expired.append(key)
+                    continue
+                if observed is not None and now - observed <= max_age:
+                    return key, json.loads(value), distance
+            
+            if expired:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.zrem(self.GEO_KEY, *expired)
+                pipe.zrem(self.GEO_OBSERVED_KEY, *expired)
+                pipe.execute()
+            return None
+        except Exception as e:
+            if self.verbose:
+                print(f"Cache GEOSEARCH error: {e}")
+            return None
+    
+    def get_weather(
+        self,
+        country: str,
+        zip_code: str,
+        fetcher: Optional[Callable[[str, str], Any]] = None,
+        ttl: Optional[int] = None,
+        coord: Optional[Tuple[float, float]] = None
+    ) -> Optional[Any]:
+        """
+        Get weather for one city (cache-aside with upstream protection).
+        
+        In geo mode (geo_radius_km set) an exact-key miss first looks for a
+        recent observation within the radius before calling the upstream.
+        
+        Args:
+            country: Two-letter country code
+            zip_code: Zip/postal code
+            fetcher: Callable(country, zip) (defaults to WeatherService.get_weather)
+            ttl: Time-to-live in seconds (uses default if None)
+            coord: (lon, lat) of the location (defaults to the WeatherService.CITIES entry)
+        
+        Returns:
+            Weather data (possibly stale or from a nearby location), or None if unavailable
+        """
+        key = self.weather_key(country, zip_code)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        
+        if self.geo_radius_km is not None:
+            if coord is None:
+                coord = self.city_coord(country, zip_code)
+            if coord is not None:
+                nearby = self.find_nearby_observation(coord)
+                if nearby is not None:
+                    with self._upstream_lock:
+                        self.geo_reused += 1
+                    if self.verbose:
+                        print(f"Reusing {nearby[0]} ({nearby[2]:.1f} km away) for {key}")
+                    return nearby[1]
+        
+        value, source = self.fetch_upstream(country, zip_code, fetcher)
+        if source == "upstream":
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                self._queue_set(pipe, key, value, ttl if ttl is not None else self.default_ttl)
+                if self.geo_radius_km is not None and coord is not None:
+                    self._queue_geo(pipe, key, coord)
+                pipe.execute()
+            except Exception as e:
+                if self.verbose:
+                    print(f"Cache SET error for key '{key}': {e}")
+        return value
+    
+    def refresh(
+        self,
+        country: str,
+        zip_code: str,
+        fetcher: Optional[Callable[[str, str], Any]] = None,
+        ttl: Optional[int] = None
+    ) -> bool:
+        """
+        Re-fetch a city from the upstream and overwrite its cache entry.
+        
+        The refresh runs under the key's distributed lock, so refreshers in
+        several processes make one upstream call per key, and the write is
+        fenced so a refresher that stalled past its lease cannot overwrite a
+        newer value.
+        
+        Args:
+            country: Two-letter country code
+            zip_code: Zip/postal code
+            fetcher: Callable(country, zip) (defaults to WeatherService.get_weather)
+            ttl: Time-to-live in seconds (uses default if None)
+        
+        Returns:
+            True if a fresh value was written, False otherwise, or None if
+            another client is already refreshing the key
+        """
+        key = self.weather_key(country, zip_code)
+        if ttl is None:
+            ttl = self.default_ttl
+        
+        with self.lock(key, auto_renew=True) as lock:
+            if not lock.acquired:
+                return None
+            
+            value, source = self.fetch_upstream(country, zip_code, fetcher)
+            if source != "upstream":
+                return False
+            
+            try:
+                serialized_value = json.dumps(value, default=str)
+                if not lock.fenced_set(key, serialized_value, ttl_ms=ttl * 1000):
+                    return False
+                
+                pipe = self.client.pipeline(transaction=False)
+                if self._guarded:
+                    pipe.set(f"{self.STALE_PREFIX}{key}", serialized_value, ex=self.stale_ttl)
+                if self.geo_radius_km is not None:
+                    coord = self.city_coord(country, zip_code)
+                    if coord is not None:
+                        self._queue_geo(pipe, key, coord)
+                pipe.execute()
+                return True
+            except Exception as e:
+                if self.verbose:
+                    print(f"Cache SET error for key '{key}': {e}")
+                return False
+    
+    def get_upstream_stats(self) -> Dict[str, Any]:
+        """
+        Get upstream protection counters.
+        
+        Returns:
+            Dictionary with allowed, throttled, short_circuited, failures,
+            stale_served, upstream_errors, geo_reused and circuit_state
+        """
+        limiter_stats = self.rate_limiter.get_stats() if self.rate_limiter else {}
+        breaker_stats = self.circuit_breaker.get_stats() if self.circuit_breaker else {}
+        
+        with self._upstream_lock:
+            return {
+                "allowed": limiter_stats.get("allowed", 0),
+                "throttled": limiter_stats.get("throttled", 0),
+                "short_circuited": breaker_stats.get("short_circuited", 0),
+                "failures": breaker_stats.get("failures", 0),
+                "stale_served": self.stale_served,
+                "upstream_errors": self.upstream_errors,
+                "geo_reused": self.geo_reused,
+                "circuit_state": breaker_stats.get("state", "DISABLED"),
+            }
+    
+    def set_and_notify(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        lock: Optional[DistributedLock] = None
+    ) -> int:
+        """
+        Set value in cache and wake every waiter blocked in wait_for_fill.
+        
+        The SET and PUBLISH go out in one pipeline; the payload carries the
+        value so woken waiters don't need another GET. With the lock the value
+        was fetched under, the write is fenced: a holder whose lease expired
+        and was taken over cannot overwrite the newer holder's value.
+        
+        Args:
+            key: Cache key
+            value: Value to cache (will be serialized to JSON)
+            ttl: Time-to-live in seconds (uses default if None)
+            lock: DistributedLock held for the key (fenced write)
+        
+        Returns:
+            Number of subscriber connections notified (0 if the write was fenced off)
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        
+        try:
+            serialized_value = json.dumps(value, default=str)
+            if lock is not None:
+                if not lock.fenced_set(key, serialized_value, ttl_ms=ttl * 1000):
+                    return 0
+                return self.client.publish(f"{self.FILL_CHANNEL_PREFIX}{key}", serialized_value)
+            
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, serialized_value, ex=ttl)
+            pipe.publish(f"{self.FILL_CHANNEL_PREFIX}{key}", serialized_value)
+            return pipe.execute()[1]
+        except Exception as e:
+            if self.verbose:
+                print(f"Cache SET+NOTIFY error for key '{key}': {e}")
+            return 0
+    
+    def _on_fill(self, message: dict) -> None:
+        """Pub/sub handler: hand the filled value (or the lock release) to every waiter for that key."""
+        key = message["channel"][len(self.FILL_CHANNEL_PREFIX):]
+        
+        with self._fill_lock:
+            waiters = self._fill_waiters.pop(key, [])
+        
+        if not waiters:
+            return
+        
+        # A release without a fill wakes waiters with no value so they retry
+        value = None if message["data"] == RELEASE_MESSAGE else json.loads(message["data"])
+        for waiter in waiters:
+            waiter["value"] = value
+            waiter["event"].set()
+    
+    def _ensure_fill_listener(self) -> None:
+        """Start the shared fill subscriber thread on first use."""
+        with self._fill_lock:
+            if self._fill_thread is not None:
+                return
+            
+            pubsub = self.client.pubsub()
+            pubsub.psubscribe(**{f"{self.FILL_CHANNEL_PREFIX}*": self._on_fill})
+            
+            # Wait for the PSUBSCRIBE confirmation so no fill can be missed
+            deadline = time.monotonic() + 1.0
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=0.1)
+                if message and message["type"] == "psubscribe":
+                    break
+            
+            self._fill_pubsub = pubsub
+            self._fill_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    
+    def wait_for_fill(self, key: str, timeout: float = 10) -> Optional[Any]:
+        """
+        Block until another client fills the key via set_and_notify.
+        
+        Replaces exponential-backoff polling: the waiter registers, checks the
+        key and its lock once (to cover a fill or release that happened just
+        before registering) and then sleeps until woken by the fill or by the
+        holder releasing the lock (locks from lock() publish their release).
+        
+        Args:
+            key: Cache key being filled by the lock holder
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Cached value, or None if the lock was released without a fill (or
+            is not held) or nothing happened within timeout; callers should
+            then retry the GET and the lock
+        """
+        try:
+            self._ensure_fill_listener()
+        except Exception as e:
+            if self.verbose:
+                print(f"Fill listener error: {e}")
+            return None
+        
+        waiter = {"event": threading.Event(), "value": None}
+        with self._fill_lock:
+            self._fill_waiters.setdefault(key, []).append(waiter)
+        
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.exists(f"lock:{key}")
+            cached, locked = pipe.execute()
+            if cached is not None:
+                return json.loads(cached)
+            if not locked:
+                # The holder already released without filling: retry now
+                return None
+            
+            if waiter["event"].wait(timeout):
+                return waiter["value"]
+            return None
+        finally:
+            with self._fill_lock:
+                waiters = self._fill_waiters.get(key)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._fill_waiters[key]
+    
+    def lock(
+        self,
+        key: str,
+        timeout: float = 10,
+        blocking: bool = False,
+        blocking_timeout: float = 10.0,
+        auto_renew: bool = False,
+        notify_release: bool = True
+    ) -> DistributedLock:
+        """
+        Create a distributed lock for a key, usable as a context manager.
+        
+        By default releasing it publishes on the key's fill channel, so
+        wait_for_fill callers wake up even when the holder fails without
+        filling the key.
+        
+        Args:
+            key: The cache key to lock
+            timeout: Lock lease in seconds (default: 10)
+            blocking: Wait for the lock instead of failing fast
+            blocking_timeout: Maximum seconds to wait when blocking
+            auto_renew: Keep extending the lease while held (long fetches)
+            notify_release: Publish the release on the fill channel
+        
+        Returns:
+            DistributedLock (check .acquired inside the with-block)
+        """
+        return DistributedLock(
+            self.client,
+            key,
+            ttl_ms=int(timeout * 1000),
+            blocking=blocking,
+            blocking_timeout=blocking_timeout,
+            auto_renew=auto_renew,
+            release_channel=f"{self.FILL_CHANNEL_PREFIX}{key}" if notify_release else None
+        )
+    
+    def _thread_locks(self) -> dict:
+        """Get the locks held by the current thread, keyed by cache key."""
+        if not hasattr(self._held_locks, "locks"):
+            self._held_locks.locks = {}
+        return self._held_locks.locks
+    
+    def acquire_lock(self, key: str, timeout: float = 10) -> bool:
         """
         Acquire a distributed lock for a key to prevent cache stampede.
         
+        The lock value is a random token, so release_lock only ever deletes
+        the lock this thread acquired, even after its lease expired.
+        
         Args:
             key: The cache key to lock
             timeout: Lock timeout in seconds (default: 10)
@@ -92,28 +740,37 @@ class WeatherAPICache:
         Returns:
             True if lock was acquired, False otherwise
         """
-        lock_key = f"lock:{key}"
         try:
-            # SET NX (set if not exists) with expiration
-            return self.client.set(lock_key, "1", nx=True, ex=timeout)
+            lock = self.lock(key, timeout=timeout)
+            if lock.acquire():
+                self._thread_locks()[key] = lock
+                return True
+            return False
         except Exception as e:
             if self.verbose:
                 print(f"Lock ACQUIRE error for key '{key}': {e}")
             return False
     
-    def release_lock(self, key: str) -> None:
+    def release_lock(self, key: str) -> bool:
         """
-        Release a distributed lock for a key.
+        Release a distributed lock for a key (compare-and-delete).
         
         Args:
             key: The cache key to unlock
+        
+        Returns:
+            True if the lock was still held and deleted, False otherwise
         """
-        lock_key = f"lock:{key}"
+        lock = self._thread_locks().pop(key, None)
+        if lock is None:
+            return False
+        
         try:
-            self.client.delete(lock_key)
+            return lock.release()
         except Exception as e:
             if self.verbose:
                 print(f"Lock RELEASE error for key '{key}': {e}")
+            return False
     
     def delete(self, key: str) -> bool:
         """
@@ -161,6 +818,11 @@ class WeatherAPICache:
     def close(self) -> None:
         """Close Valkey/Redis connection."""
         try:
+            if self._fill_thread is not None:
+                self._fill_thread.stop()
+                self._fill_thread.join(timeout=2)
+                self._fill_pubsub.close()
+                self._fill_thread = None
             self.cache.close()
         except Exception as e:
             if self.verbose:
@@ -207,18 +869,53 @@ if __name__ == "__main__":
         cache.release_lock(cache_key)
         print("   Lock released")
     
-    # Test 3: List keys
-    print(f"\n4. Listing all weather keys:")
+    # Test 3: Batch fetch (cold, then warm)
+    from services.weather_service import WeatherService
+    
+    cities = [(city["country"], city["zip"]) for city in WeatherService.get_all_cities()[:10]]
+    for country, zip_code in cities:
+        cache.delete(cache.weather_key(country, zip_code))
+    
+    print(f"\n4. Batch fetch of {len(cities)} cities (plus one duplicate):")
+    results, stats = cache.get_weather_many(cities + cities[:1])
+    print(f"   Cold: {stats['misses']} misses, {stats['fetched']} fetched concurrently in {stats['latency_ms']:.0f} ms")
+    results, stats = cache.get_weather_many(cities)
+    print(f"   Warm: {stats['hits']} hits in {stats['latency_ms']:.2f} ms")
+    
+    # Test 4: Geo mode - nearby zip codes in one metro reuse one observation
+    geo_cache = WeatherAPICache(default_ttl=900, geo_radius_km=10, geo_max_age=600)
+    upstream_calls = []
+    
+    def counting_fetch(country, zip_code):
+        upstream_calls.append(zip_code)
+        return WeatherService.get_weather("US", "10001")
+    
+    print("\n5. Geo mode: 5 Manhattan zip codes within a few km")
+    manhattan = [
+        ("10001", (-73.9967, 40.7506)),
+        ("10002", (-73.9860, 40.7157)),
+        ("10003", (-73.9893, 40.7317)),
+        ("10010", (-73.9818, 40.7390)),
+        ("10019", (-73.9855, 40.7651)),
+    ]
+    for zip_code, coord in manhattan:
+        geo_cache.delete(geo_cache.weather_key("US", zip_code))
+        geo_cache.get_weather("US", zip_code, fetcher=counting_fetch, coord=coord)
+    print(f"   Upstream calls: {len(upstream_calls)} (reused: {geo_cache.get_upstream_stats()['geo_reused']})")
+    geo_cache.close()
+    
+    # Test 5: List keys
+    print(f"\n6. Listing all weather keys:")
     weather_keys = cache.keys("weather:*")
     print(f"   Found {len(weather_keys)} keys: {weather_keys}")
     
-    # Test 4: Delete key
-    print(f"\n5. Deleting cache key: {cache_key}")
+    # Test 6: Delete key
+    print(f"\n7. Deleting cache key: {cache_key}")
     deleted = cache.delete(cache_key)
     print(f"   Deleted: {deleted}")
     
     # Verify deletion
-    print(f"\n6. Verifying deletion:")
+    print(f"\n8. Verifying deletion:")
     cached_data = cache.get(cache_key)
     print(f"   Retrieved: {cached_data} (should be None)")
     
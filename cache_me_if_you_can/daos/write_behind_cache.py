@@ -25,7 +25,7 @@ if __name__ == "__main__":
 import json
 import time
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List
 from sqlalchemy import text
 
 from core import get_db_engine, get_cache_client
@@ -36,11 +36,43 @@ class WriteBehindCache:
     
     QUEUE_KEY = "flight_updates_queue"
     
-    def __init__(self):
-        """Initialize database and cache connections."""
+    # flight_id -> number of updates queued or in flight (not yet committed)
+    PENDING_KEY = "flight_updates_pending"
+    # flight_id -> unix time of the latest queued update, so readers can
+    # ignore counts left behind by a worker that died before committing
+    PENDING_AT_KEY = "flight_updates_pending_at"
+    
+    # KEYS: pending hash, pending-at hash; ARGV: flight_id
+    # Decrement the pending count and drop both fields once it reaches zero
+    DONE_SCRIPT = """
+    local count = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+    if count <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+        redis.call('HDEL', KEYS[2], ARGV[1])
+    end
+    return count
+    """
+    
+    def __init__(self, leaderboard: Optional[Any] = None):
+        """
+        Initialize database and cache connections.
+        
+        Args:
+            leaderboard: Optional LeaderboardService kept in sync when the
+                         queue worker moves a flight to another departure day
+        """
         self.db_engine = get_db_engine()
         self.cache = get_cache_client()
         self.default_ttl = int(os.getenv("CACHE_TTL", "3600"))
+        self.leaderboard = leaderboard
+        self._done_script = self.cache.client.register_script(self.DONE_SCRIPT)
+    
+    def _mark_done(self, flight_id: int) -> None:
+        """Mark one queued update of a flight as committed (or dropped)."""
+        try:
+            self._done_script(keys=[self.PENDING_KEY, self.PENDING_AT_KEY], args=[flight_id])
+        except Exception:
+            pass
     
     def _generate_cache_key(self, entity_type: str, entity_id: int) -> str:
         """Generate cache key for entity."""
@@ -142,6 +174,7 @@ class WriteBehindCache:
             - cache_key: Cache key that was updated
         """
         cache_key = self._generate_cache_key("flight", flight_id)
+        pending = False
         
         try:
             # Get current flight data from cache or database
@@ -150,6 +183,14 @@ class WriteBehindCache:
             if not flight_data:
                 return False, cache_key
             
+            # Mark the flight pending before the cache leads the database,
+            # so auditors never compare the new cache entry with the old row
+            pipe = self.cache.client.pipeline(transaction=True)
+            pipe.hincrby(self.PENDING_KEY, flight_id, 1)
+            pipe.hset(self.PENDING_AT_KEY, flight_id, int(time.time()))
+            pipe.execute()
+            pending = True
+            
             # Update cache immediately (write-behind: cache first)
             flight_data["departure"] = new_departure.isoformat()
             flight_data["arrival"] = new_arrival.isoformat()
@@ -172,6 +213,8 @@ class WriteBehindCache:
             return True, cache_key
             
         except Exception as e:
+            if pending:
+                self._mark_done(flight_id)
             return False, cache_key
     
     def get_queue_length(self) -> int:
@@ -204,6 +247,7 @@ class WriteBehindCache:
         processed = 0
         failed = 0
         queries_executed = []
+        moves = {}
         
         for _ in range(batch_size):
             # Pop from left (FIFO queue)
@@ -212,6 +256,7 @@ class WriteBehindCache:
             if not task_json:
                 break  # Queue is empty
             
+            flight_id = None
             try:
                 task = json.loads(task_json)
                 
@@ -302,10 +347,27 @@ class WriteBehindCache:
                 
                 processed += 1
                 
+                # Keep the earliest old departure if a flight was queued twice
+                old_departure = moves.get(flight_id, (old_dict["departure"], None))[0]
+                moves[flight_id] = (old_departure, new_departure)
+                
             except Exception as e:
                 failed += 1
                 # Re-queue failed task (optional - could implement retry logic)
                 # self.cache.client.rpush(self.QUEUE_KEY, task_json)
+            
+            finally:
+                # The task is no longer in flight (committed or dropped)
+                if flight_id is not None:
+                    self._mark_done(flight_id)
+        
+        # Apply committed reschedules to the leaderboards in one batch
+        # (missed increments are fixed by the leaderboard reconciliation)
+        if self.leaderboard is not None and moves:
+            try:
+                self.leaderboard.apply_reschedules(moves)
+            except Exception:
+                pass
         
         return processed, failed, queries_executed
     
@@ -20,9 +20,10 @@ if __name__ == "__main__":
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import json
+import time
 from datetime import datetime
-from typing import Optional, Dict
-from sqlalchemy import text
+from typing import Any, Optional, Dict, List
+from sqlalchemy import text, bindparam
 
 from core import get_db_engine, get_cache_client
 
@@ -30,16 +31,89 @@ from core import get_db_engine, get_cache_client
 class WriteThroughCache:
     """Write-through cache implementation for flight data."""
     
-    def __init__(self):
-        """Initialize database and cache connections."""
+    def __init__(self, leaderboard: Optional[Any] = None):
+        """
+        Initialize database and cache connections.
+        
+        Args:
+            leaderboard: Optional LeaderboardService kept in sync when a
+                         flight moves to another departure day
+        """
         self.db_engine = get_db_engine()
         self.cache = get_cache_client()
         self.default_ttl = int(os.getenv("CACHE_TTL", "3600"))
+        self.leaderboard = leaderboard
+        # Flights of the last update whose cache entry could be neither
+        # refreshed nor deleted (stale until CACHE_TTL expires)
+        self.last_cache_failures: List[int] = []
+    
+    def _update_leaderboard(self, moves: Dict) -> None:
+        """Apply committed reschedules to the leaderboards (drift is fixed by reconciliation)."""
+        if self.leaderboard is None:
+            return
+        try:
+            self.leaderboard.apply_reschedules(moves)
+        except Exception:
+            pass
+    
+    def _refresh_cache(self, entries: Dict[str, str]) -> List[int]:
+        """
+        Write committed flight records to the cache in one round trip.
+        
+        Entries that cannot be refreshed must not keep the old times: they are
+        dropped so the next read goes to the database.
+        
+        Returns:
+            Flight ids whose entry could be neither refreshed nor deleted
+        """
+        failed_keys = self.cache.set_many(entries, self.default_ttl)
+        if failed_keys and not self.cache.delete_many(failed_keys):
+            return sorted(int(key.split(":", 1)[1]) for key in failed_keys)
+        return []
     
     def _generate_cache_key(self, entity_type: str, entity_id: int) -> str:
         """Generate cache key for entity."""
         return f"{entity_type}:{entity_id}"
     
+    def _build_flight_record(
+        self,
+        row: Dict,
+        new_departure: datetime,
+        new_arrival: datetime
+    ) -> Dict:
+        """
+        Build the cached flight representation from a row read in a write transaction.
+        
+        Produces the same shape as the cache-aside query in get_flight, with the
+        departure/arrival replaced by the values that were just written.
+        
+        Args:
+            row: Flight row including the joined airport and airline columns
+            new_departure: Departure datetime written to the database
+            new_arrival: Arrival datetime written to the database
+        
+        Returns:
+            JSON-serializable flight data dictionary
+        """
+        flight_data = {
+            "flight_id": row["flight_id"],
+            "flightno": row["flightno"],
+            "departure": new_departure,
+            "arrival": new_arrival,
+            "airline_id": row["airline_id"],
+            "airplane_id": row["airplane_id"],
+            "from_airport": row["from_airport"],
+            "to_airport": row["to_airport"],
+            "airlinename": row["airlinename"],
+        }
+        
+        # Convert datetime objects to strings for JSON serialization
+        for key, value in flight_data.items():
+            if isinstance(value, datetime):
+                flight_data[key] = value.isoformat()
+        
+        return flight_data
+    
     def get_flight(self, flight_id: int) -> tuple[Optional[Dict], str, float, str, str]:
         """
         Get flight data using cache-aside pattern.
@@ -55,8 +129,6 @@ class WriteThroughCache:
             - cache_key: Cache key used
             - query_str: SQL query executed (empty string if cache hit)
         """
-        import time
-        
         cache_key = self._generate_cache_key("flight", flight_id)
         
         # Try cache first
@@ -122,8 +194,16 @@ class WriteThroughCache:
         
         This ensures data consistency by:
         1. Writing to the database first (source of truth)
-        2. Updating the cache immediately
-        3. Logging the change in flight_log
+        2. Logging the change in flight_log
+        3. Overwriting the cache entry with a single SET built from the
+           row read inside the transaction (no re-read, no cache miss)
+        
+        DATETIME columns have second precision, so microseconds are dropped
+        before writing to keep the cached values identical to the database.
+        
+        Success reflects the database commit alone. If the cache entry cannot
+        be refreshed it is deleted instead; if that fails too, the flight is
+        listed in last_cache_failures.
         
         Args:
             flight_id: Flight ID to update
@@ -138,15 +218,31 @@ class WriteThroughCache:
             - queries_executed: List of SQL queries executed
         """
         queries_executed = []
+        new_departure = new_departure.replace(microsecond=0)
+        new_arrival = new_arrival.replace(microsecond=0)
+        self.last_cache_failures = []
         
         try:
             with self.db_engine.begin() as conn:
-                # Get current flight data for logging
+                # Get current flight data for logging and for the new cache entry
                 select_query_str = """
-                    SELECT flight_id, flightno, `from`, `to`, 
-                           departure, arrival, airline_id, airplane_id
-                    FROM flight
-                    WHERE flight_id = :flight_id
+                    SELECT 
+                        f.flight_id,
+                        f.flightno,
+                        f.`from`,
+                        f.`to`,
+                        f.departure,
+                        f.arrival,
+                        f.airline_id,
+                        f.airplane_id,
+                        dep.iata as from_airport,
+                        arr.iata as to_airport,
+                        al.airlinename
+                    FROM flight f
+                    JOIN airport dep ON f.from = dep.airport_id
+                    JOIN airport arr ON f.to = arr.airport_id
+                    JOIN airline al ON f.airline_id = al.airline_id
+                    WHERE f.flight_id = :flight_id
                 """
                 queries_executed.append(select_query_str.strip())
                 
@@ -216,20 +312,209 @@ class WriteThroughCache:
                     "airline_id": old_dict["airline_id"],
                     "comment": comment or "Flight time updated"
                 })
-            
-            # Write-through: Update cache immediately after database
-            cache_key = self._generate_cache_key("flight", flight_id)
-            
-            # Delete old cache entry first to ensure fresh data
-            self.cache.delete(cache_key)
-            
-            # Get fresh data from database to update cache (will be cache miss)
-            self.get_flight(flight_id)
-            
-            return True, queries_executed
-            
-        except Exception as e:
+        
+        except Exception:
+            # Transaction rolled back
             return False, queries_executed
+        
+        # Write-through: Overwrite the cache entry with the committed values.
+        # The row read inside the transaction already has every cached field,
+        # so no extra SELECT is needed and readers never see a miss.
+        cache_key = self._generate_cache_key("flight", flight_id)
+        flight_data = self._build_flight_record(old_dict, new_departure, new_arrival)
+        self.last_cache_failures = self._refresh_cache({cache_key: json.dumps(flight_data)})
+        
+        self._update_leaderboard({flight_id: (old_dict["departure"], new_departure)})
+        
+        return True, queries_executed
+    
+    def update_flights_bulk(
+        self,
+        updates: List[Dict],
+        user: str = "system",
+        comment: Optional[str] = None
+    ) -> tuple[Dict[int, bool], Dict[str, float], list[str]]:
+        """
+        Update departure/arrival times for many flights in one write-through batch.
+        
+        Intended for delay cascades that touch hundreds of flights at once:
+        1. One SELECT ... WHERE flight_id IN (...) reads all current rows
+        2. One executemany UPDATE writes the new times
+        3. One executemany INSERT logs every change in flight_log
+        4. All cache entries are refreshed in a single round trip
+        
+        Steps 1-3 run in a single transaction; once it commits every updated
+        flight is reported as successful. Cache entries that cannot be
+        refreshed are deleted instead, and flights whose entry could not be
+        deleted either are listed in last_cache_failures. If a flight_id
+        appears more than once, the last update wins.
+        
+        Args:
+            updates: List of dicts with "flight_id", "new_departure",
+                     "new_arrival" and an optional per-flight "comment"
+            user: Username making the change
+            comment: Default comment for updates that do not carry their own
+        
+        Returns:
+            Tuple of (results, latency_ms, queries_executed)
+            - results: Mapping of flight_id to True if updated, False otherwise
+            - latency_ms: Breakdown with "select", "update", "log", "commit",
+                          "cache" and "total" timings in milliseconds
+            - queries_executed: List of SQL queries executed
+        """
+        queries_executed = []
+        latency_ms = {"select": 0.0, "update": 0.0, "log": 0.0, "commit": 0.0, "cache": 0.0, "total": 0.0}
+        
+        # Collapse duplicates (last one wins) and normalize to DATETIME precision
+        pending = {}
+        for update in updates:
+            pending[int(update["flight_id"])] = {
+                "new_departure": update["new_departure"].replace(microsecond=0),
+                "new_arrival": update["new_arrival"].replace(microsecond=0),
+                "comment": update.get("comment") or comment or "Flight time updated",
+            }
+        
+        results = {flight_id: False for flight_id in pending}
+        self.last_cache_failures = []
+        if not pending:
+            return results, latency_ms, queries_executed
+        
+        total_start = time.perf_counter()
+        
+        try:
+            with self.db_engine.begin() as conn:
+                # Read every affected flight in one round trip
+                select_query_str = """
+                    SELECT 
+                        f.flight_id,
+                        f.flightno,
+                        f.`from`,
+                        f.`to`,
+                        f.departure,
+                        f.arrival,
+                        f.airline_id,
+                        f.airplane_id,
+                        dep.iata as from_airport,
+                        arr.iata as to_airport,
+                        al.airlinename
+                    FROM flight f
+                    JOIN airport dep ON f.from = dep.airport_id
+                    JOIN airport arr ON f.to = arr.airport_id
+                    JOIN airline al ON f.airline_id = al.airline_id
+                    WHERE f.flight_id IN :flight_ids
+                """
+                queries_executed.append(select_query_str.strip())
+                
+                step_start = time.perf_counter()
+                query = text(select_query_str).bindparams(bindparam("flight_ids", expanding=True))
+                result = conn.execute(query, {"flight_ids": list(pending)})
+                old_rows = {row.flight_id: dict(row._mapping) for row in result}
+                latency_ms["select"] = (time.perf_counter() - step_start) * 1000
+                
+                if not old_rows:
+                    latency_ms["total"] = (time.perf_counter() - total_start) * 1000
+                    return results, latency_ms, queries_executed
+                
+                # Update all found flights with one executemany
+                update_query_str = """
+                    UPDATE flight
+                    SET departure = :new_departure,
+                        arrival = :new_arrival
+                    WHERE flight_id = :flight_id
+                """
+                queries_executed.append(update_query_str.strip())
+                
+                step_start = time.perf_counter()
+                conn.execute(text(update_query_str), [
+                    {
+                        "flight_id": flight_id,
+                        "new_departure": pending[flight_id]["new_departure"],
+                        "new_arrival": pending[flight_id]["new_arrival"]
+                    }
+                    for flight_id in old_rows
+                ])
+                latency_ms["update"] = (time.perf_counter() - step_start) * 1000
+                
+                # Log all changes with one executemany
+                log_query_str = """
+                    INSERT INTO flight_log (
+                        log_date, user, flight_id,
+                        flightno_old, flightno_new,
+                        from_old, from_new,
+                        to_old, to_new,
+                        departure_old, departure_new,
+                        arrival_old, arrival_new,
+                        airplane_id_old, airplane_id_new,
+                        airline_id_old, airline_id_new,
+                        comment
+                    ) VALUES (
+                        NOW(), :user, :flight_id,
+                        :flightno, :flightno,
+                        :from_id, :from_id,
+                        :to_id, :to_id,
+                        :departure_old, :departure_new,
+                        :arrival_old, :arrival_new,
+                        :airplane_id, :airplane_id,
+                        :airline_id, :airline_id,
+                        :comment
+                    )
+                """
+                queries_executed.append(log_query_str.strip())
+                
+                step_start = time.perf_counter()
+                conn.execute(text(log_query_str), [
+                    {
+                        "user": user,
+                        "flight_id": flight_id,
+                        "flightno": old_dict["flightno"],
+                        "from_id": old_dict["from"],
+                        "to_id": old_dict["to"],
+                        "departure_old": old_dict["departure"],
+                        "departure_new": pending[flight_id]["new_departure"],
+                        "arrival_old": old_dict["arrival"],
+                        "arrival_new": pending[flight_id]["new_arrival"],
+                        "airplane_id": old_dict["airplane_id"],
+                        "airline_id": old_dict["airline_id"],
+                        "comment": pending[flight_id]["comment"]
+                    }
+                    for flight_id, old_dict in old_rows.items()
+                ])
+                latency_ms["log"] = (time.perf_counter() - step_start) * 1000
+                
+                # Leaving the block commits the transaction
+                commit_start = time.perf_counter()
+            latency_ms["commit"] = (time.perf_counter() - commit_start) * 1000
+            
+        except Exception:
+            # Transaction rolled back: report every flight as failed
+            latency_ms["total"] = (time.perf_counter() - total_start) * 1000
+            return results, latency_ms, queries_executed
+        
+        # The database is the source of truth: committed flights succeeded
+        # whatever happens to the cache below
+        for flight_id in old_rows:
+            results[flight_id] = True
+        
+        # Write-through: refresh every cache entry in one round trip
+        step_start = time.perf_counter()
+        entries = {}
+        for flight_id, old_dict in old_rows.items():
+            flight_data = self._build_flight_record(
+                old_dict,
+                pending[flight_id]["new_departure"],
+                pending[flight_id]["new_arrival"]
+            )
+            entries[self._generate_cache_key("flight", flight_id)] = json.dumps(flight_data)
+        self.last_cache_failures = self._refresh_cache(entries)
+        latency_ms["cache"] = (time.perf_counter() - step_start) * 1000
+        
+        self._update_leaderboard({
+            flight_id: (old_dict["departure"], pending[flight_id]["new_departure"])
+            for flight_id, old_dict in old_rows.items()
+        })
+        
+        latency_ms["total"] = (time.perf_counter() - total_start) * 1000
+        return results, latency_ms, queries_executed
     
     def verify_consistency(self, flight_id: int) -> Dict:
         """
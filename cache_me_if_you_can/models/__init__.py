@@ -2,7 +2,7 @@
 
 from .airline import Airline
 from .airplane import Airplane, AirplaneType
-from .airport import Airport, AirportGeo, AirportReachable
+from .airport import Airport, AirportGeo, AirportReachable, AirportDailyStats
 from .flight import Flight, FlightSchedule, FlightLog
 from .booking import Booking
 from .passenger import Passenger, PassengerDetails
@@ -16,6 +16,7 @@ __all__ = [
     "Airport",
     "AirportGeo",
     "AirportReachable",
+    "AirportDailyStats",
     "Flight",
     "FlightSchedule",
     "FlightLog",
@@ -1,6 +1,7 @@
 """Airport-related models."""
 
 from typing import Optional
+import datetime as dt
 from decimal import Decimal
 from sqlmodel import SQLModel, Field
 
@@ -37,3 +38,22 @@ class AirportReachable(SQLModel, table=True):
     
     airport_id: int = Field(primary_key=True)
     hops: Optional[int] = None
+
+
+class AirportDailyStats(SQLModel, table=True):
+    """Per-airport daily flight and passenger rollup used by the leaderboards."""
+    
+    __tablename__ = "airport_daily_stats"
+    
+    # dt.date: a bare "date" annotation would resolve to this field itself
+    date: dt.date = Field(primary_key=True)
+    airport_id: int = Field(foreign_key="airport.airport_id", primary_key=True, index=True)
+    departures: int = Field(default=0)
+    arrivals: int = Field(default=0)
+    # Flights with from = to: counted as departure and arrival, once in totals
+    loop_flights: int = Field(default=0)
+    departing_pax: int = Field(default=0)
+    arriving_pax: int = Field(default=0)
+    loop_pax: int = Field(default=0)
+    pax_flights: int = Field(default=0)
+    updated_at: dt.datetime
@@ -0,0 +1,263 @@
+"""
+Airport Leaderboard Query Benchmark - DATE()/OR Join vs Range/UNION ALL
+
+Compares the original AirportLeaderboard queries with the rewritten ones:
+
+- Legacy: DATE(f.departure) = :flight_date with an OR join on from/to, which
+  wraps the indexed column in a function and forces a full flight scan
+- Current: departure >= :day_start AND departure < :day_end with departures
+  and arrivals counted in separate UNION ALL branches
+
+For each query the benchmark prints the EXPLAIN plan (access type, key, rows)
+of both versions, times repeated executions and checks that they return the
+same rows. Run it before and after scripts/migrate_leaderboard_indexes.py
+upgrade to see the effect of the composite indexes.
+
+Usage:
+    python samples/benchmark_airport_leaderboard_queries.py --date 2025-11-20
+    python samples/benchmark_airport_leaderboard_queries.py --iterations 20 --airport LAX
+"""
+
+import sys
+import time
+import statistics
+import typer
+from pathlib import Path
+from typing import Dict, List
+from datetime import date, datetime
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from daos.airport_leaderboard import AirportLeaderboard
+from sqlalchemy import text
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+# Initialize typer app and rich console
+app = typer.Typer(help="Airport Leaderboard Query Benchmark - DATE()/OR join vs range/UNION ALL")
+console = Console()
+
+
+LEGACY_AIRPORT_FLIGHTS_QUERY = """
+    SELECT
+        a.airport_id,
+        a.iata,
+        a.icao,
+        a.name,
+        :flight_date as date,
+        COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN f.flight_id END) as departures,
+        COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN f.flight_id END) as arrivals,
+        COUNT(DISTINCT f.flight_id) as total_flights
+    FROM airport a
+    LEFT JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
+        AND DATE(f.departure) = :flight_date
+    WHERE a.iata = :airport_iata
+        AND a.iata IS NOT NULL
+    GROUP BY a.airport_id, a.iata, a.icao, a.name
+"""
+
+LEGACY_TOP_FLIGHTS_QUERY = """
+    SELECT
+        a.airport_id,
+        a.iata,
+        a.icao,
+        a.name,
+        COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN f.flight_id END) as departures,
+        COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN f.flight_id END) as arrivals,
+        COUNT(DISTINCT f.flight_id) as total_flights
+    FROM airport a
+    INNER JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
+    WHERE DATE(f.departure) = :flight_date
+        AND a.iata IS NOT NULL
+    GROUP BY a.airport_id, a.iata, a.icao, a.name
+    HAVING total_flights > 0
+    ORDER BY total_flights DESC, a.name ASC
+    LIMIT :limit
+"""
+
+LEGACY_TOP_PASSENGERS_QUERY = """
+    SELECT
+        a.airport_id,
+        a.iata,
+        a.icao,
+        a.name,
+        COUNT(DISTINCT CASE WHEN f.from = a.airport_id THEN b.booking_id END) as departing_passengers,
+        COUNT(DISTINCT CASE WHEN f.to = a.airport_id THEN b.booking_id END) as arriving_passengers,
+        COUNT(DISTINCT b.booking_id) as total_passengers,
+        COUNT(DISTINCT f.flight_id) as total_flights
+    FROM airport a
+    INNER JOIN flight f ON (f.from = a.airport_id OR f.to = a.airport_id)
+    INNER JOIN booking b ON b.flight_id = f.flight_id
+    WHERE DATE(f.departure) = :flight_date
+        AND a.iata IS NOT NULL
+    GROUP BY a.airport_id, a.iata, a.icao, a.name
+    HAVING total_passengers > 0
+    ORDER BY total_passengers DESC, a.name ASC
+    LIMIT :limit
+"""
+
+# (name, legacy SQL, current SQL, columns compared between the two result sets)
+QUERIES = [
+    (
+        "Airport flights on date",
+        LEGACY_AIRPORT_FLIGHTS_QUERY,
+        AirportLeaderboard.AIRPORT_FLIGHTS_QUERY,
+        ("iata", "departures", "arrivals", "total_flights"),
+    ),
+    (
+        "Top airports by flights",
+        LEGACY_TOP_FLIGHTS_QUERY,
+        AirportLeaderboard.TOP_FLIGHTS_QUERY,
+        ("iata", "departures", "arrivals", "total_flights"),
+    ),
+    (
+        "Top airports by passengers",
+        LEGACY_TOP_PASSENGERS_QUERY,
+        AirportLeaderboard.TOP_PASSENGERS_QUERY,
+        ("iata", "departing_passengers", "arriving_passengers", "total_passengers", "total_flights"),
+    ),
+]
+
+
+def format_time_ms(ms: float) -> str:
+    """Format milliseconds in a human-readable way."""
+    if ms < 1:
+        return f"{ms * 1000:.1f}µs"
+    elif ms < 1000:
+        return f"{ms:.2f}ms"
+    else:
+        return f"{ms / 1000:.3f}s"
+
+
+def explain(conn, sql: str, params: Dict) -> List[Dict]:
+    """Run EXPLAIN and return one dict per plan row."""
+    result = conn.execute(text(f"EXPLAIN {sql}"), params)
+    return [dict(row._mapping) for row in result]
+
+
+def time_query(conn, sql: str, params: Dict, iterations: int) -> tuple[List[float], List[Dict]]:
+    """Execute a query repeatedly and return (latencies_ms, last_rows)."""
+    latencies = []
+    rows = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = [dict(row._mapping) for row in conn.execute(text(sql), params)]
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, rows
+
+
+def print_plan(title: str, plan: List[Dict]):
+    """Print the interesting EXPLAIN columns as a table."""
+    table = Table(title=title, box=box.SIMPLE, title_justify="left")
+    for column in ("table", "type", "key", "rows", "Extra"):
+        table.add_column(column, style="cyan" if column == "key" else None)
+    for row in plan:
+        table.add_row(*(str(row.get(column) if row.get(column) is not None else "-")
+                        for column in ("table", "type", "key", "rows", "Extra")))
+    console.print(table)
+
+
+@app.command()
+def run(
+    date_str: str = typer.Option(
+        None,
+        "--date",
+        help="Date in YYYY-MM-DD format (defaults to today)"
+    ),
+    airport: str = typer.Option(
+        "JFK",
+        "--airport",
+        "-a",
+        help="IATA code for the single-airport query"
+    ),
+    limit: int = typer.Option(
+        10,
+        "--limit",
+        "-l",
+        help="Number of airports in the top-N queries"
+    ),
+    iterations: int = typer.Option(
+        5,
+        "--iterations",
+        "-n",
+        help="Timed executions per query (after one warm-up run)"
+    ),
+    show_plans: bool = typer.Option(
+        True,
+        "--plans/--no-plans",
+        help="Print EXPLAIN output for both versions"
+    )
+):
+    """
+    Benchmark the legacy and rewritten airport leaderboard queries.
+    """
+    flight_date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else date.today()
+    day_start, day_end = AirportLeaderboard._day_bounds(flight_date)
+    params = {
+        "flight_date": flight_date.strftime("%Y-%m-%d"),
+        "day_start": day_start,
+        "day_end": day_end,
+        "airport_iata": airport.upper(),
+        "limit": limit,
+    }
+    
+    console.print(Panel.fit(
+        "[bold cyan]AIRPORT LEADERBOARD QUERY BENCHMARK[/bold cyan]\n"
+        f"[yellow]{flight_date} • {iterations} iterations • DATE()/OR join vs range/UNION ALL[/yellow]",
+        border_style="cyan",
+        box=box.DOUBLE
+    ))
+    
+    leaderboard = AirportLeaderboard()
+    summary = Table(title="📊 Latency Comparison", box=box.ROUNDED)
+    summary.add_column("Query", style="cyan")
+    summary.add_column("Legacy p50", justify="right", style="red")
+    summary.add_column("Current p50", justify="right", style="green")
+    summary.add_column("Speedup", justify="right", style="yellow")
+    summary.add_column("Same rows", justify="center")
+    
+    with leaderboard.db_engine.connect() as conn:
+        for name, legacy_sql, current_sql, compare_columns in QUERIES:
+            console.print(f"\n[bold]{name}[/bold]")
+            
+            if show_plans:
+                print_plan("Legacy plan", explain(conn, legacy_sql, params))
+                print_plan("Current plan", explain(conn, current_sql, params))
+            
+            # Warm-up run so both versions start with the same buffer pool state
+            time_query(conn, legacy_sql, params, 1)
+            time_query(conn, current_sql, params, 1)
+            
+            legacy_ms, legacy_rows = time_query(conn, legacy_sql, params, iterations)
+            current_ms, current_rows = time_query(conn, current_sql, params, iterations)
+            
+            legacy_p50 = statistics.median(legacy_ms)
+            current_p50 = statistics.median(current_ms)
+            same = (
+                [tuple(row[c] for c in compare_columns) for row in legacy_rows]
+                == [tuple(row[c] for c in compare_columns) for row in current_rows]
+            )
+            
+            summary.add_row(
+                name,
+                format_time_ms(legacy_p50),
+                format_time_ms(current_p50),
+                f"{legacy_p50 / current_p50:.1f}x" if current_p50 > 0 else "-",
+                "[green]✓[/green]" if same else "[red]✗[/red]"
+            )
+    
+    console.print()
+    console.print(summary)
+    console.print(
+        "\n[dim]Tip: compare runs before and after "
+        "`python scripts/migrate_leaderboard_indexes.py upgrade`[/dim]\n"
+    )
+    
+    leaderboard.close()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,226 @@
+"""
+Embedding Micro-Batching Benchmark - Throughput vs Latency
+
+Runs the SentenceTransformer model under concurrent load with and without the
+EmbeddingBatcher and reports, for each batch window:
+
+- Throughput (texts/s over the whole run)
+- Per-request latency p50 / p99 (queueing + batching window + encode)
+- Average batch size actually formed
+
+The model is called directly (no Valkey, no embedding cache) so every request
+costs a real forward pass. Window 0 is the baseline: every caller encodes its
+own text on its own thread.
+
+Usage:
+    python samples/benchmark_embedding_batching.py
+    python samples/benchmark_embedding_batching.py --concurrency 32 --windows 0,2,5,10
+    python samples/benchmark_embedding_batching.py --asyncio --plot
+"""
+
+import sys
+import os
+import time
+import asyncio
+import statistics
+import typer
+from pathlib import Path
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.embedding_batcher import EmbeddingBatcher
+from dotenv import load_dotenv
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+load_dotenv()
+
+# Initialize typer app and rich console
+app = typer.Typer(help="Embedding Micro-Batching Benchmark - throughput vs latency")
+console = Console()
+
+PROMPT_TEMPLATES = [
+    "Show me all passengers on flight {}",
+    "How many bookings were made for flight {}?",
+    "List the departures from airport {} today",
+    "Which airline operates flight {}?",
+]
+
+
+def make_texts(count: int) -> List[str]:
+    """Distinct prompts, so nothing can be served from a cache."""
+    return [PROMPT_TEMPLATES[i % len(PROMPT_TEMPLATES)].format(i) for i in range(count)]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_threads(embed, texts: List[str], concurrency: int) -> tuple[float, List[float]]:
+    """Embed texts from a thread pool; return (elapsed_s, latencies_ms)."""
+    def timed(text):
+        start = time.perf_counter()
+        embed(text)
+        return (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, texts))
+    return time.perf_counter() - start, latencies
+
+
+def run_asyncio(embed_async, texts: List[str], concurrency: int) -> tuple[float, List[float]]:
+    """Embed texts from asyncio tasks (at most concurrency in flight)."""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def timed(text):
+            async with semaphore:
+                start = time.perf_counter()
+                await embed_async(text)
+                return (time.perf_counter() - start) * 1000
+        
+        return await asyncio.gather(*(timed(text) for text in texts))
+    
+    start = time.perf_counter()
+    latencies = asyncio.run(main())
+    return time.perf_counter() - start, list(latencies)
+
+
+@app.command()
+def run(
+    windows: str = typer.Option(
+        "0,1,2,5,10,20",
+        "--windows",
+        "-w",
+        help="Comma-separated batch windows in ms (0 = no batching)"
+    ),
+    concurrency: int = typer.Option(
+        16,
+        "--concurrency",
+        "-c",
+        help="Concurrent callers"
+    ),
+    requests: int = typer.Option(
+        512,
+        "--requests",
+        "-n",
+        help="Texts embedded per window"
+    ),
+    max_batch_size: int = typer.Option(
+        32,
+        "--max-batch-size",
+        "-b",
+        help="Flush a batch as soon as it holds this many texts"
+    ),
+    use_asyncio: bool = typer.Option(
+        False,
+        "--asyncio",
+        help="Drive the load from asyncio tasks instead of threads"
+    ),
+    plot: bool = typer.Option(
+        False,
+        "--plot",
+        help="Plot throughput vs p50 latency in the terminal"
+    )
+):
+    """
+    Measure throughput and latency of concurrent embedding with different batch windows.
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    window_values = [float(window) for window in windows.split(",")]
+    texts = make_texts(requests)
+    
+    console.print(Panel.fit(
+        "[bold cyan]EMBEDDING MICRO-BATCHING BENCHMARK[/bold cyan]\n"
+        f"[yellow]{model_name} • {concurrency} {'asyncio tasks' if use_asyncio else 'threads'} • "
+        f"{requests} texts per run • max batch {max_batch_size}[/yellow]",
+        border_style="cyan",
+        box=box.DOUBLE
+    ))
+    
+    with console.status("[cyan]Loading model...[/cyan]"):
+        model = SentenceTransformer(model_name)
+        model.encode(texts[:max_batch_size], batch_size=max_batch_size)  # warm-up
+    
+    def encode_one(text):
+        return model.encode(text, convert_to_numpy=True)
+    
+    def encode_batch(batch):
+        return model.encode(batch, batch_size=len(batch), convert_to_numpy=True)
+    
+    table = Table(title="📊 Throughput vs Latency", box=box.ROUNDED)
+    table.add_column("Window", justify="right", style="cyan")
+    table.add_column("Throughput", justify="right", style="green")
+    table.add_column("p50", justify="right")
+    table.add_column("p99", justify="right", style="yellow")
+    table.add_column("Avg batch", justify="right")
+    table.add_column("vs unbatched", justify="right", style="magenta")
+    
+    rows: List[Dict] = []
+    baseline = None
+    for window in window_values:
+        if window <= 0:
+            if use_asyncio:
+                loop_embed = lambda text: asyncio.get_running_loop().run_in_executor(None, encode_one, text)
+                elapsed, latencies = run_asyncio(loop_embed, texts, concurrency)
+            else:
+                elapsed, latencies = run_threads(encode_one, texts, concurrency)
+            avg_batch = 1.0
+        else:
+            with EmbeddingBatcher(encode_batch, max_batch_size=max_batch_size, max_wait_ms=window) as batcher:
+                if use_asyncio:
+                    elapsed, latencies = run_asyncio(batcher.embed_async, texts, concurrency)
+                else:
+                    elapsed, latencies = run_threads(batcher.embed, texts, concurrency)
+                avg_batch = batcher.get_stats()["avg_batch_size"]
+        
+        throughput = len(texts) / elapsed
+        if baseline is None and window <= 0:
+            baseline = throughput
+        rows.append({"window": window, "throughput": throughput, "p50": statistics.median(latencies)})
+        
+        table.add_row(
+            "off" if window <= 0 else f"{window:g} ms",
+            f"{throughput:,.0f} texts/s",
+            f"{statistics.median(latencies):.1f} ms",
+            f"{percentile(latencies, 99):.1f} ms",
+            f"{avg_batch:.1f}",
+            f"{throughput / baseline:.1f}x" if baseline else "-"
+        )
+    
+    console.print()
+    console.print(table)
+    console.print(
+        "\n[dim]Longer windows form bigger batches (higher throughput) at the cost of "
+        "up to one window of extra latency per request.[/dim]\n"
+    )
+    
+    if plot:
+        import plotext as plt
+        
+        plt.clear_figure()
+        plt.plot(
+            [row["p50"] for row in rows],
+            [row["throughput"] for row in rows],
+            marker="dot"
+        )
+        for row in rows:
+            plt.text("off" if row["window"] <= 0 else f"{row['window']:g}ms", row["p50"], row["throughput"])
+        plt.title("Throughput vs p50 latency by batch window")
+        plt.xlabel("p50 latency (ms)")
+        plt.ylabel("texts/s")
+        plt.show()
+
+
+if __name__ == "__main__":
+    app()
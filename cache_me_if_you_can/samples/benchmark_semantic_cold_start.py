@@ -0,0 +1,162 @@
+"""
+Semantic Cache Cold-Start Benchmark - Eager vs Lazy Model Loading
+
+Measures how long a fresh process takes to become useful with SemanticSQLCache:
+
+- Import of core.semantic_search
+- SemanticSQLCache() construction (connect + index creation)
+- First exact-match lookup (semantic:prompt:<hash> hit)
+- First embedding (the model load, if it has not happened yet)
+
+"eager" reproduces the previous behaviour by loading the model during
+construction; "lazy" is the current behaviour, where construction, index
+creation, --flush and exact hits never touch the model; "warm" loads the model
+in a background thread while the process goes on.
+
+Every mode runs in a fresh Python process so import and model caches of one
+mode cannot help the next. Requires Valkey (VECTOR_HOST/VECTOR_PORT).
+
+Usage:
+    python samples/benchmark_semantic_cold_start.py
+    python samples/benchmark_semantic_cold_start.py --runs 3
+"""
+
+import sys
+import os
+import json
+import statistics
+import subprocess
+import typer
+from pathlib import Path
+from typing import Dict, List
+
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+# Initialize typer app and rich console
+app = typer.Typer(help="Semantic Cache Cold-Start Benchmark - eager vs lazy model loading")
+console = Console()
+
+# Runs in a fresh interpreter; prints one JSON line with timings in ms
+CHILD_SCRIPT = """
+import json, sys, time
+mode = sys.argv[1]
+timings = {}
+
+start = time.perf_counter()
+from daos.semantic_cache import SemanticSQLCache
+from core.semantic_search import SemanticSearch
+timings["import"] = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+cache = SemanticSQLCache(warm_model=(mode == "warm"))
+if mode == "eager":
+    cache.semantic_search.embedding_model
+timings["construct"] = (time.perf_counter() - start) * 1000
+
+prompt = "cold start benchmark prompt"
+prompt_hash = SemanticSearch.hash_text(prompt)
+cache.valkey_client.set("db:query:cold-start-benchmark", json.dumps({"sql": "SELECT 1"}))
+cache.valkey_client.set(f"semantic:prompt:{prompt_hash}", "db:query:cold-start-benchmark")
+
+start = time.perf_counter()
+result = cache.get_or_generate_sql(prompt, verbose=False)
+timings["exact_hit"] = (time.perf_counter() - start) * 1000
+timings["model_loaded_after_exact_hit"] = cache.semantic_search.model_loaded
+
+start = time.perf_counter()
+cache.semantic_search.generate_embeddings(["first embedding after start"])
+timings["first_embedding"] = (time.perf_counter() - start) * 1000
+
+cache.valkey_client.delete("db:query:cold-start-benchmark", f"semantic:prompt:{prompt_hash}")
+print("RESULT " + json.dumps(timings))
+"""
+
+MODES = ["eager", "lazy", "warm"]
+
+
+def run_child(mode: str) -> Dict:
+    """Run one cold start in a fresh interpreter and return its timings."""
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, mode],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        # Embeddings must be computed, not read from the Valkey embedding cache
+        env={**os.environ, "EMBEDDING_CACHE_TTL": "0"}
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+
+
+def format_time_ms(ms: float) -> str:
+    """Format milliseconds in a human-readable way."""
+    if ms < 1:
+        return f"{ms * 1000:.1f}µs"
+    elif ms < 1000:
+        return f"{ms:.2f}ms"
+    else:
+        return f"{ms / 1000:.3f}s"
+
+
+@app.command()
+def run(
+    runs: int = typer.Option(
+        1,
+        "--runs",
+        "-n",
+        help="Fresh processes per mode (median is reported)"
+    )
+):
+    """
+    Compare cold-start timings of eager, lazy and background-warmed model loading.
+    """
+    console.print(Panel.fit(
+        "[bold cyan]SEMANTIC CACHE COLD-START BENCHMARK[/bold cyan]\n"
+        f"[yellow]{runs} fresh process(es) per mode • eager vs lazy vs background warm-up[/yellow]",
+        border_style="cyan",
+        box=box.DOUBLE
+    ))
+    
+    results: Dict[str, List[Dict]] = {}
+    for mode in MODES:
+        with console.status(f"[cyan]Running {mode} cold start...[/cyan]"):
+            results[mode] = [run_child(mode) for _ in range(runs)]
+    
+    table = Table(title="🚀 Cold Start (median)", box=box.ROUNDED)
+    table.add_column("Phase", style="cyan")
+    for mode in MODES:
+        table.add_column(mode.capitalize(), justify="right")
+    
+    for phase, label in [
+        ("import", "Import modules"),
+        ("construct", "SemanticSQLCache()"),
+        ("exact_hit", "First exact hit"),
+        ("first_embedding", "First embedding"),
+    ]:
+        table.add_row(label, *(
+            format_time_ms(statistics.median(run[phase] for run in results[mode]))
+            for mode in MODES
+        ))
+    
+    table.add_row("Model loaded by exact hit", *(
+        "yes" if results[mode][0]["model_loaded_after_exact_hit"] else "[green]no[/green]"
+        for mode in MODES
+    ))
+    
+    console.print()
+    console.print(table)
+    console.print(
+        "\n[dim]Lazy: construction and exact hits skip the model; the first semantic lookup "
+        "pays for it. Warm: the load overlaps with whatever the process does first.[/dim]\n"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,319 @@
+"""
+Vector Index Benchmark - HNSW Tuning vs FLAT at 10k / 100k / 1M Vectors
+
+Loads prompt embeddings into a local Valkey with the search module and, for
+every index configuration and dataset size, reports:
+
+- Build time (FT.CREATE until the backfill has indexed every vector)
+- Index memory (used_memory growth while building)
+- Query latency p50 / p99 (FT.SEARCH KNN)
+- recall@k against exact brute-force search in NumPy
+
+The vectors are written once per size under bench:vec:<i>; each configuration
+then builds its own index over them, so build time and memory belong to the
+index alone.
+
+Embeddings are synthetic clusters of near-duplicates (like paraphrased prompts)
+unless --recorded points to a .npy matrix or to "valkey" (the stored
+embedding:prompt:* vectors); recorded vectors are resampled with a little noise
+to reach each size. 1M × 384 float32 needs ~1.5 GB in this process and
+several GB in Valkey.
+
+Usage:
+    python samples/benchmark_vector_index.py
+    python samples/benchmark_vector_index.py --sizes 10000,100000 --k 10
+    python samples/benchmark_vector_index.py --configs "HNSW:m=16:efc=200:ef=10,HNSW:m=32:efc=400:ef=100,FLAT"
+    python samples/benchmark_vector_index.py --recorded valkey --sizes 10000
+"""
+
+import sys
+import time
+import statistics
+import typer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.embedding_index import EmbeddingIndex
+from core.semantic_search import SemanticSearch
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+# Initialize typer app and rich console
+app = typer.Typer(help="Vector Index Benchmark - HNSW tuning vs FLAT")
+console = Console()
+
+KEY_PREFIX = "bench:vec:"
+INDEX_NAME = "bench_vector_index"
+
+# Short option names used in --configs
+CONFIG_OPTIONS = {"m": "m", "efc": "ef_construction", "ef": "ef_runtime", "cap": "initial_cap"}
+
+
+def parse_config(spec: str) -> Dict:
+    """Parse "HNSW:m=16:efc=200:ef=10" (or "FLAT") into create_vector_index kwargs."""
+    algorithm, *options = spec.strip().split(":")
+    config = {"algorithm": algorithm.upper()}
+    for option in options:
+        name, value = option.split("=")
+        config[CONFIG_OPTIONS[name]] = int(value)
+    return config
+
+
+def load_recorded(source: str, search: SemanticSearch) -> np.ndarray:
+    """Recorded embeddings from a .npy file or from embedding:prompt:* in Valkey."""
+    if source != "valkey":
+        return np.load(source).astype(np.float32)
+    
+    client = search.valkey_client
+    keys = list(client.scan_iter(match="embedding:prompt:*", count=1000))
+    if not keys:
+        raise typer.BadParameter("No embedding:prompt:* vectors stored in Valkey")
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hget(key, "embedding")
+    return np.vstack([search.vector_from_bytes(data) for data in pipe.execute() if data])
+
+
+def make_vectors(count: int, dim: int, rng: np.random.Generator, recorded: Optional[np.ndarray]) -> np.ndarray:
+    """Normalized vectors: resampled recordings, or clusters of ~20 noisy copies of random centers."""
+    if recorded is not None:
+        base = recorded[rng.integers(0, len(recorded), count)]
+        scale = 0.05 * float(np.std(recorded))
+    else:
+        centers = rng.standard_normal((max(1, count // 20), dim)).astype(np.float32)
+        base = centers[rng.integers(0, len(centers), count)]
+        scale = 0.35
+    return EmbeddingIndex.normalize(base + scale * rng.standard_normal(base.shape).astype(np.float32))
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Brute-force cosine top-k (rows of data are normalized)."""
+    truth = []
+    for query in EmbeddingIndex.normalize(queries):
+        scores = data @ query
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def ft_info(client, index_name: str) -> Dict[str, object]:
+    """Top-level FT.INFO fields as a str-keyed dict."""
+    reply = client.execute_command("FT.INFO", index_name)
+    if isinstance(reply, dict):
+        items = reply.items()
+    else:
+        items = zip(reply[::2], reply[1::2])
+    return {
+        (key.decode() if isinstance(key, bytes) else str(key)): (value.decode() if isinstance(value, bytes) else value)
+        for key, value in items
+    }
+
+
+def wait_for_backfill(client, index_name: str, expected: int, timeout: float) -> bool:
+    """Poll FT.INFO until every vector is indexed (or timeout seconds pass)."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        info = ft_info(client, index_name)
+        if int(info.get("num_docs", 0)) >= expected and str(info.get("backfill_in_progress", "0")) == "0":
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def write_vectors(client, data: np.ndarray, batch_size: int = 1000) -> float:
+    """HSET every vector under bench:vec:<i>; return elapsed seconds."""
+    start = time.perf_counter()
+    pipe = client.pipeline(transaction=False)
+    for i, vector in enumerate(data):
+        pipe.hset(f"{KEY_PREFIX}{i}", mapping={"embedding": vector.tobytes()})
+        if i % batch_size == batch_size - 1:
+            pipe.execute()
+    pipe.execute()
+    return time.perf_counter() - start
+
+
+def delete_vectors(client, count: int, batch_size: int = 1000) -> None:
+    """Remove bench:vec:0..count-1."""
+    for batch_start in range(0, count, batch_size):
+        client.unlink(*(f"{KEY_PREFIX}{i}" for i in range(batch_start, min(batch_start + batch_size, count))))
+
+
+def query_index(client, queries: np.ndarray, k: int) -> tuple[List[set], List[float]]:
+    """Run every query through FT.SEARCH; return (result id sets, latencies ms)."""
+    from valkey.commands.search.query import Query
+    
+    query_obj = (
+        Query(f"*=>[KNN {k} @embedding $vec AS score]")
+        .return_fields("score")
+        .paging(0, k)
+        .dialect(2)
+    )
+    results, latencies = [], []
+    for query in queries:
+        vector = query.astype(np.float32).tobytes()
+        start = time.perf_counter()
+        docs = client.ft(INDEX_NAME).search(query_obj, {"vec": vector}).docs
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({
+            int((doc.id.decode() if isinstance(doc.id, bytes) else doc.id).rsplit(":", 1)[1])
+            for doc in docs
+        })
+    return results, latencies
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def format_time_ms(ms: float) -> str:
+    """Format milliseconds in a human-readable way."""
+    if ms < 1:
+        return f"{ms * 1000:.1f}µs"
+    elif ms < 1000:
+        return f"{ms:.2f}ms"
+    else:
+        return f"{ms / 1000:.3f}s"
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count in a human-readable way."""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+@app.command()
+def run(
+    sizes: str = typer.Option(
+        "10000,100000,1000000",
+        "--sizes",
+        "-s",
+        help="Comma-separated dataset sizes"
+    ),
+    configs: str = typer.Option(
+        "HNSW:m=16:efc=200:ef=10,HNSW:m=16:efc=200:ef=100,HNSW:m=32:efc=400:ef=100,FLAT",
+        "--configs",
+        "-c",
+        help="Comma-separated index configs: HNSW[:m=..][:efc=..][:ef=..][:cap=..] or FLAT"
+    ),
+    dim: int = typer.Option(
+        384,
+        "--dim",
+        help="Embedding dimension (ignored with --recorded)"
+    ),
+    queries: int = typer.Option(
+        200,
+        "--queries",
+        "-q",
+        help="Queries per configuration"
+    ),
+    k: int = typer.Option(
+        10,
+        "--k",
+        "-k",
+        help="Neighbours per query (recall@k)"
+    ),
+    recorded: Optional[str] = typer.Option(
+        None,
+        "--recorded",
+        help="Path to a .npy embedding matrix, or 'valkey' for the stored embedding:prompt:* vectors"
+    ),
+    timeout: float = typer.Option(
+        3600,
+        "--timeout",
+        help="Seconds to wait for an index backfill"
+    )
+):
+    """
+    Benchmark HNSW/FLAT index build time, memory, latency and recall@k.
+    """
+    size_values = [int(size) for size in sizes.split(",")]
+    config_values = [parse_config(spec) for spec in configs.split(",")]
+    rng = np.random.default_rng(42)
+    
+    search = SemanticSearch(vector_dim=dim, vector_type="FLOAT32")
+    client = search.valkey_client
+    recorded_vectors = load_recorded(recorded, search) if recorded else None
+    if recorded_vectors is not None:
+        dim = recorded_vectors.shape[1]
+        search = SemanticSearch(valkey_client=client, vector_dim=dim, vector_type="FLOAT32")
+    
+    console.print(Panel.fit(
+        "[bold cyan]VECTOR INDEX BENCHMARK[/bold cyan]\n"
+        f"[yellow]{', '.join(f'{size:,}' for size in size_values)} vectors • dim={dim} • "
+        f"{'recorded' if recorded else 'synthetic'} • {queries} queries • recall@{k}[/yellow]",
+        border_style="cyan",
+        box=box.DOUBLE
+    ))
+    
+    table = Table(title="📊 Vector Index Build / Query / Recall", box=box.ROUNDED)
+    table.add_column("Vectors", justify="right", style="cyan")
+    table.add_column("Index", style="cyan")
+    table.add_column("Build", justify="right")
+    table.add_column("Memory", justify="right", style="green")
+    table.add_column("p50", justify="right")
+    table.add_column("p99", justify="right", style="yellow")
+    table.add_column(f"Recall@{k}", justify="right", style="magenta")
+    
+    search.drop_index(INDEX_NAME)
+    for size in size_values:
+        with console.status(f"[cyan]Generating and writing {size:,} vectors...[/cyan]"):
+            data = make_vectors(size, dim, rng, recorded_vectors)
+            # Queries are fresh paraphrases of stored prompts
+            query_vectors = data[rng.integers(0, size, queries)] + 0.2 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim)
+            write_seconds = write_vectors(client, data)
+            truth = exact_top_k(data, query_vectors, k)
+        console.print(f"[dim]Wrote {size:,} vectors in {write_seconds:.1f}s[/dim]")
+        
+        for config in config_values:
+            label = config["algorithm"] + "".join(
+                f" {name}={config[option]}" for name, option in CONFIG_OPTIONS.items() if option in config
+            )
+            with console.status(f"[cyan]{size:,} vectors • building {label}...[/cyan]"):
+                used_before = client.info("memory")["used_memory"]
+                start = time.perf_counter()
+                if not search.create_vector_index(INDEX_NAME, KEY_PREFIX, **config):
+                    delete_vectors(client, size)
+                    console.print("[red]❌ Could not create the index; is the search module loaded?[/red]")
+                    raise typer.Exit(1)
+                complete = wait_for_backfill(client, INDEX_NAME, size, timeout)
+                build_ms = (time.perf_counter() - start) * 1000
+                used_after = client.info("memory")["used_memory"]
+                
+                results, latencies = query_index(client, query_vectors, k)
+                recall = statistics.mean(len(found & expected) / k for found, expected in zip(results, truth))
+                search.drop_index(INDEX_NAME)
+            
+            table.add_row(
+                f"{size:,}",
+                label,
+                format_time_ms(build_ms) + ("" if complete else " [red](timeout)[/red]"),
+                format_bytes(used_after - used_before),
+                format_time_ms(statistics.median(latencies)),
+                format_time_ms(percentile(latencies, 99)),
+                f"{recall:.3f}"
+            )
+        
+        delete_vectors(client, size)
+        del data
+    
+    console.print()
+    console.print(table)
+    console.print(
+        "\n[dim]Higher M / EF_CONSTRUCTION buy recall with build time and memory; EF_RUNTIME "
+        "trades query latency for recall. FLAT is exact but scans every vector.[/dim]\n"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,251 @@
+"""
+Vector Precision Benchmark - Memory vs Recall@k
+
+Compares storing prompt embeddings as FLOAT32, FLOAT16 and int8 (scalar
+quantized) and reports, for each precision:
+
+- Vector memory (bytes per vector, in-process matrix size)
+- Query latency p50
+- recall@k against exact float32 search
+
+In-process rows use EmbeddingIndex (the brute-force fallback); "float16 stored"
+rows round-trip the vectors through float16, as happens when VECTOR_TYPE=FLOAT16
+hashes are loaded. With --valkey the same vectors are also written to Valkey
+under FLOAT32 and FLOAT16 indexes (where the search module supports them) to
+measure used_memory and FT.SEARCH recall.
+
+Vectors are synthetic clusters of near-duplicates (like paraphrased prompts),
+so neighbours are close together and quantization errors can reorder them.
+
+Usage:
+    python samples/benchmark_vector_precision.py
+    python samples/benchmark_vector_precision.py --vectors 100000 --k 10
+    python samples/benchmark_vector_precision.py --valkey --valkey-vectors 10000
+"""
+
+import sys
+import time
+import statistics
+import typer
+from pathlib import Path
+from typing import List, Set
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.embedding_index import EmbeddingIndex
+from core.semantic_search import SemanticSearch
+from rich.console import Console
+from rich.table import Table
+from rich.panel import Panel
+from rich import box
+
+# Initialize typer app and rich console
+app = typer.Typer(help="Vector Precision Benchmark - memory vs recall@k")
+console = Console()
+
+
+def make_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Clusters of ~20 noisy copies of random centers."""
+    centers = rng.standard_normal((max(1, count // 20), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), count)
+    return centers[labels] + 0.35 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def recall_at_k(results: List[Set[str]], truth: List[Set[str]], k: int) -> float:
+    """Mean fraction of the exact top-k found."""
+    return statistics.mean(len(found & expected) / k for found, expected in zip(results, truth))
+
+
+def format_time_ms(ms: float) -> str:
+    """Format milliseconds in a human-readable way."""
+    if ms < 1:
+        return f"{ms * 1000:.1f}µs"
+    elif ms < 1000:
+        return f"{ms:.2f}ms"
+    else:
+        return f"{ms / 1000:.3f}s"
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count in a human-readable way."""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def search_local(index: EmbeddingIndex, queries: np.ndarray, k: int) -> tuple[List[Set[str]], float]:
+    """Run every query; return (result id sets, p50 latency ms)."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        items = index.search(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({item["id"] for item in items})
+    return results, statistics.median(latencies)
+
+
+def run_valkey(vectors: np.ndarray, queries: np.ndarray, truth: List[Set[str]], k: int, table: Table) -> None:
+    """Index the vectors in Valkey as FLOAT32 and FLOAT16 and add one row per type."""
+    from valkey.commands.search.query import Query
+    
+    search = SemanticSearch(vector_dim=vectors.shape[1])
+    client = search.valkey_client
+    
+    for vector_type in SemanticSearch.VECTOR_TYPES:
+        prefix = f"bench:precision:{vector_type.lower()}:"
+        index_name = f"bench_precision_{vector_type.lower()}"
+        search.vector_type = vector_type
+        search.drop_index(index_name)
+        
+        used_before = client.info("memory")["used_memory"]
+        if not search.create_vector_index(index_name, prefix) or search.vector_type != vector_type:
+            search.drop_index(index_name)
+            table.add_row(f"Valkey {vector_type}", "-", "-", "-", "[dim]not supported[/dim]")
+            continue
+        
+        pipe = client.pipeline(transaction=False)
+        for i, vector in enumerate(vectors):
+            pipe.hset(f"{prefix}{i}", mapping={"embedding": search.vector_bytes(vector)})
+            if i % 1000 == 999:
+                pipe.execute()
+        pipe.execute()
+        
+        # Let background indexing catch up before measuring
+        time.sleep(1)
+        used_after = client.info("memory")["used_memory"]
+        
+        query_obj = (
+            Query(f"*=>[KNN {k} @embedding $vec AS score]")
+            .return_fields("score")
+            .paging(0, k)
+            .dialect(2)
+        )
+        results, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            docs = client.ft(index_name).search(query_obj, {"vec": search.vector_bytes(query)}).docs
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append({doc.id.decode() if isinstance(doc.id, bytes) else doc.id for doc in docs})
+        
+        # Match the local ids (embedding:prompt:<i>) used by the ground truth
+        results = [{f"embedding:prompt:{key.rsplit(':', 1)[1]}" for key in found} for found in results]
+        table.add_row(
+            f"Valkey {vector_type}",
+            f"{vectors.shape[1] * np.dtype(search.vector_dtype).itemsize} B",
+            f"{format_bytes(used_after - used_before)} used_memory",
+            format_time_ms(statistics.median(latencies)),
+            f"{recall_at_k(results, truth, k):.3f}"
+        )
+        
+        search.drop_index(index_name)
+        for batch_start in range(0, len(vectors), 1000):
+            client.unlink(*(f"{prefix}{i}" for i in range(batch_start, min(batch_start + 1000, len(vectors)))))
+
+
+@app.command()
+def run(
+    vectors: int = typer.Option(
+        50000,
+        "--vectors",
+        "-n",
+        help="Vectors in the in-process index"
+    ),
+    dim: int = typer.Option(
+        384,
+        "--dim",
+        help="Embedding dimension"
+    ),
+    queries: int = typer.Option(
+        200,
+        "--queries",
+        "-q",
+        help="Queries used for latency and recall"
+    ),
+    k: int = typer.Option(
+        5,
+        "--k",
+        "-k",
+        help="Neighbours per query (recall@k)"
+    ),
+    valkey: bool = typer.Option(
+        False,
+        "--valkey",
+        help="Also measure FLOAT32/FLOAT16 indexes in Valkey (VECTOR_HOST/VECTOR_PORT)"
+    ),
+    valkey_vectors: int = typer.Option(
+        10000,
+        "--valkey-vectors",
+        help="Vectors written to Valkey per index"
+    )
+):
+    """
+    Measure memory, latency and recall@k of float32, float16 and int8 vectors.
+    """
+    rng = np.random.default_rng(42)
+    data = make_vectors(vectors, dim, rng)
+    # Queries are fresh paraphrases of stored prompts
+    query_vectors = data[rng.integers(0, vectors, queries)] + 0.2 * rng.standard_normal((queries, dim)).astype(np.float32)
+    keys = [f"embedding:prompt:{i}" for i in range(vectors)]
+    
+    console.print(Panel.fit(
+        "[bold cyan]VECTOR PRECISION BENCHMARK[/bold cyan]\n"
+        f"[yellow]{vectors:,} vectors • dim={dim} • {queries} queries • recall@{k} vs float32[/yellow]",
+        border_style="cyan",
+        box=box.DOUBLE
+    ))
+    
+    table = Table(title="📊 Memory vs Recall", box=box.ROUNDED)
+    table.add_column("Storage", style="cyan")
+    table.add_column("Bytes/vector", justify="right")
+    table.add_column("Vector memory", justify="right", style="green")
+    table.add_column("Query p50", justify="right", style="yellow")
+    table.add_column(f"Recall@{k}", justify="right", style="magenta")
+    
+    half = data.astype(np.float16).astype(np.float32)
+    variants = [
+        ("float32", data, "float32", 4 * dim),
+        ("float16 stored", half, "float32", 2 * dim),
+        ("int8 local index", data, "int8", dim + 4),
+        ("float16 stored + int8", half, "int8", dim + 4),
+    ]
+    
+    truth = None
+    for label, matrix, precision, row_bytes in variants:
+        with console.status(f"[cyan]Building {label} index...[/cyan]"):
+            index = EmbeddingIndex(dim=dim, initial_capacity=vectors, precision=precision)
+            index.add_many(keys, matrix, [{}] * vectors)
+            results, p50 = search_local(index, query_vectors, k)
+        if truth is None:
+            truth = results
+        table.add_row(
+            label,
+            f"{row_bytes} B",
+            format_bytes(index.memory_bytes()),
+            format_time_ms(p50),
+            f"{recall_at_k(results, truth, k):.3f}"
+        )
+    
+    if valkey:
+        subset = min(valkey_vectors, vectors)
+        exact = EmbeddingIndex(dim=dim, initial_capacity=subset)
+        exact.add_many(keys[:subset], data[:subset], [{}] * subset)
+        subset_truth, _ = search_local(exact, query_vectors, k)
+        with console.status(f"[cyan]Indexing {subset:,} vectors in Valkey...[/cyan]"):
+            run_valkey(data[:subset], query_vectors, subset_truth, k, table)
+    
+    console.print()
+    console.print(table)
+    console.print(
+        "\n[dim]FLOAT16 halves the embedding bytes in Valkey; the int8 local index uses a "
+        "quarter of the float32 matrix. Recall is the share of the exact float32 top-k "
+        "returned (HNSW rows also include the approximate search's own misses).[/dim]\n"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -13,7 +13,12 @@ Key Features:
 
 Performance Comparison:
 - RDBMS: Complex JOIN queries with aggregations
-- Valkey: O(log(N)) sorted set operations (ZREVRANGE, ZSCORE)
+- Valkey: O(log(N)) sorted set operations (ZREVRANGE, ZREVRANK)
+
+Sorted set members are bare IATA codes; airport names and counts live in the
+per-day hash leaderboard:details:<date> (see LeaderboardService). Leaderboards
+written in the older IATA|Name|Dep|Arr member format can be converted with
+scripts/migrate_leaderboard_members.py.
 """
 
 import sys
@@ -30,6 +35,7 @@ from dataclasses import dataclass
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from daos.airport_leaderboard import AirportLeaderboard
+from daos.leaderboard_service import LeaderboardService
 from core import get_cache_client, get_db_engine
 from sqlalchemy import text
 from rich.console import Console
@@ -38,7 +44,6 @@ from rich.panel import Panel
 from rich import box
 from rich.prompt import Confirm
 from rich.progress import Progress, SpinnerColumn, TextColumn
-from tqdm import tqdm
 
 # Initialize typer app and rich console
 app = typer.Typer(help="Airport Leaderboard Demo - RDBMS vs Valkey Sorted Sets")
@@ -77,16 +82,19 @@ def print_section(title: str):
 
 def populate_valkey_leaderboards(
     leaderboard: AirportLeaderboard,
-    cache_client,
+    service: LeaderboardService,
     query_date: date
 ) -> Dict[str, int]:
     """
     Pre-populate Valkey with airport leaderboards using Sorted Sets.
     This operation is NOT timed as we're comparing read performance.
     
+    Members are IATA codes; details go to the per-day hash. Both sorted sets
+    and the hash are replaced in a single MULTI/EXEC.
+    
     Args:
         leaderboard: AirportLeaderboard DAO instance
-        cache_client: Valkey/Redis client
+        service: LeaderboardService writing the sorted sets and details hash
         query_date: Date to query for
     
     Returns:
@@ -94,77 +102,34 @@ def populate_valkey_leaderboards(
     """
     console.print("\n[yellow]📦 Pre-populating Valkey Sorted Sets...[/yellow]")
     
-    date_str = query_date.strftime("%Y-%m-%d")
-    
-    # Get top airports by flights
-    flights_key = f"leaderboard:flights:{date_str}"
-    
-    if VERBOSE:
-        console.print(f"\n[dim]Valkey Commands for flights leaderboard:[/dim]")
-        console.print(f"[dim]  DEL {flights_key}[/dim]")
-    
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         console=console
     ) as progress:
-        task = progress.add_task("[cyan]Fetching top airports by flights...", total=None)
+        task = progress.add_task("[cyan]Fetching top airports by flights and passengers...", total=None)
         top_by_flights = leaderboard.get_top_airports_by_flights(query_date, limit=100)
+        top_by_passengers = leaderboard.get_top_airports_by_passengers(query_date, limit=100)
         progress.update(task, completed=True)
     
-    # Clear existing sorted set
-    cache_client.client.delete(flights_key)
-    
-    # Populate flights leaderboard with progress bar
-    for airport in tqdm(
-        top_by_flights,
-        desc="Populating flights leaderboard",
-        unit="airport",
-        disable=VERBOSE
-    ):
-        score = airport['total_flights']
-        # Format: IATA|AirportName|Departures|Arrivals
-        member = f"{airport['iata']}|{airport['name']}|{airport['departures']}|{airport['arrivals']}"
-        
-        if VERBOSE and airport['rank'] <= 3:
-            console.print(f"[dim]  ZADD {flights_key} {score} '{member}'[/dim]")
-        
-        cache_client.client.zadd(flights_key, {member: score})
-    
-    # Get top airports by passengers
-    passengers_key = f"leaderboard:passengers:{date_str}"
-    
     if VERBOSE:
-        console.print(f"\n[dim]Valkey Commands for passengers leaderboard:[/dim]")
-        console.print(f"[dim]  DEL {passengers_key}[/dim]")
+        flights_key = service.key(LeaderboardService.FLIGHTS, query_date)
+        passengers_key = service.key(LeaderboardService.PASSENGERS, query_date)
+        details_key = service.details_key(query_date)
+        console.print(f"\n[dim]Valkey Commands (MULTI/EXEC):[/dim]")
+        console.print(f"[dim]  DEL {flights_key} {passengers_key} {details_key}[/dim]")
+        sample = " ".join(f"{a['total_flights']} {a['iata']}" for a in top_by_flights[:3])
+        console.print(f"[dim]  ZADD {flights_key} {sample} ...[/dim]")
+        sample = " ".join(f"{a['total_passengers']} {a['iata']}" for a in top_by_passengers[:3])
+        console.print(f"[dim]  ZADD {passengers_key} {sample} ...[/dim]")
+        if top_by_flights:
+            airport = top_by_flights[0]
+            console.print(
+                f"[dim]  HSET {details_key} {airport['iata']} "
+                f"'{{\"name\": \"{airport['name']}\", \"departures\": {airport['departures']}, ...}}' ...[/dim]"
+            )
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console
-    ) as progress:
-        task = progress.add_task("[cyan]Fetching top airports by passengers...", total=None)
-        top_by_passengers = leaderboard.get_top_airports_by_passengers(query_date, limit=100)
-        progress.update(task, completed=True)
-    
-    # Clear existing sorted set
-    cache_client.client.delete(passengers_key)
-    
-    # Populate passengers leaderboard with progress bar
-    for airport in tqdm(
-        top_by_passengers,
-        desc="Populating passengers leaderboard",
-        unit="airport",
-        disable=VERBOSE
-    ):
-        score = airport['total_passengers']
-        # Format: IATA|AirportName|DepartingPassengers|ArrivingPassengers|TotalFlights
-        member = f"{airport['iata']}|{airport['name']}|{airport['departing_passengers']}|{airport['arriving_passengers']}|{airport['total_flights']}"
-        
-        if VERBOSE and airport['rank'] <= 3:
-            console.print(f"[dim]  ZADD {passengers_key} {score} '{member}'[/dim]")
-        
-        cache_client.client.zadd(passengers_key, {member: score})
+    service.publish_snapshot(query_date, top_by_flights, top_by_passengers)
     
     console.print(f"[green]✓[/green] Populated {len(top_by_flights):,} airports in flights leaderboard")
     console.print(f"[green]✓[/green] Populated {len(top_by_passengers):,} airports in passengers leaderboard")
@@ -215,25 +180,27 @@ LIMIT {limit}
 
 
 def query_valkey_top_flights(
-    cache_client,
+    service: LeaderboardService,
     query_date: date,
     limit: int
 ) -> QueryMetrics:
-    """Query top airports by flights from Valkey Sorted Set."""
-    date_str = query_date.strftime("%Y-%m-%d")
-    flights_key = f"leaderboard:flights:{date_str}"
+    """Query top airports by flights (with details) from Valkey Sorted Set + hash."""
+    flights_key = service.key(LeaderboardService.FLIGHTS, query_date)
+    details_key = service.details_key(query_date)
     
+    # One round trip: ZREVRANGE, then HMGET of the returned IATA codes (Lua)
     commands = [
-        f"ZREVRANGE {flights_key} 0 {limit - 1} WITHSCORES"
+        f"ZREVRANGE {flights_key} 0 {limit - 1} WITHSCORES",
+        f"HMGET {details_key} <IATA codes from ZREVRANGE>"
     ]
     
     if VERBOSE:
-        console.print(f"\n[dim]Valkey Commands:[/dim]")
+        console.print(f"\n[dim]Valkey Commands (single EVALSHA):[/dim]")
         for cmd in commands:
             console.print(f"[dim]  {cmd}[/dim]")
     
     start = time.time()
-    results = cache_client.client.zrevrange(flights_key, 0, limit - 1, withscores=True)
+    results = service.get_top_with_details(LeaderboardService.FLIGHTS, query_date, limit)
     latency = (time.time() - start) * 1000
     
     return QueryMetrics(
@@ -287,25 +254,27 @@ LIMIT {limit}
 
 
 def query_valkey_top_passengers(
-    cache_client,
+    service: LeaderboardService,
     query_date: date,
     limit: int
 ) -> QueryMetrics:
-    """Query top airports by passengers from Valkey Sorted Set."""
-    date_str = query_date.strftime("%Y-%m-%d")
-    passengers_key = f"leaderboard:passengers:{date_str}"
+    """Query top airports by passengers (with details) from Valkey Sorted Set + hash."""
+    passengers_key = service.key(LeaderboardService.PASSENGERS, query_date)
+    details_key = service.details_key(query_date)
     
+    # One round trip: ZREVRANGE, then HMGET of the returned IATA codes (Lua)
     commands = [
-        f"ZREVRANGE {passengers_key} 0 {limit - 1} WITHSCORES"
+        f"ZREVRANGE {passengers_key} 0 {limit - 1} WITHSCORES",
+        f"HMGET {details_key} <IATA codes from ZREVRANGE>"
     ]
     
     if VERBOSE:
-        console.print(f"\n[dim]Valkey Commands:[/dim]")
+        console.print(f"\n[dim]Valkey Commands (single EVALSHA):[/dim]")
         for cmd in commands:
             console.print(f"[dim]  {cmd}[/dim]")
     
     start = time.time()
-    results = cache_client.client.zrevrange(passengers_key, 0, limit - 1, withscores=True)
+    results = service.get_top_with_details(LeaderboardService.PASSENGERS, query_date, limit)
     latency = (time.time() - start) * 1000
     
     return QueryMetrics(
@@ -367,53 +336,28 @@ LIMIT 1000
 
 
 def query_valkey_airport_rank(
-    cache_client,
+    service: LeaderboardService,
     airport_iata: str,
     query_date: date
 ) -> QueryMetrics:
     """Query specific airport's rank from Valkey Sorted Set."""
-    date_str = query_date.strftime("%Y-%m-%d")
-    flights_key = f"leaderboard:flights:{date_str}"
+    flights_key = service.key(LeaderboardService.FLIGHTS, query_date)
     
-    # Find the member with matching IATA
+    # Members are IATA codes, so the rank is a direct lookup (no ZSCAN)
     commands = [
-        f"ZSCAN {flights_key} 0 MATCH {airport_iata}|*",
-        f"ZREVRANK {flights_key} {airport_iata}|*"
+        f"ZREVRANK {flights_key} {airport_iata}",
+        f"ZSCORE {flights_key} {airport_iata}",
+        f"HGET {service.details_key(query_date)} {airport_iata}"
     ]
     
     if VERBOSE:
-        console.print(f"\n[dim]Valkey Commands:[/dim]")
-        console.print(f"[dim]  ZSCAN {flights_key} 0 MATCH {airport_iata}|*[/dim]")
+        console.print(f"\n[dim]Valkey Commands (pipelined):[/dim]")
+        for cmd in commands:
+            console.print(f"[dim]  {cmd}[/dim]")
     
     start = time.time()
-    
-    # Use ZSCAN with pattern matching to find the member starting with IATA
-    cursor = 0
-    target_member = None
-    
-    while True:
-        cursor, members = cache_client.client.zscan(
-            flights_key, 
-            cursor=cursor, 
-            match=f"{airport_iata}|*",
-            count=100
-        )
-        
-        if members:
-            # ZSCAN returns list of (member, score) tuples
-            target_member = members[0][0] if isinstance(members[0], tuple) else members[0]
-            break
-        
-        if cursor == 0:
-            break
-    
-    # Get rank
-    rank = None
-    if target_member:
-        if VERBOSE:
-            console.print(f"[dim]  ZREVRANK {flights_key} '{target_member}'[/dim]")
-        rank = cache_client.client.zrevrank(flights_key, target_member)
-    
+    airport = service.get_airport(LeaderboardService.FLIGHTS, query_date, airport_iata)
+    rank = airport["rank"] if airport else None
     latency = (time.time() - start) * 1000
     
     return QueryMetrics(
@@ -551,6 +495,7 @@ def run_demo(
         task = progress.add_task("[cyan]Initializing connections...", total=None)
         leaderboard = AirportLeaderboard()
         cache_client = get_cache_client()
+        service = LeaderboardService(client=cache_client.client)
         progress.update(task, completed=True)
     
     console.print("[green]✓[/green] Connected to RDBMS and Valkey\n")
@@ -600,7 +545,7 @@ def run_demo(
             console.print(f"[yellow]⚠[/yellow]  RDBMS cache flush error: {e}\n")
     
     # Pre-populate Valkey (not timed)
-    populate_valkey_leaderboards(leaderboard, cache_client, query_date)
+    populate_valkey_leaderboards(leaderboard, service, query_date)
     
     if interactive:
         console.print()
@@ -619,7 +564,7 @@ def run_demo(
     console.print(f"[green]✓[/green] RDBMS: {format_time_ms(rdbms_flights.latency_ms)}")
     
     console.print("\n[cyan]Querying Valkey...[/cyan]")
-    valkey_flights = query_valkey_top_flights(cache_client, query_date, 10)
+    valkey_flights = query_valkey_top_flights(service, query_date, 10)
     metrics_list.append(valkey_flights)
     console.print(f"[green]✓[/green] Valkey: {format_time_ms(valkey_flights.latency_ms)}")
     
@@ -664,7 +609,7 @@ def run_demo(
     console.print(f"[green]✓[/green] RDBMS: {format_time_ms(rdbms_passengers.latency_ms)}")
     
     console.print("\n[cyan]Querying Valkey...[/cyan]")
-    valkey_passengers = query_valkey_top_passengers(cache_client, query_date, 10)
+    valkey_passengers = query_valkey_top_passengers(service, query_date, 10)
     metrics_list.append(valkey_passengers)
     console.print(f"[green]✓[/green] Valkey: {format_time_ms(valkey_passengers.latency_ms)}")
     
@@ -711,7 +656,7 @@ def run_demo(
     console.print(f"[green]✓[/green] RDBMS: {format_time_ms(rdbms_rank.latency_ms)}")
     
     console.print("\n[cyan]Querying Valkey...[/cyan]")
-    valkey_rank = query_valkey_airport_rank(cache_client, "JFK", query_date)
+    valkey_rank = query_valkey_airport_rank(service, "JFK", query_date)
     metrics_list.append(valkey_rank)
     console.print(f"[green]✓[/green] Valkey: {format_time_ms(valkey_rank.latency_ms)}")
     
@@ -730,30 +675,9 @@ def run_demo(
                 jfk_rank_rdbms = airport['rank']
                 break
         
-        # Get rank from Valkey
-        date_str = query_date.strftime("%Y-%m-%d")
-        flights_key = f"leaderboard:flights:{date_str}"
-        
-        cursor = 0
-        target_member = None
-        while True:
-            cursor, members = cache_client.client.zscan(
-                flights_key, 
-                cursor=cursor, 
-                match=f"JFK|*",
-                count=100
-            )
-            if members:
-                target_member = members[0][0] if isinstance(members[0], tuple) else members[0]
-                break
-            if cursor == 0:
-                break
-        
-        jfk_rank_valkey = None
-        if target_member:
-            jfk_rank_valkey = cache_client.client.zrevrank(flights_key, target_member)
-            if jfk_rank_valkey is not None:
-                jfk_rank_valkey += 1  # Convert 0-based to 1-based rank
+        # Get rank from Valkey (direct ZREVRANK on the IATA member)
+        jfk_valkey = service.get_airport(LeaderboardService.FLIGHTS, query_date, "JFK")
+        jfk_rank_valkey = jfk_valkey["rank"] if jfk_valkey else None
         
         results_table = Table(title="✈️ JFK Airport Ranking", box=box.ROUNDED)
         results_table.add_column("Metric", style="cyan bold")
@@ -38,6 +38,7 @@ from tqdm import tqdm
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core import get_db_engine, get_cache_client
+from daos.leaderboard_service import LeaderboardService
 
 # Load environment variables
 load_dotenv()
@@ -75,12 +76,15 @@ def print_verbose_info(query: str, cache_key: str, sample_passenger_id: int):
 class PerformanceTest:
     """Manages multi-threaded performance testing with metrics collection"""
     
-    def __init__(self, threads: int, queries: int, read_ratio: int, ttl: int, random_passengers: bool):
+    def __init__(self, threads: int, queries: int, read_ratio: int, ttl: int, random_passengers: bool,
+                 update_leaderboards: bool = False):
         self.threads = threads
         self.queries = queries
         self.read_ratio = read_ratio / 100.0
         self.ttl = ttl
         self.random_passengers = random_passengers
+        self.update_leaderboards = update_leaderboards
+        self.leaderboard = None
         
         self.read_count = 0
         self.write_count = 0
@@ -117,8 +121,10 @@ class PerformanceTest:
         # Passenger pool for non-random mode
         self.passenger_pool = []
         
-        # Flight pool for valid flight IDs
+        # Flight pool for valid flight IDs, with (from_iata, to_iata, departure)
+        # per flight so bookings can update the leaderboards without a lookup
         self.flight_pool = []
+        self.flight_info = {}
         
         self._setup_connections()
     
@@ -175,6 +181,9 @@ class PerformanceTest:
             # Always setup flight pool with valid flight IDs
             self._setup_flight_pool()
             
+            if self.update_leaderboards:
+                self.leaderboard = LeaderboardService(client=self.valkey_write, db_engine=self.engine_ro)
+            
         except Exception as e:
             console.print(f"[red]✗ Connection error: {e}[/red]")
             sys.exit(1)
@@ -191,8 +200,15 @@ class PerformanceTest:
         console.print(f"\n[cyan]Fetching valid flight IDs...[/cyan]")
         try:
             with self.engine_ro.connect() as conn:
-                result = conn.execute(text("SELECT flight_id FROM flight LIMIT 10000"))
-                self.flight_pool = [row[0] for row in result]
+                result = conn.execute(text("""
+                    SELECT f.flight_id, dep.iata, arr.iata, f.departure
+                    FROM flight f
+                    JOIN airport dep ON f.from = dep.airport_id
+                    JOIN airport arr ON f.to = arr.airport_id
+                    LIMIT 10000
+                """))
+                self.flight_info = {row[0]: (row[1], row[2], row[3]) for row in result}
+                self.flight_pool = list(self.flight_info)
             console.print(f"[green]✓[/green] Flight pool created: {len(self.flight_pool)} valid IDs")
         except Exception as e:
             console.print(f"[red]✗ Failed to fetch flight IDs: {e}[/red]")
@@ -314,6 +330,10 @@ class PerformanceTest:
                     data = self._execute_read(self.engine_ro, read_query)
                     self.valkey_write.set(cache_key, str(data), px=self.ttl)
                     
+                    # Incremental leaderboard update (ZINCRBY) instead of a GROUP BY rebuild
+                    if self.leaderboard is not None and flight_id in self.flight_info:
+                        self.leaderboard.record_booking(*self.flight_info[flight_id])
+                    
                     end_time_ns = time.time_ns()
                     query_time_ns = end_time_ns - start_time_ns
                     
@@ -589,6 +609,11 @@ def run(
         "--flush",
         "-f",
         help="Flush Valkey cache before running test"
+    ),
+    update_leaderboards: bool = typer.Option(
+        False,
+        "--update-leaderboards",
+        help="Increment the passenger leaderboards (ZINCRBY) on every booking insert"
     )
 ):
     """
@@ -610,6 +635,9 @@ def run(
       
       # Random passenger mode (all passengers)
       python samples/demo_multi_threaded_performance.py --threads 8 --queries 20000 --random
+      
+      # Keep the airport leaderboards current from the write path
+      python samples/demo_multi_threaded_performance.py --read-ratio 50 --update-leaderboards
     """
     
     # Set global verbose flag
@@ -648,7 +676,7 @@ def run(
         console=console
     ) as progress:
         task = progress.add_task("[cyan]Initializing performance test...", total=None)
-        test = PerformanceTest(threads, queries, read_ratio, ttl, random)
+        test = PerformanceTest(threads, queries, read_ratio, ttl, random, update_leaderboards)
         progress.update(task, completed=True)
     
     # Flush cache if requested
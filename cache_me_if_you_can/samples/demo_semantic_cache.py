@@ -261,7 +261,7 @@ def demo_mode(cache: SemanticSQLCache):
         ) as status:
             # Generate hash for this prompt
             status.update("[cyan]Generating embedding...[/cyan]")
-            prompt_hash = cache._hash_text(query)
+            prompt_hash = cache._scoped_hash(query)
             
             # Check cache and generate if needed
             status.update("[cyan]Checking semantic cache...[/cyan]")
@@ -279,7 +279,7 @@ def demo_mode(cache: SemanticSQLCache):
                     result['query_key'] = query_key.decode('utf-8')
             else:
                 # For cache miss, calculate sql_hash
-                sql_hash = cache._hash_text(result['sql'])
+                sql_hash = cache._scoped_hash(result['sql'])
                 result['sql_hash'] = sql_hash
                 result['query_key'] = f"db:query:{sql_hash}"
         
@@ -479,7 +479,7 @@ def interactive_mode(cache: SemanticSQLCache):
             ) as status:
                 # Generate hash for this prompt
                 status.update("[cyan]Generating embedding...[/cyan]")
-                prompt_hash = cache._hash_text(query)
+                prompt_hash = cache._scoped_hash(query)
                 
                 # Check cache and generate if needed
                 status.update("[cyan]Checking semantic cache...[/cyan]")
@@ -498,7 +498,7 @@ def interactive_mode(cache: SemanticSQLCache):
                 else:
                     # For cache miss, calculate sql_hash
                     status.update("[yellow]Generating SQL with LLM (this may take a few seconds)...[/yellow]")
-                    sql_hash = cache._hash_text(result['sql'])
+                    sql_hash = cache._scoped_hash(result['sql'])
                     result['sql_hash'] = sql_hash
                     result['query_key'] = f"db:query:{sql_hash}"
             
@@ -7,7 +7,7 @@ for major cities where many clients request weather data simultaneously.
 
 Key Features:
 - Distributed locking with Redis/Valkey
-- Exponential backoff for lock contention
+- Exponential backoff polling or pub/sub wake-up for lock waiters
 - Fail-fast behavior when lock is held
 - Concurrent request simulation
 - Performance metrics and visualization
@@ -37,6 +37,7 @@ from tqdm import tqdm
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from core import get_lock_metrics
 from daos.weather_api_cache import WeatherAPICache
 from services.weather_service import WeatherService
 
@@ -61,6 +62,8 @@ class RequestMetrics:
     wait_time: float = 0.0
     retries: int = 0
     api_called: bool = False
+    waited: bool = False
+    valkey_ops: int = 0
     
     @property
     def duration(self) -> float:
@@ -152,6 +155,19 @@ class StampedeMetrics:
         api_calls = [req.duration for req in self.request_details 
                     if req.status == "cache_miss_api" and req.duration > 0]
         return sum(api_calls) / len(api_calls) if api_calls else 0.0
+    
+    def waiter_latency_percentile(self, percentile: float) -> float:
+        """Get a latency percentile for requests that waited on another thread's lock."""
+        durations = sorted(req.duration for req in self.request_details if req.waited and req.duration > 0)
+        if not durations:
+            return 0.0
+        index = min(len(durations) - 1, int(round(percentile / 100 * (len(durations) - 1))))
+        return durations[index]
+    
+    @property
+    def total_valkey_ops(self) -> int:
+        """Total Valkey commands issued across all requests."""
+        return sum(req.valkey_ops for req in self.request_details)
 
 
 def format_time(seconds: float) -> str:
@@ -250,11 +266,15 @@ def fetch_weather_with_stampede_protection(
     metrics: StampedeMetrics,
     lock_ttl_seconds: float = 60.0,
     max_retries: int = 5,
-    base_delay: float = 0.1
+    base_delay: float = 0.1,
+    wait_strategy: str = "polling"
 ) -> Optional[Dict[str, Any]]:
     """
     Fetch weather data with stampede protection using distributed locking.
     
+    Threads that lose the lock either poll the cache with exponential backoff
+    ("polling") or block until the lock holder publishes the value ("pubsub").
+    
     Args:
         city: City information (name, country, zip)
         cache: Weather API cache instance
@@ -263,6 +283,7 @@ def fetch_weather_with_stampede_protection(
         lock_ttl_seconds: Lock TTL in seconds
         max_retries: Maximum number of retries for lock acquisition
         base_delay: Base delay for exponential backoff (seconds)
+        wait_strategy: "polling" or "pubsub"
     
     Returns:
         Weather data or None on error
@@ -275,129 +296,196 @@ def fetch_weather_with_stampede_protection(
         start_time=time.time()
     )
     
+    # Waiters that wake without a value (the holder failed or released) retry
+    # the GET and the lock until the lock TTL has passed
+    deadline = time.time() + lock_ttl_seconds
+    
     try:
-        # Try to get from cache first
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            # Cache hit - no lock needed
-            request_metric.status = "cache_hit"
-            request_metric.end_time = time.time()
-            metrics.cache_hits += 1
-            metrics.request_details.append(request_metric)
+        while True:
+            # Try to get from cache first
+            cached_data = cache.get(cache_key)
+            request_metric.valkey_ops += 1
             
-            if VERBOSE:
-                console.print(
-                    f"[green]Thread {thread_id:2d}:[/green] "
-                    f"Cache HIT for {city['name']} - {format_time(request_metric.duration)}"
-                )
+            if cached_data:
+                # Cache hit - no lock needed
+                request_metric.status = "cache_hit"
+                request_metric.end_time = time.time()
+                metrics.cache_hits += 1
+                metrics.request_details.append(request_metric)
+                
+                if VERBOSE:
+                    console.print(
+                        f"[green]Thread {thread_id:2d}:[/green] "
+                        f"Cache HIT for {city['name']} - {format_time(request_metric.duration)}"
+                    )
+                
+                return cached_data
             
-            return cached_data
-        
-        # Cache miss - try to acquire lock with configurable TTL
-        lock_acquired = cache.acquire_lock(cache_key, timeout=int(lock_ttl_seconds))
-        
-        if lock_acquired:
-            # We got the lock - we're responsible for fetching
-            request_metric.lock_acquired = True
-            metrics.lock_acquisitions += 1
+            # Cache miss - try to acquire lock with configurable TTL
+            # (random token + fencing token; release only deletes our own lock)
+            # (pubsub: the release is published so waiters retry if we fail)
+            lock = cache.lock(cache_key, timeout=lock_ttl_seconds, notify_release=wait_strategy == "pubsub")
+            request_metric.valkey_ops += 1
             
-            try:
-                # Double-check cache after acquiring lock
-                cached_data = cache.get(cache_key)
-                if cached_data:
-                    request_metric.status = "cache_hit"
+            if lock.acquire():
+                # We got the lock - we're responsible for fetching
+                request_metric.lock_acquired = True
+                metrics.lock_acquisitions += 1
+                
+                try:
+                    # Double-check cache after acquiring lock
+                    cached_data = cache.get(cache_key)
+                    request_metric.valkey_ops += 1
+                    if cached_data:
+                        request_metric.status = "cache_hit"
+                        request_metric.end_time = time.time()
+                        metrics.cache_hits += 1
+                        
+                        if VERBOSE:
+                            console.print(
+                                f"[green]Thread {thread_id:2d}:[/green] "
+                                f"Cache HIT (after lock) for {city['name']}"
+                            )
+                        
+                        return cached_data
+                    
+                    # Fetch from API
+                    if VERBOSE:
+                        console.print(
+                            f"[yellow]Thread {thread_id:2d}:[/yellow] "
+                            f"Fetching from API for {city['name']}..."
+                        )
+                    
+                    weather_data = WeatherService.get_weather(city['country'], city['zip'])
+                    if wait_strategy == "pubsub":
+                        # Fenced SET, then PUBLISH wakes every waiter
+                        cache.set_and_notify(cache_key, weather_data, lock=lock)
+                        request_metric.valkey_ops += 2
+                    else:
+                        cache.set(cache_key, weather_data)
+                        request_metric.valkey_ops += 1
+                    
+                    request_metric.status = "cache_miss_api"
+                    request_metric.api_called = True
                     request_metric.end_time = time.time()
-                    metrics.cache_hits += 1
+                    metrics.cache_misses += 1
+                    metrics.api_calls += 1
                     
                     if VERBOSE:
                         console.print(
-                            f"[green]Thread {thread_id:2d}:[/green] "
-                            f"Cache HIT (after lock) for {city['name']}"
+                            f"[cyan]Thread {thread_id:2d}:[/cyan] "
+                            f"API call completed for {city['name']} - {format_time(request_metric.duration)}"
                         )
                     
-                    return cached_data
+                    return weather_data
+                    
+                finally:
+                    # Always release the lock (no-op if our lease already expired)
+                    lock.release()
+                    request_metric.valkey_ops += 2 if wait_strategy == "pubsub" else 1
+            
+            else:
+                # Could not acquire lock - another thread is fetching
+                request_metric.status = "lock_wait"
+                request_metric.waited = True
+                metrics.lock_waits += 1
                 
-                # Fetch from API
                 if VERBOSE:
                     console.print(
                         f"[yellow]Thread {thread_id:2d}:[/yellow] "
-                        f"Fetching from API for {city['name']}..."
+                        f"Lock held by another thread for {city['name']}, waiting..."
                     )
                 
-                weather_data = WeatherService.get_weather(city['country'], city['zip'])
-                cache.set(cache_key, weather_data)
+                wait_start = time.time()
+                
+                if wait_strategy == "pubsub":
+                    # Block until the lock holder publishes the value or releases
+                    # the lock (no polling)
+                    cached_data = cache.wait_for_fill(cache_key, timeout=max(0.0, deadline - time.time()))
+                    request_metric.valkey_ops += 1
+                    
+                    if cached_data:
+                        request_metric.wait_time += time.time() - wait_start
+                        request_metric.status = "cache_hit"
+                        request_metric.end_time = time.time()
+                        metrics.cache_hits += 1
+                        metrics.total_wait_time += request_metric.wait_time
+                        
+                        if VERBOSE:
+                            console.print(
+                                f"[green]Thread {thread_id:2d}:[/green] "
+                                f"Woken by fill notification "
+                                f"({format_time(request_metric.wait_time)} wait) for {city['name']}"
+                            )
+                        
+                        return cached_data
+                    
+                    if time.time() < deadline:
+                        # Woken without a value: the holder released without
+                        # filling, so retry the GET and the lock
+                        request_metric.retries += 1
+                        request_metric.wait_time += time.time() - wait_start
+                        
+                        if VERBOSE:
+                            console.print(
+                                f"[yellow]Thread {thread_id:2d}:[/yellow] "
+                                f"Lock released without a fill for {city['name']}, retrying..."
+                            )
+                        
+                        continue
+                    
+                    request_metric.status = "timeout"
+                    request_metric.end_time = time.time()
+                    metrics.timeouts += 1
+                    
+                    if VERBOSE:
+                        console.print(
+                            f"[red]Thread {thread_id:2d}:[/red] "
+                            f"No fill notification within {format_time(lock_ttl_seconds)} for {city['name']}"
+                        )
+                    
+                    return None
+                
+                # Use exponential backoff to retry
+                for retry in range(max_retries):
+                    # Exponential backoff: base_delay * 2^retry + random jitter
+                    delay = base_delay * (2 ** retry) + random.uniform(0, 0.1)
+                    time.sleep(delay)
+                    
+                    request_metric.retries += 1
+                    
+                    # Try to get from cache
+                    cached_data = cache.get(cache_key)
+                    request_metric.valkey_ops += 1
+                    if cached_data:
+                        request_metric.wait_time = time.time() - wait_start
+                        request_metric.status = "cache_hit"
+                        request_metric.end_time = time.time()
+                        metrics.cache_hits += 1
+                        metrics.total_wait_time += request_metric.wait_time
+                        
+                        if VERBOSE:
+                            console.print(
+                                f"[green]Thread {thread_id:2d}:[/green] "
+                                f"Cache HIT after {request_metric.retries} retries "
+                                f"({format_time(request_metric.wait_time)} wait) for {city['name']}"
+                            )
+                        
+                        return cached_data
                 
-                request_metric.status = "cache_miss_api"
-                request_metric.api_called = True
+                # Timeout - fail fast
+                request_metric.status = "timeout"
                 request_metric.end_time = time.time()
-                metrics.cache_misses += 1
-                metrics.api_calls += 1
+                metrics.timeouts += 1
                 
                 if VERBOSE:
                     console.print(
-                        f"[cyan]Thread {thread_id:2d}:[/cyan] "
-                        f"API call completed for {city['name']} - {format_time(request_metric.duration)}"
+                        f"[red]Thread {thread_id:2d}:[/red] "
+                        f"Timeout after {max_retries} retries for {city['name']}"
                     )
                 
-                return weather_data
-                
-            finally:
-                # Always release the lock
-                cache.release_lock(cache_key)
+                return None
         
-        else:
-            # Could not acquire lock - another thread is fetching
-            # Use exponential backoff to retry
-            request_metric.status = "lock_wait"
-            metrics.lock_waits += 1
-            
-            if VERBOSE:
-                console.print(
-                    f"[yellow]Thread {thread_id:2d}:[/yellow] "
-                    f"Lock held by another thread for {city['name']}, waiting..."
-                )
-            
-            wait_start = time.time()
-            
-            for retry in range(max_retries):
-                # Exponential backoff: base_delay * 2^retry + random jitter
-                delay = base_delay * (2 ** retry) + random.uniform(0, 0.1)
-                time.sleep(delay)
-                
-                request_metric.retries += 1
-                
-                # Try to get from cache
-                cached_data = cache.get(cache_key)
-                if cached_data:
-                    request_metric.wait_time = time.time() - wait_start
-                    request_metric.status = "cache_hit"
-                    request_metric.end_time = time.time()
-                    metrics.cache_hits += 1
-                    metrics.total_wait_time += request_metric.wait_time
-                    
-                    if VERBOSE:
-                        console.print(
-                            f"[green]Thread {thread_id:2d}:[/green] "
-                            f"Cache HIT after {request_metric.retries} retries "
-                            f"({format_time(request_metric.wait_time)} wait) for {city['name']}"
-                        )
-                    
-                    return cached_data
-            
-            # Timeout - fail fast
-            request_metric.status = "timeout"
-            request_metric.end_time = time.time()
-            metrics.timeouts += 1
-            
-            if VERBOSE:
-                console.print(
-                    f"[red]Thread {thread_id:2d}:[/red] "
-                    f"Timeout after {max_retries} retries for {city['name']}"
-                )
-            
-            return None
-    
     except Exception as e:
         request_metric.status = "error"
         request_metric.end_time = time.time()
@@ -417,7 +505,8 @@ def simulate_concurrent_requests(
     cache: WeatherAPICache,
     num_requests: int = 1000,
     num_threads: int = 4,
-    lock_ttl_ms: int = 60000
+    lock_ttl_ms: int = 60000,
+    wait_strategy: str = "polling"
 ) -> StampedeMetrics:
     """
     Simulate concurrent requests to the same resource using a thread pool.
@@ -428,6 +517,7 @@ def simulate_concurrent_requests(
         num_requests: Number of concurrent requests to simulate
         num_threads: Number of worker threads to use
         lock_ttl_ms: Lock TTL in milliseconds
+        wait_strategy: How lock waiters get the value ("polling" or "pubsub")
     
     Returns:
         Aggregate metrics
@@ -456,7 +546,8 @@ def simulate_concurrent_requests(
             for i in range(num_requests):
                 future = executor.submit(
                     fetch_weather_with_stampede_protection,
-                    city, cache, i + 1, metrics, lock_ttl_seconds
+                    city, cache, i + 1, metrics, lock_ttl_seconds,
+                    wait_strategy=wait_strategy
                 )
                 futures.append(future)
             
@@ -667,17 +758,21 @@ def run_stampede_test(
     num_requests: int = 1000,
     num_threads: int = 4,
     lock_ttl_ms: int = 60000,
-    test_number: int = 1
+    test_number: int = 1,
+    wait_strategy: str = "polling"
 ) -> StampedeMetrics:
     """Run a single stampede prevention test."""
     print_section(f"TEST #{test_number}: {city['name']}, {city['country']} ({num_requests} concurrent requests)")
     
     console.print(f"[dim]Cache key: weather:{city['country'].lower()}:{city['zip']}[/dim]")
     console.print(f"[dim]Simulating {num_requests} concurrent requests using {num_threads} worker threads...[/dim]")
-    console.print(f"[dim]Lock TTL: {lock_ttl_ms}ms ({lock_ttl_ms/1000:.1f}s)[/dim]\n")
+    console.print(f"[dim]Lock TTL: {lock_ttl_ms}ms ({lock_ttl_ms/1000:.1f}s)[/dim]")
+    console.print(f"[dim]Waiter strategy: {wait_strategy}[/dim]\n")
     
     # Run the test (tqdm progress bar is shown inside simulate_concurrent_requests)
-    metrics = simulate_concurrent_requests(city, cache, num_requests, num_threads, lock_ttl_ms)
+    metrics = simulate_concurrent_requests(
+        city, cache, num_requests, num_threads, lock_ttl_ms, wait_strategy
+    )
     
     # Get weather data from cache to display
     cache_key = f"weather:{city['country'].lower()}:{city['zip']}"
@@ -713,7 +808,8 @@ def run_demo(
     num_cities: int = 3,
     lock_ttl_ms: int = 60000,
     interactive: bool = False,
-    flush: bool = False
+    flush: bool = False,
+    wait_strategy: str = "polling"
 ):
     """
     Run the stampede prevention demo.
@@ -725,6 +821,7 @@ def run_demo(
         lock_ttl_ms: Lock TTL in milliseconds
         interactive: Run step-by-step with prompts
         flush: Flush cache before running demo
+        wait_strategy: "polling", "pubsub" or "compare" (run both per city)
     """
     # Print header
     console.print()
@@ -754,6 +851,7 @@ def run_demo(
     else:
         config_table.add_row("Lock TTL", f"{lock_ttl_ms}ms ({lock_ttl_seconds:.1f}s)")
     
+    config_table.add_row("Waiter strategy", wait_strategy)
     config_table.add_row("Max retries", "5")
     config_table.add_row("Backoff strategy", "Exponential (0.1s base)")
     config_table.add_row("Verbose mode", "Enabled" if VERBOSE else "Disabled")
@@ -813,6 +911,8 @@ def run_demo(
     
     # Run tests
     all_metrics = []
+    strategies = ["polling", "pubsub"] if wait_strategy == "compare" else [wait_strategy]
+    strategy_metrics = {strategy: [] for strategy in strategies}
     
     for i, city in enumerate(cities, 1):
         if interactive and i > 1:
@@ -820,8 +920,16 @@ def run_demo(
             if not Confirm.ask(f"Continue with test #{i}?", default=True):
                 break
         
-        metrics = run_stampede_test(city, cache, num_requests, num_threads, lock_ttl_ms, i)
-        all_metrics.append(metrics)
+        for strategy in strategies:
+            if len(strategies) > 1:
+                # Start every strategy from a cold key so both see a full stampede
+                cache.delete(f"weather:{city['country'].lower()}:{city['zip']}")
+            
+            metrics = run_stampede_test(
+                city, cache, num_requests, num_threads, lock_ttl_ms, i, strategy
+            )
+            all_metrics.append(metrics)
+            strategy_metrics[strategy].append(metrics)
         
         if not interactive:
             time.sleep(1)  # Brief pause between tests
@@ -948,6 +1056,57 @@ def run_demo(
     console.print()
     console.print(summary_table)
     
+    # Lock contention and hold-time histograms
+    lock_stats = get_lock_metrics().snapshot()
+    lock_table = Table(title="🔒 Lock Metrics", box=box.ROUNDED)
+    lock_table.add_column("≤ ms", style="dim", justify="right")
+    lock_table.add_column("Wait (cumulative)", style="yellow", justify="right")
+    lock_table.add_column("Hold (cumulative)", style="magenta", justify="right")
+    
+    for bucket, wait_count in lock_stats["wait_ms"].items():
+        lock_table.add_row(bucket, str(wait_count), str(lock_stats["hold_ms"][bucket]))
+    
+    lock_table.caption = (
+        f"acquired={lock_stats['acquired']} contended={lock_stats['contended']} "
+        f"failed={lock_stats['failed']} lost={lock_stats['lost']} "
+        f"avg hold={lock_stats['avg_hold_ms']:.1f}ms"
+    )
+    
+    console.print()
+    console.print(lock_table)
+    
+    # Waiter latency and Valkey load per strategy
+    if len(strategies) > 1:
+        compare_table = Table(title="📡 Polling vs Pub/Sub Waiters", box=box.ROUNDED)
+        compare_table.add_column("Strategy", style="cyan bold")
+        compare_table.add_column("Waiters", style="white", justify="right")
+        compare_table.add_column("Waiter p50", style="yellow", justify="right")
+        compare_table.add_column("Waiter p99", style="yellow", justify="right")
+        compare_table.add_column("Timeouts", style="red", justify="right")
+        compare_table.add_column("Valkey Ops", style="magenta", justify="right")
+        compare_table.add_column("Ops/Request", style="magenta", justify="right")
+        
+        for strategy, runs in strategy_metrics.items():
+            combined = StampedeMetrics(total_requests=sum(m.total_requests for m in runs))
+            for m in runs:
+                combined.request_details.extend(m.request_details)
+            
+            waiters = sum(1 for req in combined.request_details if req.waited)
+            timeouts = sum(m.timeouts for m in runs)
+            ops = combined.total_valkey_ops
+            compare_table.add_row(
+                strategy,
+                str(waiters),
+                format_time(combined.waiter_latency_percentile(50)),
+                format_time(combined.waiter_latency_percentile(99)),
+                str(timeouts),
+                str(ops),
+                f"{ops / combined.total_requests:.2f}" if combined.total_requests else "—"
+            )
+        
+        console.print()
+        console.print(compare_table)
+    
     # Key takeaways
     console.print()
     takeaways_table = Table(title="🎯 Key Takeaways", box=box.ROUNDED, show_header=False)
@@ -1021,6 +1180,12 @@ def run(
         "--flush",
         "-f",
         help="Flush cache before running demo"
+    ),
+    wait_strategy: str = typer.Option(
+        "polling",
+        "--wait-strategy",
+        "-w",
+        help="How lock waiters get the value: polling, pubsub or compare"
     )
 ):
     """Run the stampede prevention demonstration"""
@@ -1049,6 +1214,10 @@ def run(
         console.print(f"[red]❌ Lock TTL must be between 100 and 60000 milliseconds. Got: {lock_ttl}[/red]")
         return
     
+    if wait_strategy not in ("polling", "pubsub", "compare"):
+        console.print(f"[red]❌ Wait strategy must be polling, pubsub or compare. Got: {wait_strategy}[/red]")
+        return
+    
     # Warn if lock TTL is too small
     if lock_ttl < 1000:
         console.print(f"[yellow]⚠️  Warning: Lock TTL of {lock_ttl}ms is very small. This may cause stampede![/yellow]\n")
@@ -1060,7 +1229,8 @@ def run(
             num_cities=cities,
             lock_ttl_ms=lock_ttl,
             interactive=interactive,
-            flush=flush
+            flush=flush,
+            wait_strategy=wait_strategy
         )
         
         # Final message
@@ -1076,7 +1246,8 @@ def run(
             "[dim]Try different options:[/dim]\n"
             "  [yellow]--requests 2000 --cities 5[/yellow]  (more load)\n"
             "  [yellow]--interactive --verbose[/yellow]  (step-by-step with details)\n"
-            "  [yellow]--flush[/yellow]  (start with clean cache)",
+            "  [yellow]--flush[/yellow]  (start with clean cache)\n"
+            "  [yellow]--wait-strategy compare[/yellow]  (polling vs pub/sub waiters)",
             border_style="green",
             box=box.DOUBLE
         )
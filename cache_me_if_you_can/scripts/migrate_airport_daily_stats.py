@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Migration: airport_daily_stats Rollup Tables
+
+Creates the tables maintained by daos/airport_daily_rollup.py:
+
+- airport_daily_stats: one row per (date, airport_id) with departures, arrivals,
+  departing_pax, arriving_pax and pax_flights, plus loop_flights / loop_pax
+  for flights with from = to. The primary key starts with the date, so a
+  historical leaderboard is a single index range read
+- airport_daily_stats_days: every day the rollup has rebuilt, including days
+  without flights
+- airport_daily_stats_state: watermarks (max flight_id, booking_id, log_date)
+  of the last rollup run
+- airport_daily_stats_dirty: days queued explicitly for recomputation
+
+It also indexes flight_log(log_date), which the rollup job scans for
+rescheduled flights on every run.
+
+Usage:
+    python scripts/migrate_airport_daily_stats.py upgrade
+    python scripts/migrate_airport_daily_stats.py upgrade --backfill
+    python scripts/migrate_airport_daily_stats.py downgrade
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import typer
+from rich.console import Console
+from sqlalchemy import inspect, text
+
+from core import get_db_engine
+
+app = typer.Typer(
+    help="Create or drop the airport_daily_stats rollup tables",
+    add_completion=False
+)
+console = Console()
+
+TABLES = {
+    "airport_daily_stats": """
+        CREATE TABLE IF NOT EXISTS airport_daily_stats (
+            `date` DATE NOT NULL,
+            airport_id SMALLINT NOT NULL,
+            departures INT NOT NULL DEFAULT 0,
+            arrivals INT NOT NULL DEFAULT 0,
+            loop_flights INT NOT NULL DEFAULT 0,
+            departing_pax INT NOT NULL DEFAULT 0,
+            arriving_pax INT NOT NULL DEFAULT 0,
+            loop_pax INT NOT NULL DEFAULT 0,
+            pax_flights INT NOT NULL DEFAULT 0,
+            updated_at DATETIME NOT NULL,
+            PRIMARY KEY (`date`, airport_id),
+            KEY idx_airport_daily_stats_airport (airport_id, `date`)
+        )
+    """,
+    "airport_daily_stats_days": """
+        CREATE TABLE IF NOT EXISTS airport_daily_stats_days (
+            `date` DATE NOT NULL PRIMARY KEY,
+            rolled_up_at DATETIME NOT NULL
+        )
+    """,
+    "airport_daily_stats_state": """
+        CREATE TABLE IF NOT EXISTS airport_daily_stats_state (
+            name VARCHAR(50) NOT NULL PRIMARY KEY,
+            value VARCHAR(50) NOT NULL
+        )
+    """,
+    "airport_daily_stats_dirty": """
+        CREATE TABLE IF NOT EXISTS airport_daily_stats_dirty (
+            `date` DATE NOT NULL PRIMARY KEY
+        )
+    """,
+}
+
+# Scanned by AirportDailyRollup.changed_days() on every run
+LOG_DATE_INDEX = "idx_flight_log_log_date"
+
+
+def log_date_index_exists(engine) -> bool:
+    """Check whether flight_log already has LOG_DATE_INDEX."""
+    return any(index["name"] == LOG_DATE_INDEX for index in inspect(engine).get_indexes("flight_log"))
+
+
+@app.command()
+def upgrade(
+    backfill: bool = typer.Option(
+        False,
+        "--backfill",
+        help="Roll up every existing day after creating the tables"
+    )
+):
+    """Create the rollup tables and the flight_log index (idempotent)."""
+    engine = get_db_engine()
+    
+    with engine.begin() as conn:
+        for name, ddl in TABLES.items():
+            conn.execute(text(ddl))
+            console.print(f"[green]✓[/green] {name}")
+    
+    if log_date_index_exists(engine):
+        console.print(f"[dim]• {LOG_DATE_INDEX} already exists, skipping[/dim]")
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX {LOG_DATE_INDEX} ON flight_log (log_date)"))
+        console.print(f"[green]✓[/green] {LOG_DATE_INDEX}")
+    
+    if backfill:
+        from daos.airport_daily_rollup import AirportDailyRollup
+        
+        console.print("\n[cyan]Backfilling airport_daily_stats...[/cyan]")
+        result = AirportDailyRollup(db_engine=engine).backfill()
+        console.print(
+            f"[green]✓[/green] {len(result['days'])} days, {result['rows']} rows "
+            f"in {result['duration_ms'] / 1000:.1f}s"
+        )
+    
+    engine.dispose()
+
+
+@app.command()
+def downgrade():
+    """Drop the rollup tables and the flight_log index."""
+    engine = get_db_engine()
+    
+    with engine.begin() as conn:
+        for name in reversed(list(TABLES)):
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            console.print(f"[green]✓[/green] {name} dropped")
+    
+    if log_date_index_exists(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX {LOG_DATE_INDEX} ON flight_log"))
+        console.print(f"[green]✓[/green] {LOG_DATE_INDEX} dropped")
+    
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Migration: Composite Flight Indexes for the Airport Leaderboard Queries
+
+AirportLeaderboard filters flights on a half-open departure range and counts
+departures and arrivals in separate UNION ALL branches. These indexes let every
+branch be answered from an index range scan:
+
+- idx_flight_departure_from_to (departure, from, to): all flights of a day with
+  both airport columns, covering the top-N GROUP BY queries
+- idx_flight_from_departure (from, departure): departures of one airport on a day
+- idx_flight_to_departure (to, departure): arrivals of one airport on a day
+
+The migration is idempotent: existing indexes are skipped on upgrade and
+missing ones are skipped on downgrade. The single-column from/to indexes are
+kept because the foreign keys rely on them.
+
+Usage:
+    python scripts/migrate_leaderboard_indexes.py upgrade
+    python scripts/migrate_leaderboard_indexes.py downgrade
+    python scripts/migrate_leaderboard_indexes.py status
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import time
+import typer
+from rich.console import Console
+from rich.table import Table
+from rich import box
+from sqlalchemy import inspect, text
+
+from core import get_db_engine
+
+app = typer.Typer(
+    help="Add or remove the composite flight indexes used by the airport leaderboards",
+    add_completion=False
+)
+console = Console()
+
+TABLE = "flight"
+
+# Index name -> indexed columns (in order)
+INDEXES = {
+    "idx_flight_departure_from_to": ["departure", "from", "to"],
+    "idx_flight_from_departure": ["from", "departure"],
+    "idx_flight_to_departure": ["to", "departure"],
+}
+
+
+def existing_indexes(engine) -> dict:
+    """Get index name -> columns for the flight table."""
+    return {
+        index["name"]: index["column_names"]
+        for index in inspect(engine).get_indexes(TABLE)
+    }
+
+
+@app.command()
+def upgrade():
+    """Create the composite indexes that do not exist yet."""
+    engine = get_db_engine()
+    present = existing_indexes(engine)
+    
+    for name, columns in INDEXES.items():
+        if name in present:
+            console.print(f"[dim]• {name} already exists, skipping[/dim]")
+            continue
+        
+        column_list = ", ".join(f"`{column}`" for column in columns)
+        console.print(f"[cyan]Creating {name} ({column_list})...[/cyan]")
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX {name} ON {TABLE} ({column_list})"))
+        console.print(f"[green]✓[/green] {name} created in {time.perf_counter() - start:.1f}s")
+    
+    engine.dispose()
+
+
+@app.command()
+def downgrade():
+    """Drop the composite indexes created by upgrade."""
+    engine = get_db_engine()
+    present = existing_indexes(engine)
+    
+    for name in INDEXES:
+        if name not in present:
+            console.print(f"[dim]• {name} does not exist, skipping[/dim]")
+            continue
+        
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX {name} ON {TABLE}"))
+        console.print(f"[green]✓[/green] {name} dropped")
+    
+    engine.dispose()
+
+
+@app.command()
+def status():
+    """Show which leaderboard indexes exist."""
+    engine = get_db_engine()
+    present = existing_indexes(engine)
+    
+    table = Table(title="Leaderboard Indexes on flight", box=box.ROUNDED)
+    table.add_column("Index", style="cyan")
+    table.add_column("Columns")
+    table.add_column("Status")
+    for name, columns in INDEXES.items():
+        table.add_row(
+            name,
+            ", ".join(columns),
+            "[green]present[/green]" if name in present else "[yellow]missing[/yellow]"
+        )
+    console.print(table)
+    
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    app()
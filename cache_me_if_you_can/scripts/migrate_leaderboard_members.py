@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Migration: Compact Airport Leaderboard Members
+
+Earlier versions of the airport leaderboard demo stored every display field in
+the sorted set member itself:
+
+- leaderboard:flights:<date>     members "IATA|Name|Departures|Arrivals"
+- leaderboard:passengers:<date>  members "IATA|Name|DepPax|ArrPax|Flights"
+
+Every count change produced a new member (so stale members piled up next to
+the current one) and finding one airport required ZSCAN MATCH "IATA|*". This
+migration rewrites each day to bare IATA members plus the per-day details hash
+leaderboard:details:<date> (airport names) used by LeaderboardService, keeping
+each key's TTL.
+Both sorted sets and the hash of a day are swapped in one MULTI/EXEC.
+
+MEMORY USAGE is sampled before and after for every day, so the run doubles as
+a memory comparison between the two layouts.
+
+Usage:
+    python scripts/migrate_leaderboard_members.py upgrade --dry-run
+    python scripts/migrate_leaderboard_members.py upgrade
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from core import get_cache_client
+from daos.leaderboard_service import LeaderboardService
+
+app = typer.Typer(
+    help="Convert IATA|Name|... leaderboard members to IATA members plus a details hash",
+    add_completion=False
+)
+console = Console()
+
+# Daily keys only; range and live unions are rebuilt from the daily sets
+DAY_KEY = re.compile(r"^leaderboard:(flights|passengers):(\d{4}-\d{2}-\d{2})$")
+
+# Trailing numeric fields of a legacy member, per leaderboard kind
+LEGACY_FIELDS = {
+    LeaderboardService.FLIGHTS: ("departures", "arrivals"),
+    LeaderboardService.PASSENGERS: ("departing_passengers", "arriving_passengers", "total_flights"),
+}
+
+
+def parse_member(kind: str, member: str) -> Optional[Tuple[str, Dict]]:
+    """
+    Split a legacy member into (iata, details).
+    
+    The name may itself contain "|", so the numeric fields are taken from the end.
+    
+    Returns:
+        (iata, details) tuple, or None if the member is already compact
+    """
+    fields = LEGACY_FIELDS[kind]
+    parts = member.split("|")
+    if len(parts) < len(fields) + 2:
+        return None
+    
+    details = {"name": "|".join(parts[1:-len(fields)])}
+    for field, value in zip(fields, parts[-len(fields):]):
+        details[field] = int(value) if value.lstrip("-").isdigit() else value
+    return parts[0], details
+
+
+def memory_usage(client, keys: List[str]) -> int:
+    """Sum MEMORY USAGE over keys (missing keys count as 0)."""
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return sum(usage or 0 for usage in pipe.execute())
+
+
+def legacy_days(client) -> Dict[str, List[str]]:
+    """Find daily leaderboard keys grouped by day."""
+    days: Dict[str, List[str]] = {}
+    for key in client.scan_iter(match="leaderboard:*", count=1000):
+        match = DAY_KEY.match(key)
+        if match:
+            days.setdefault(match.group(2), []).append(match.group(1))
+    return days
+
+
+def migrate_day(client, service: LeaderboardService, day: str, kinds: List[str], dry_run: bool) -> Dict:
+    """
+    Rewrite one day's sorted sets to compact members.
+    
+    Returns:
+        Dictionary with member counts and bytes before and after (after equals
+        before when nothing was written)
+    """
+    details_key = service.details_key(day)
+    keys = [service.key(kind, day) for kind in kinds]
+    before_bytes = memory_usage(client, keys + [details_key])
+    
+    scores: Dict[str, Dict[str, float]] = {}
+    details: Dict[str, Dict] = {}
+    # Only the name is kept: counts live in the sorted sets
+    for iata, info in client.hgetall(details_key).items():
+        details[iata] = {"name": json.loads(info).get("name")}
+    
+    members_before = 0
+    legacy = 0
+    for kind, key in zip(kinds, keys):
+        scores[key] = {}
+        for member, score in client.zrange(key, 0, -1, withscores=True):
+            members_before += 1
+            parsed = parse_member(kind, member)
+            if parsed is None:
+                iata = member
+            else:
+                legacy += 1
+                iata, fields = parsed
+                details.setdefault(iata, {"name": fields["name"]})
+            # Legacy sets can hold several members for one airport after its
+            # counts changed; the highest score is the latest snapshot
+            scores[key][iata] = max(score, scores[key].get(iata, score))
+    
+    report = {
+        "day": day,
+        "members_before": members_before,
+        "members_after": sum(len(members) for members in scores.values()),
+        "legacy": legacy,
+        "bytes_before": before_bytes,
+        "bytes_after": before_bytes,
+    }
+    if not legacy or dry_run:
+        return report
+    
+    ttls = [client.pttl(key) for key in keys]
+    
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(*keys, details_key)
+    for key, ttl in zip(keys, ttls):
+        if scores[key]:
+            pipe.zadd(key, scores[key])
+            if ttl > 0:
+                pipe.pexpire(key, ttl)
+    if details:
+        pipe.hset(details_key, mapping={iata: json.dumps(info) for iata, info in details.items()})
+        positive = [ttl for ttl in ttls if ttl > 0]
+        if positive:
+            pipe.pexpire(details_key, max(positive))
+    pipe.execute()
+    
+    report["bytes_after"] = memory_usage(client, keys + [details_key])
+    return report
+
+
+@app.command()
+def upgrade(
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run",
+        help="Only report what would be migrated"
+    )
+):
+    """Rewrite legacy daily leaderboards and compare their memory usage."""
+    cache = get_cache_client()
+    client = cache.client
+    service = LeaderboardService(client=client)
+    
+    days = legacy_days(client)
+    if not days:
+        console.print("[dim]No daily leaderboard keys found[/dim]")
+        cache.close()
+        return
+    
+    table = Table(
+        title="Leaderboard Member Migration" + (" (dry run)" if dry_run else ""),
+        box=box.ROUNDED
+    )
+    table.add_column("Day", style="cyan")
+    table.add_column("Legacy members", justify="right")
+    table.add_column("Members before", justify="right")
+    table.add_column("Members after", justify="right")
+    table.add_column("Bytes before", justify="right")
+    table.add_column("Bytes after", justify="right")
+    table.add_column("Saved", justify="right", style="green")
+    
+    total_before = total_after = migrated = 0
+    for day in sorted(days):
+        report = migrate_day(client, service, day, sorted(days[day]), dry_run)
+        if report["legacy"] and not dry_run:
+            migrated += 1
+        total_before += report["bytes_before"]
+        total_after += report["bytes_after"]
+        
+        saved = report["bytes_before"] - report["bytes_after"]
+        table.add_row(
+            day,
+            f"{report['legacy']:,}",
+            f"{report['members_before']:,}",
+            f"{report['members_after']:,}",
+            f"{report['bytes_before']:,}",
+            f"{report['bytes_after']:,}" if not dry_run else "-",
+            f"{saved / report['bytes_before'] * 100:.1f}%" if saved and report["bytes_before"] else "-"
+        )
+    
+    console.print(table)
+    if dry_run:
+        console.print("[yellow]Dry run: nothing was written[/yellow]")
+    else:
+        saved = total_before - total_after
+        console.print(f"[green]✓[/green] Migrated {migrated} day(s)")
+        if total_before:
+            console.print(
+                f"[green]✓[/green] Memory: {total_before:,} → {total_after:,} bytes "
+                f"({saved / total_before * 100:.1f}% saved)"
+            )
+    
+    cache.close()
+
+
+if __name__ == "__main__":
+    app()
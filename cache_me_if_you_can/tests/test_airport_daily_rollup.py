@@ -0,0 +1,157 @@
+"""
+Tests for the airport_daily_stats rollup and the leaderboard reads served from it.
+
+These tests require the flughafendb database with the rollup tables
+(scripts/migrate_airport_daily_stats.py upgrade). Rolling up a day rebuilds
+it from the raw tables, so the data itself is not changed.
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from daos.airport_daily_rollup import AirportDailyRollup
+from daos.airport_leaderboard import AirportLeaderboard
+
+
+def _past_day(rollup):
+    """Latest day before today with flights."""
+    with rollup.db_engine.connect() as conn:
+        day = conn.execute(text(
+            "SELECT DATE(MAX(departure)) FROM flight WHERE departure < CURDATE()"
+        )).scalar()
+    assert day is not None, "The flight table has no past flights"
+    return day
+
+
+def test_rollup_matches_raw():
+    """Test that a rolled-up day returns the same leaderboards as the raw queries."""
+    rollup = AirportDailyRollup()
+    day = _past_day(rollup)
+    rollup.backfill(day, day)
+    
+    rolled = AirportLeaderboard(use_rollup=True)
+    raw = AirportLeaderboard(use_rollup=False)
+    
+    top = rolled.get_top_airports_by_flights(day, limit=20)
+    assert rolled.last_source == "rollup"
+    expected = raw.get_top_airports_by_flights(day, limit=20)
+    assert raw.last_source == "raw"
+    assert [(row["iata"], int(row["total_flights"])) for row in top] == \
+        [(row["iata"], int(row["total_flights"])) for row in expected]
+    
+    top = rolled.get_top_airports_by_passengers(day, limit=20)
+    assert rolled.last_source == "rollup"
+    expected = raw.get_top_airports_by_passengers(day, limit=20)
+    assert [(row["iata"], int(row["total_passengers"]), int(row["total_flights"])) for row in top] == \
+        [(row["iata"], int(row["total_passengers"]), int(row["total_flights"])) for row in expected]
+    
+    if top:
+        airport = rolled.get_airport_flights_on_date(top[0]["iata"], day)
+        assert rolled.last_source == "rollup"
+        assert airport == raw.get_airport_flights_on_date(top[0]["iata"], day)
+    
+    rolled.close()
+    raw.close()
+    rollup.close()
+    print("✓ Rollup matches raw test passed")
+
+
+def test_raw_fallback():
+    """Test that today and days not rolled up use the raw queries."""
+    leaderboard = AirportLeaderboard(use_rollup=True)
+    
+    leaderboard.get_top_airports_by_flights(date.today())
+    assert leaderboard.last_source == "raw", "Today is never read from the rollup"
+    
+    with leaderboard.db_engine.begin() as conn:
+        conn.execute(text("DELETE FROM airport_daily_stats_days WHERE `date` = '1900-01-02'"))
+    leaderboard.get_top_airports_by_flights(date(1900, 1, 2))
+    assert leaderboard.last_source == "raw", "Days never rolled up fall back"
+    assert leaderboard.use_rollup, "A missing rollup day does not disable the rollup"
+    
+    leaderboard.close()
+    print("✓ Raw fallback test passed")
+
+
+def test_empty_rolled_up_day():
+    """Test that a rolled-up day without flights is answered from the rollup."""
+    rollup = AirportDailyRollup()
+    day = date(1900, 1, 1)
+    rollup.backfill(day, day)
+    
+    rolled = AirportLeaderboard(use_rollup=True)
+    raw = AirportLeaderboard(use_rollup=False)
+    
+    assert rolled.get_top_airports_by_flights(day) == []
+    assert rolled.last_source == "rollup", "An empty rollup result is not a miss"
+    assert rolled.get_top_airports_by_passengers(day) == []
+    assert rolled.last_source == "rollup"
+    
+    with rolled.db_engine.connect() as conn:
+        iata = conn.execute(text("SELECT iata FROM airport WHERE iata IS NOT NULL LIMIT 1")).scalar()
+    airport = rolled.get_airport_flights_on_date(iata, day)
+    assert rolled.last_source == "rollup"
+    assert airport == raw.get_airport_flights_on_date(iata, day), "Airports without rows report zeros"
+    assert airport["total_flights"] == 0
+    
+    with rollup.db_engine.begin() as conn:
+        conn.execute(text("DELETE FROM airport_daily_stats_days WHERE `date` = :day"), {"day": day})
+    
+    rolled.close()
+    raw.close()
+    rollup.close()
+    print("✓ Empty rolled-up day test passed")
+
+
+def test_late_commit_rescanned():
+    """Test that bookings below the watermark are re-read within rescan_ids."""
+    rollup = AirportDailyRollup(rescan_ids=10)
+    
+    with rollup.db_engine.connect() as conn:
+        booking = conn.execute(text("""
+            SELECT b.booking_id, DATE(f.departure) as day
+            FROM booking b
+            JOIN flight f ON f.flight_id = b.flight_id
+            ORDER BY b.booking_id DESC
+            LIMIT 1
+        """)).fetchone()
+        assert booking is not None, "The booking table is empty"
+        
+        # The booking committed after a run had already advanced past its id
+        state = rollup._get_state(conn)
+        state["max_booking_id"] = booking.booking_id
+        days, new_state = rollup.changed_days(conn, state)
+    
+    assert booking.day in days, "The late booking's day is rebuilt"
+    assert int(new_state["max_booking_id"]) >= booking.booking_id
+    
+    rollup.close()
+    print("✓ Late commit rescan test passed")
+
+
+if __name__ == "__main__":
+    print("Running airport daily rollup tests...")
+    print()
+    
+    try:
+        test_rollup_matches_raw()
+        test_raw_fallback()
+        test_empty_rolled_up_day()
+        test_late_commit_rescanned()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
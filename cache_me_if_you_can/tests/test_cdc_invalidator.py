@@ -0,0 +1,146 @@
+"""
+Unit tests for CDC-driven cache invalidation.
+
+Replays recorded binlog events (samples/cdc_binlog_events.jsonl) against a
+local Valkey instance, so no MySQL replica is needed.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from daos.cdc_invalidator import CDCInvalidator
+from daos.cache_aside import CacheAside
+
+EVENTS_FILE = str(Path(__file__).parent.parent / "samples" / "cdc_binlog_events.jsonl")
+
+
+def test_map_row():
+    """Test that row images map to the expected cache keys."""
+    keys, flight_ids = CDCInvalidator.map_row(
+        "booking",
+        {
+            "before": {"flight_id": 115, "passenger_id": 1000},
+            "after": {"flight_id": 116, "passenger_id": 1000},
+        }
+    )
+    
+    assert keys == {"bookings:1000"}, "Should cover the passenger's bookings"
+    assert flight_ids == set(), "Booking changes should not touch flight records"
+    
+    keys, flight_ids = CDCInvalidator.map_row("flight", {"before": None, "after": {"flight_id": 115}})
+    assert flight_ids == {115}, "Flight changes should target the flight record"
+    assert keys == set(), "Flight changes have no other per-id keys"
+    
+    keys, flight_ids = CDCInvalidator.map_row(
+        "passengerdetails", {"before": {"passenger_id": 1000}, "after": {"passenger_id": 1000}}
+    )
+    assert keys == set() and flight_ids == set(), "Details are only cached through tagged queries"
+    
+    print("✓ Row mapping test passed")
+
+
+def test_extract_tables():
+    """Test table extraction used for query:* tags."""
+    tables = CacheAside.extract_tables(
+        "SELECT * FROM flughafendb_large.passenger p JOIN `booking` b ON p.passenger_id = b.passenger_id"
+    )
+    assert tables == {"passenger", "booking"}, "Should strip schema and backticks"
+    
+    print("✓ Table extraction test passed")
+
+
+def test_replay_invalidates_keys():
+    """Test that replaying recorded events deletes every affected key."""
+    invalidator = CDCInvalidator(batch_size=2)
+    client = invalidator.cache.client
+    
+    affected = [
+        "flight:115",
+        "bookings:1000",
+        "query:test-cdc-booking",
+    ]
+    unrelated = "flight:999999"
+    
+    for key in affected + [unrelated]:
+        client.set(key, "{}", ex=60)
+    client.sadd(f"{CacheAside.TAG_PREFIX}booking", "query:test-cdc-booking")
+    
+    stats = invalidator.replay(EVENTS_FILE)
+    
+    assert stats["events"] == 5, "Should replay every recorded event"
+    assert stats["batches"] == 3, "Should apply events in batches of batch_size"
+    for key in affected:
+        assert client.get(key) is None, f"{key} should be invalidated"
+    assert client.get(unrelated) is not None, "Unrelated keys should be kept"
+    assert not client.exists(f"{CacheAside.TAG_PREFIX}booking"), "Tag set should be cleared"
+    
+    # Cleanup
+    client.delete(unrelated)
+    invalidator.close()
+    print("✓ Replay invalidation test passed")
+
+
+def test_tagged_queries_invalidated():
+    """Test that only the tag members read are removed with their keys."""
+    invalidator = CDCInvalidator()
+    client = invalidator.cache.client
+    tag_key = f"{CacheAside.TAG_PREFIX}passengerdetails"
+    
+    client.set("query:test-cdc-details", "[]", ex=60)
+    client.sadd(tag_key, "query:test-cdc-details")
+    
+    # A query cached while the batch is being applied keeps its tag
+    original_pipeline = client.pipeline
+    
+    def pipeline(transaction=True):
+        if transaction:
+            client.set("query:test-cdc-details-new", "[]", ex=60)
+            client.sadd(tag_key, "query:test-cdc-details-new")
+        return original_pipeline(transaction=transaction)
+    
+    client.pipeline = pipeline
+    result = invalidator.apply_events([
+        {"table": "passengerdetails", "rows": [{"before": {"passenger_id": 1000}, "after": {"passenger_id": 1000}}]}
+    ])
+    del client.pipeline
+    
+    assert result["keys_invalidated"] == 1
+    assert client.get("query:test-cdc-details") is None, "Tagged query should be invalidated"
+    assert client.smembers(tag_key) == {"query:test-cdc-details-new"}, "Newer tag members are kept"
+    
+    # Cleanup
+    client.delete(tag_key, "query:test-cdc-details-new")
+    invalidator.close()
+    print("✓ Tagged query invalidation test passed")
+
+
+if __name__ == "__main__":
+    print("Running CDC invalidation tests...")
+    print()
+    
+    try:
+        test_map_row()
+        test_extract_tables()
+        test_replay_invalidates_keys()
+        test_tagged_queries_invalidated()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+        
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
+    except Exception as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Error: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,158 @@
+"""
+Tests for the sampling consistency auditor.
+
+These tests require a running Valkey/Redis server (no database access):
+the database side of each batch is replaced by a fixed set of rows.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import time
+from core import get_cache_client
+from daos.consistency_auditor import ConsistencyAuditor
+
+
+PENDING_KEY = "test:flight_updates_pending"
+PENDING_AT_KEY = "test:flight_updates_pending_at"
+FLIGHT_IDS = (990000001, 990000002, 990000003, 990000004)
+
+
+def _flight(flight_id, departure="2015-06-01T08:00:00"):
+    return {
+        "flight_id": flight_id,
+        "flightno": f"TS{flight_id % 1000}",
+        "departure": departure,
+        "arrival": "2015-06-01T10:00:00",
+        "airline_id": 1,
+        "airplane_id": 1,
+        "from_airport": "JFK",
+        "to_airport": "LAX",
+        "airlinename": "Test Air",
+    }
+
+
+def _auditor(cache, db_flights, **kwargs):
+    dao = SimpleNamespace(
+        db_engine=None, cache=cache, default_ttl=60, PENDING_KEY=PENDING_KEY, PENDING_AT_KEY=PENDING_AT_KEY
+    )
+    auditor = ConsistencyAuditor(dao, sample_rate=1.0, max_db_qps=0, **kwargs)
+    auditor.KEY_PATTERN = "flight:99000000*"
+    auditor._fetch_db_flights = lambda flight_ids: {
+        flight_id: db_flights[flight_id] for flight_id in flight_ids if flight_id in db_flights
+    }
+    return auditor
+
+
+def _cleanup(cache):
+    cache.client.delete(PENDING_KEY, PENDING_AT_KEY, *(f"flight:{flight_id}" for flight_id in FLIGHT_IDS))
+
+
+def test_divergence_and_repair():
+    """Test that divergent and orphaned entries are reported and deleted."""
+    cache = get_cache_client()
+    _cleanup(cache)
+    
+    matching, divergent, orphaned, _ = FLIGHT_IDS
+    for flight_id in (matching, divergent, orphaned):
+        cache.set(f"flight:{flight_id}", json.dumps(_flight(flight_id)), 60)
+    db_flights = {
+        matching: _flight(matching),
+        divergent: _flight(divergent, departure="2015-06-01T09:30:00"),
+    }
+    
+    report = _auditor(cache, db_flights, repair=True).run_once()
+    assert report["checked"] == 3 and report["divergent"] == 2
+    assert report["missing_in_db"] == 1
+    assert report["repaired"] == 2
+    assert cache.get(f"flight:{matching}") is not None, "Matching entries are kept"
+    assert cache.get(f"flight:{divergent}") is None, "Divergent entries are deleted"
+    assert cache.get(f"flight:{orphaned}") is None, "Orphaned entries are deleted"
+    
+    _cleanup(cache)
+    cache.close()
+    print("✓ Divergence and repair test passed")
+
+
+def test_pending_flights_skipped():
+    """Test that flights with uncommitted write-behind updates are not divergent."""
+    cache = get_cache_client()
+    _cleanup(cache)
+    
+    flight_id = FLIGHT_IDS[0]
+    cache.set(f"flight:{flight_id}", json.dumps(_flight(flight_id, departure="2015-06-02T08:00:00")), 60)
+    
+    # Popped from the queue but not committed yet: only the pending hash knows
+    cache.client.hincrby(PENDING_KEY, flight_id, 1)
+    cache.client.hset(PENDING_AT_KEY, flight_id, int(time.time()))
+    report = _auditor(cache, {flight_id: _flight(flight_id)}, repair=True).run_once()
+    assert report["pending"] == 1 and report["divergent"] == 0
+    assert cache.get(f"flight:{flight_id}") is not None
+    
+    # The worker died: past max_pending_age the count no longer hides drift
+    cache.client.hset(PENDING_AT_KEY, flight_id, int(time.time()) - 600)
+    report = _auditor(cache, {flight_id: _flight(flight_id)}, max_pending_age=300).run_once()
+    assert report["pending"] == 0 and report["stale_pending"] == 1 and report["divergent"] == 1
+    
+    # Committed: the entry is compared again
+    cache.client.hdel(PENDING_KEY, flight_id)
+    report = _auditor(cache, {flight_id: _flight(flight_id)}).run_once()
+    assert report["pending"] == 0 and report["divergent"] == 1
+    
+    _cleanup(cache)
+    cache.close()
+    print("✓ Pending flights test passed")
+
+
+def test_repair_keeps_newer_writes():
+    """Test that an entry rewritten during the audit is not deleted."""
+    cache = get_cache_client()
+    _cleanup(cache)
+    
+    flight_id = FLIGHT_IDS[0]
+    key = f"flight:{flight_id}"
+    cache.set(key, json.dumps(_flight(flight_id)), 60)
+    newer = json.dumps(_flight(flight_id, departure="2015-06-01T11:00:00"))
+    
+    auditor = _auditor(cache, {}, repair=True)
+    
+    def fetch_and_rewrite(flight_ids):
+        # A write-through update lands between the MGET and the repair
+        cache.set(key, newer, 60)
+        return {flight_id: _flight(flight_id, departure="2015-06-01T11:00:00")}
+    
+    auditor._fetch_db_flights = fetch_and_rewrite
+    report = auditor.run_once()
+    assert report["divergent"] == 1 and report["repaired"] == 0
+    assert cache.get(key) == newer, "The newer value survives the repair"
+    
+    _cleanup(cache)
+    cache.close()
+    print("✓ Compare-and-delete repair test passed")
+
+
+if __name__ == "__main__":
+    print("Running consistency auditor tests...")
+    print()
+    
+    try:
+        test_divergence_and_repair()
+        test_pending_flights_skipped()
+        test_repair_keeps_newer_writes()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Tests for the token-based distributed lock with fencing tokens.
+
+These tests require a running Valkey/Redis server.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import get_cache_client, DistributedLock, LockMetrics
+
+
+RESOURCE = "test:distributed-lock"
+
+
+def _cleanup(client):
+    client.delete(RESOURCE, f"lock:{RESOURCE}", f"lock:{RESOURCE}:fence")
+
+
+def test_token_release():
+    """Test that only the holder's token can release the lock."""
+    cache = get_cache_client()
+    _cleanup(cache.client)
+    
+    holder = DistributedLock(cache.client, RESOURCE, ttl_ms=5000)
+    other = DistributedLock(cache.client, RESOURCE, ttl_ms=5000)
+    assert holder.acquire(), "First acquisition should succeed"
+    assert not other.acquire(), "Lock is already held"
+    assert not other.release(), "A non-holder cannot release"
+    assert cache.client.get(f"lock:{RESOURCE}") == holder.token, "The holder's lock survives"
+    
+    # An expired holder must not delete the next holder's lock
+    cache.client.delete(f"lock:{RESOURCE}")
+    assert other.acquire()
+    assert not holder.release(), "Expired holder's release is a no-op"
+    assert cache.client.get(f"lock:{RESOURCE}") == other.token
+    assert other.release()
+    assert cache.client.get(f"lock:{RESOURCE}") is None
+    
+    _cleanup(cache.client)
+    cache.close()
+    print("✓ Token release test passed")
+
+
+def test_extend():
+    """Test lease extension while held and refusal once lost."""
+    cache = get_cache_client()
+    _cleanup(cache.client)
+    metrics = LockMetrics()
+    
+    lock = DistributedLock(cache.client, RESOURCE, ttl_ms=200, metrics=metrics)
+    assert lock.acquire()
+    assert lock.extend(5000), "Holder can extend"
+    time.sleep(0.3)
+    assert cache.client.pttl(f"lock:{RESOURCE}") > 4000, "Lease was reset to the new TTL"
+    
+    cache.client.delete(f"lock:{RESOURCE}")
+    assert not lock.extend(), "A lost lock cannot be extended"
+    assert metrics.snapshot()["extended"] == 1
+    
+    lock.release()
+    _cleanup(cache.client)
+    cache.close()
+    print("✓ Lease extension test passed")
+
+
+def test_fencing_tokens():
+    """Test monotonic fencing tokens, the fence counter TTL and fenced writes."""
+    cache = get_cache_client()
+    _cleanup(cache.client)
+    metrics = LockMetrics()
+    
+    tokens = []
+    for _ in range(3):
+        lock = DistributedLock(cache.client, RESOURCE, ttl_ms=5000, metrics=metrics)
+        assert lock.acquire()
+        tokens.append(lock.fencing_token)
+        lock.release()
+    assert tokens == sorted(set(tokens)), "Fencing tokens strictly increase"
+    assert cache.client.pttl(f"lock:{RESOURCE}:fence") > 0, "Fence counter expires"
+    
+    # A stalled holder is superseded by a newer one
+    stalled = DistributedLock(cache.client, RESOURCE, ttl_ms=5000, metrics=metrics)
+    assert stalled.acquire()
+    cache.client.delete(f"lock:{RESOURCE}")
+    newer = DistributedLock(cache.client, RESOURCE, ttl_ms=5000, metrics=metrics)
+    assert newer.acquire()
+    assert newer.fencing_token > stalled.fencing_token
+    
+    assert newer.fenced_set(RESOURCE, "newer", ttl_ms=5000)
+    assert not stalled.fenced_set(RESOURCE, "stale", ttl_ms=5000), "Older token is rejected"
+    assert cache.client.get(RESOURCE) == "newer"
+    assert 0 < cache.client.pttl(RESOURCE) <= 5000
+    assert metrics.snapshot()["fenced"] == 1
+    
+    never_acquired = DistributedLock(cache.client, RESOURCE, metrics=metrics)
+    assert not never_acquired.fenced_set(RESOURCE, "other"), "No token, no write"
+    
+    newer.release()
+    _cleanup(cache.client)
+    cache.close()
+    print("✓ Fencing token test passed")
+
+
+if __name__ == "__main__":
+    print("Running distributed lock tests...")
+    print()
+    
+    try:
+        test_token_release()
+        test_extend()
+        test_fencing_tokens()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,142 @@
+"""
+Tests for the micro-batching embedding server.
+
+These tests use a fake encoder and need no Valkey or database.
+"""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from core.embedding_batcher import EmbeddingBatcher
+
+
+def _encode(texts):
+    return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+
+def test_batches_and_results():
+    """Test that concurrent texts are batched and each caller gets its own row."""
+    sizes = []
+    
+    def encode(texts):
+        sizes.append(len(texts))
+        return _encode(texts)
+    
+    texts = [f"prompt {'x' * i}" for i in range(64)]
+    with EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=20) as batcher:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            vectors = list(pool.map(batcher.embed, texts))
+        stats = batcher.get_stats()
+    
+    assert all(vector[0] == len(text) for vector, text in zip(vectors, texts))
+    assert max(sizes) <= 8, "Batches never exceed max_batch_size"
+    assert len(sizes) < len(texts), "Concurrent texts share batches"
+    assert stats["items"] == 64 and stats["batches"] == len(sizes) and stats["errors"] == 0
+    print("✓ Batching test passed")
+
+
+def test_encoder_errors():
+    """Test that encoder exceptions and short results fail every caller in the batch."""
+    def failing(texts):
+        raise RuntimeError("model unavailable")
+    
+    with EmbeddingBatcher(failing, max_batch_size=4, max_wait_ms=20) as batcher:
+        futures = [batcher.submit(f"text {i}") for i in range(4)]
+        for future in futures:
+            assert isinstance(future.exception(timeout=5), RuntimeError)
+    
+    # One vector short: no caller may wait forever or get a neighbour's row
+    with EmbeddingBatcher(lambda texts: _encode(texts)[:-1], max_batch_size=4, max_wait_ms=20) as batcher:
+        futures = [batcher.submit(f"text {i}") for i in range(4)]
+        for future in futures:
+            assert isinstance(future.exception(timeout=5), ValueError)
+        assert batcher.get_stats()["errors"] >= 1
+    
+    print("✓ Encoder error test passed")
+
+
+def test_submit_after_stop():
+    """Test that texts are rejected once the worker has stopped."""
+    batcher = EmbeddingBatcher(_encode)
+    try:
+        batcher.submit("before start")
+        assert False, "submit() before start() raises"
+    except RuntimeError:
+        pass
+    
+    batcher.start()
+    future = batcher.submit("queued before stop")
+    batcher.stop(timeout=5)
+    assert future.result(timeout=1)[0] == len("queued before stop"), "Queued texts are flushed on stop"
+    
+    try:
+        batcher.submit("after stop")
+        assert False, "submit() after stop() raises"
+    except RuntimeError:
+        pass
+    
+    # The worker exits on its own (stop() not called yet): _thread is still set
+    batcher.start()
+    thread = batcher._thread
+    batcher._stop_event.set()
+    thread.join(5)
+    assert batcher._thread is not None
+    try:
+        batcher.submit("after worker exit")
+        assert False, "submit() after the worker exited raises"
+    except RuntimeError:
+        pass
+    batcher.stop()
+    
+    print("✓ Submit after stop test passed")
+
+
+def test_cancelled_skipped():
+    """Test that cancelled futures are not encoded."""
+    encoded = []
+    release = threading.Event()
+    
+    def encode(texts):
+        release.wait(5)
+        encoded.extend(texts)
+        return _encode(texts)
+    
+    with EmbeddingBatcher(encode, max_batch_size=1, max_wait_ms=0) as batcher:
+        first = batcher.submit("first")
+        second = batcher.submit("second")
+        # "first" holds the worker in encode(); "second" is still queued
+        assert second.cancel()
+        release.set()
+        first.result(timeout=5)
+    
+    assert encoded == ["first"]
+    print("✓ Cancelled future test passed")
+
+
+if __name__ == "__main__":
+    print("Running embedding batcher tests...")
+    print()
+    
+    try:
+        test_batches_and_results()
+        test_encoder_errors()
+        test_submit_after_stop()
+        test_cancelled_skipped()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
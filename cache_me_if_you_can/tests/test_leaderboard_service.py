@@ -0,0 +1,193 @@
+"""
+Tests for the incrementally maintained airport leaderboards.
+
+These tests require a running Valkey/Redis server (no database access:
+reconciliation reads stubbed AirportLeaderboard rows).
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import get_cache_client
+from daos.leaderboard_service import LeaderboardService
+
+
+TEST_DAY = "1999-01-01"
+
+
+def _cleanup(cache, service):
+    for kind in (service.FLIGHTS, service.PASSENGERS):
+        cache.delete(service.key(kind, TEST_DAY))
+    cache.delete(service.details_key(TEST_DAY))
+
+
+def test_incremental_updates():
+    """Test ZINCRBY updates for flights and bookings, ranks and zero-count pruning."""
+    cache = get_cache_client()
+    service = LeaderboardService(client=cache.client)
+    _cleanup(cache, service)
+    
+    departure = datetime(1999, 1, 1, 8, 30)
+    service.record_flight("JFK", "LAX", departure)
+    service.record_flight("JFK", "SFO", departure)
+    service.record_booking("JFK", "LAX", departure)
+    
+    top = service.get_top(service.FLIGHTS, TEST_DAY)
+    assert top[0] == {"rank": 1, "iata": "JFK", "score": 2}, "JFK counts both departures"
+    assert {row["iata"] for row in top} == {"JFK", "LAX", "SFO"}
+    assert service.get_rank(service.PASSENGERS, TEST_DAY, "lax")["score"] == 1
+    
+    # Removing a flight drops airports whose count reaches zero
+    service.record_flight("JFK", "SFO", departure, delta=-1)
+    assert service.get_rank(service.FLIGHTS, TEST_DAY, "SFO") is None
+    assert service.get_rank(service.FLIGHTS, TEST_DAY, "JFK")["score"] == 1
+    
+    # Flights without an IATA code are not ranked
+    service.record_flight(None, "LAX", departure)
+    assert len(service.get_top(service.FLIGHTS, TEST_DAY)) == 2
+    
+    _cleanup(cache, service)
+    cache.close()
+    print("✓ Incremental leaderboard updates test passed")
+
+
+def test_snapshot_details():
+    """Test compact IATA members with the per-day details hash."""
+    cache = get_cache_client()
+    service = LeaderboardService(client=cache.client)
+    _cleanup(cache, service)
+    
+    service.publish_snapshot(
+        TEST_DAY,
+        [
+            {"iata": "JFK", "name": "John F Kennedy Intl", "departures": 3, "arrivals": 2, "total_flights": 5},
+            {"iata": "LAX", "name": "Los Angeles Intl", "departures": 1, "arrivals": 1, "total_flights": 2},
+        ],
+        [
+            {"iata": "LAX", "name": "Los Angeles Intl", "departing_passengers": 40,
+             "arriving_passengers": 10, "total_passengers": 50, "total_flights": 2},
+        ]
+    )
+    
+    top = service.get_top_with_details(service.FLIGHTS, TEST_DAY)
+    assert [row["iata"] for row in top] == ["JFK", "LAX"], "Members are bare IATA codes"
+    assert top[0]["name"] == "John F Kennedy Intl" and top[0]["score"] == 5
+    assert "departures" not in top[0], "Counts live in the sorted sets only"
+    
+    lax = service.get_airport(service.PASSENGERS, TEST_DAY, "lax")
+    assert lax["rank"] == 1 and lax["score"] == 50 and lax["name"] == "Los Angeles Intl"
+    assert service.get_airport(service.PASSENGERS, TEST_DAY, "JFK") is None
+    assert service.get_top_with_details(service.FLIGHTS, "1999-01-02") == []
+    
+    _cleanup(cache, service)
+    cache.close()
+    print("✓ Snapshot details test passed")
+
+
+def test_reconcile_details():
+    """Test that reconcile() rebuilds the details hash next to the scores."""
+    cache = get_cache_client()
+    service = LeaderboardService(client=cache.client)
+    _cleanup(cache, service)
+    
+    jfk = {"iata": "JFK", "name": "John F Kennedy Intl", "departures": 1, "arrivals": 0, "total_flights": 1}
+    service.publish_snapshot(TEST_DAY, [jfk], [])
+    
+    # SFO is first ranked by an increment: no name until reconciliation
+    departure = datetime(1999, 1, 1, 8, 30)
+    service.record_flight("JFK", "SFO", departure)
+    service.record_booking("JFK", "SFO", departure)
+    assert "name" not in service.get_airport(service.FLIGHTS, TEST_DAY, "SFO")
+    
+    flights = [
+        {**jfk, "departures": 2, "total_flights": 2},
+        {"iata": "SFO", "name": "San Francisco Intl", "departures": 0, "arrivals": 1, "total_flights": 1},
+    ]
+    passengers = [
+        {"iata": "JFK", "name": "John F Kennedy Intl", "departing_passengers": 1,
+         "arriving_passengers": 0, "total_passengers": 1, "total_flights": 1},
+    ]
+    service._leaderboard = SimpleNamespace(
+        get_top_airports_by_flights=lambda day, limit: flights,
+        get_top_airports_by_passengers=lambda day, limit: passengers,
+        close=lambda: None
+    )
+    report = service.reconcile(TEST_DAY)
+    assert report[service.FLIGHTS]["drifted"] == 0, "Increments matched SQL"
+    assert report[service.PASSENGERS]["drifted"] == 1, "SFO's booking was not in SQL"
+    
+    for kind, rows, total in ((service.FLIGHTS, flights, "total_flights"),
+                              (service.PASSENGERS, passengers, "total_passengers")):
+        top = service.get_top_with_details(kind, TEST_DAY)
+        assert {row["iata"]: (row["name"], row["score"]) for row in top} == \
+            {row["iata"]: (row["name"], row[total]) for row in rows}, "Details agree with the scores"
+    assert service.get_rank(service.PASSENGERS, TEST_DAY, "SFO") is None
+    
+    _cleanup(cache, service)
+    cache.close()
+    print("✓ Reconcile details test passed")
+
+
+def test_period_unions():
+    """Test rolling unions built in full, extended by a day and slid by a day."""
+    cache = get_cache_client()
+    service = LeaderboardService(client=cache.client)
+    days = ["1999-02-01", "1999-02-02", "1999-02-03"]
+    
+    def cleanup():
+        cache.client.delete(*[service.key(service.FLIGHTS, day) for day in days])
+        for key in cache.client.scan_iter("leaderboard:flights:range:1999-*"):
+            cache.client.delete(key)
+    
+    cleanup()
+    for day, airports in zip(days, [("JFK", "LAX"), ("JFK", "SFO"), ("SFO", "LAX")]):
+        service.record_flight(*airports, day)
+    
+    top = service.get_range_top(service.FLIGHTS, days[0], days[1])
+    assert top[0] == {"rank": 1, "iata": "JFK", "score": 2}
+    assert service.build_stats["full"] == 1
+    
+    # [02-01, 02-03] extends the cached [02-01, 02-02] by one day
+    top = {row["iata"]: row["score"] for row in service.get_range_top(service.FLIGHTS, days[0], days[2])}
+    assert top == {"JFK": 2, "LAX": 2, "SFO": 2}
+    assert service.build_stats["extended"] == 1
+    
+    # [02-02, 02-04] slides the cached [02-01, 02-03]: JFK/LAX from 02-01 drop out
+    rolling = service.get_rolling_top(service.FLIGHTS, 3, "1999-02-04")
+    assert {row["iata"]: row["score"] for row in rolling} == {"SFO": 2, "JFK": 1, "LAX": 1}
+    assert service.build_stats["slid"] == 1
+    
+    trend = service.get_rank_trend(service.FLIGHTS, "jfk", periods=3, end_day=days[2])
+    assert [point["score"] for point in trend] == [1, 1, None]
+    
+    cleanup()
+    cache.close()
+    print("✓ Period union test passed")
+
+
+if __name__ == "__main__":
+    print("Running leaderboard service tests...")
+    print()
+    
+    try:
+        test_incremental_updates()
+        test_snapshot_details()
+        test_reconcile_details()
+        test_period_unions()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,142 @@
+"""
+Tests for the shared rate limiter, circuit breaker and stale fallback.
+
+The rate limiter and stale fallback tests require a running Valkey/Redis server.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import get_cache_client, RateLimiter, CircuitBreaker, CircuitOpenError
+from daos.weather_api_cache import WeatherAPICache
+
+
+def test_circuit_breaker_transitions():
+    """Test CLOSED -> OPEN -> HALF_OPEN -> CLOSED and short-circuit counting."""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.2)
+    
+    def failing():
+        raise ConnectionError("down")
+    
+    for _ in range(2):
+        try:
+            breaker.call(failing)
+        except ConnectionError:
+            pass
+    assert breaker.state == CircuitBreaker.OPEN, "Should open after threshold failures"
+    
+    try:
+        breaker.call(lambda: "ok")
+        assert False, "Call should be short-circuited while OPEN"
+    except CircuitOpenError:
+        pass
+    assert breaker.get_stats()["short_circuited"] == 1
+    
+    time.sleep(0.25)
+    assert breaker.call(lambda: "ok") == "ok", "Trial call should go through after recovery timeout"
+    assert breaker.state == CircuitBreaker.CLOSED, "Successful trial should close the breaker"
+    print("✓ Circuit breaker transitions test passed")
+
+
+def test_rate_limiter_shared_budget():
+    """Test that two limiters with the same name share one bucket."""
+    cache = get_cache_client()
+    cache.delete("ratelimit:test-shared")
+    
+    first = RateLimiter(cache.client, "test-shared", rate=1, capacity=3)
+    second = RateLimiter(cache.client, "test-shared", rate=1, capacity=3)
+    
+    results = [first.acquire(), second.acquire(), first.acquire(), second.acquire()]
+    assert results.count(True) == 3, "Burst capacity should be shared across limiters"
+    assert first.get_stats()["allowed"] + second.get_stats()["allowed"] == 3
+    assert second.get_stats()["throttled"] == 1
+    
+    cache.delete("ratelimit:test-shared")
+    cache.close()
+    print("✓ Shared rate limiter test passed")
+
+
+def test_stale_served_when_open():
+    """Test that an open breaker serves the stale copy instead of calling upstream."""
+    breaker = CircuitBreaker("test-weather", failure_threshold=1, recovery_timeout=60)
+    cache = WeatherAPICache(verbose=False, circuit_breaker=breaker)
+    
+    key = cache.weather_key("XX", "99999")
+    cache.delete(key)
+    cache.delete(f"{cache.STALE_PREFIX}{key}")
+    
+    # Populate fresh + stale copies, then expire the fresh one
+    assert cache.get_weather("XX", "99999", fetcher=lambda c, z: {"temp": 20}, ttl=60) == {"temp": 20}
+    cache.delete(key)
+    
+    def failing(country, zip_code):
+        raise ConnectionError("upstream down")
+    
+    assert cache.get_weather("XX", "99999", fetcher=failing) == {"temp": 20}, "Failure should serve stale"
+    assert breaker.state == CircuitBreaker.OPEN
+    assert cache.get_weather("XX", "99999", fetcher=failing) == {"temp": 20}, "Open breaker should serve stale"
+    
+    stats = cache.get_upstream_stats()
+    assert stats["short_circuited"] == 1 and stats["stale_served"] == 2
+    
+    cache.delete(f"{cache.STALE_PREFIX}{key}")
+    cache.close()
+    print("✓ Stale fallback test passed")
+
+
+def test_limiter_error_serves_stale():
+    """Test that a failing rate limiter serves stale and returns the breaker's trial slot."""
+    class BrokenLimiter:
+        def acquire(self, timeout=None):
+            raise ConnectionError("limiter unreachable")
+    
+    breaker = CircuitBreaker("test-weather-limiter", failure_threshold=1, recovery_timeout=0.05)
+    cache = WeatherAPICache(verbose=False, circuit_breaker=breaker)
+    
+    key = cache.weather_key("XX", "99998")
+    cache.delete(key)
+    assert cache.get_weather("XX", "99998", fetcher=lambda c, z: {"temp": 21}, ttl=60) == {"temp": 21}
+    cache.delete(key)
+    
+    # Open the breaker, then wait until it grants a half-open trial
+    breaker.record_failure()
+    time.sleep(0.1)
+    cache.rate_limiter = BrokenLimiter()
+    
+    calls = []
+    value = cache.get_weather("XX", "99998", fetcher=lambda c, z: calls.append(z) or {"temp": 22})
+    assert value == {"temp": 21}, "Limiter failure should serve stale"
+    assert calls == [], "Upstream must not be called without a token"
+    assert cache.upstream_errors == 1
+    assert breaker.allow_request(), "The half-open trial slot should have been given back"
+    
+    cache.delete(f"{cache.STALE_PREFIX}{key}")
+    cache.close()
+    print("✓ Rate limiter failure test passed")
+
+
+if __name__ == "__main__":
+    print("Running resilience tests...")
+    print()
+    
+    try:
+        test_circuit_breaker_transitions()
+        test_rate_limiter_shared_budget()
+        test_stale_served_when_open()
+        test_limiter_error_serves_stale()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,204 @@
+"""
+Tests for the semantic cache capacity bookkeeping: aliases, eviction, expiry
+and the budget loop, and for the scoping of entry keys.
+
+These tests require a running Valkey server (VECTOR_HOST/VECTOR_PORT) but no
+LLM or embedding model: entries are written directly with the same
+bookkeeping as get_or_generate_sql(), or generated by a stub converter.
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from daos.semantic_cache import SemanticSQLCache, BYTES_KEY, LRU_KEY, SIZE_KEY, EXPIRY_KEY
+
+
+SQL_HASHES = ("test0sql0001", "test0sql0002", "test0sql0003")
+
+
+def _cache(entry_ttl=60, **kwargs):
+    cache = SemanticSQLCache(janitor_interval=0, entry_ttl=entry_ttl, max_entries=0, max_bytes=0, **kwargs)
+    removed = []
+    # Record what leaves the local index instead of loading the embedding model
+    cache._semantic_search = SimpleNamespace(unindex_embedding=lambda prefix, key: removed.append(key))
+    return cache, removed
+
+
+def _write_entry(cache, sql_hash, entry_bytes=100):
+    """Write one entry: result, semantic mapping, embedding and bookkeeping."""
+    query_key = f"db:query:{sql_hash}"
+    semantic_key = f"semantic:prompt:{sql_hash}"
+    embedding_key = f"embedding:prompt:{sql_hash}"
+    ttl = cache.entry_ttl or None
+    pipe = cache.valkey_client.pipeline(transaction=True)
+    pipe.set(query_key, json.dumps({"sql": "SELECT 1"}), ex=ttl)
+    pipe.set(semantic_key, query_key, ex=ttl)
+    pipe.hset(embedding_key, mapping={"prompt": sql_hash, "query_key": query_key, "embedding": b"\0" * 16})
+    if ttl:
+        pipe.expire(embedding_key, ttl)
+    cache._register_entry(pipe, sql_hash, [embedding_key, semantic_key], entry_bytes)
+    pipe.execute()
+    return query_key, semantic_key, embedding_key
+
+
+def _tracked_bytes(cache):
+    return int(cache.valkey_client.get(BYTES_KEY) or 0)
+
+
+def _cleanup(cache):
+    cache.evict(list(SQL_HASHES))
+    cache.valkey_client.delete(*(f"semantic:prompt:{sql_hash}:alias" for sql_hash in SQL_HASHES))
+
+
+def test_alias_and_evict():
+    """Test that aliases count their bytes once and eviction removes everything."""
+    cache, removed = _cache()
+    _cleanup(cache)
+    client = cache.valkey_client
+    baseline = _tracked_bytes(cache)
+    
+    query_key, semantic_key, embedding_key = _write_entry(cache, SQL_HASHES[0])
+    alias_key = f"{semantic_key}:alias"
+    assert cache._add_alias(alias_key, query_key)
+    assert not cache._add_alias(alias_key, query_key), "An existing mapping is not counted twice"
+    assert _tracked_bytes(cache) == baseline + 100 + len(alias_key) + len(query_key)
+    assert 0 < client.pttl(alias_key) <= 60000, "Aliases expire with their entry"
+    
+    assert cache.evict([SQL_HASHES[0]]) == 1
+    assert client.exists(query_key, semantic_key, embedding_key, alias_key) == 0
+    assert client.zscore(LRU_KEY, SQL_HASHES[0]) is None and client.zscore(SIZE_KEY, SQL_HASHES[0]) is None
+    assert _tracked_bytes(cache) == baseline
+    assert removed == [embedding_key], "Evicted embeddings leave the local index"
+    
+    print("✓ Alias and eviction test passed")
+
+
+def test_alias_of_expired_entry():
+    """Test that no mapping or bookkeeping is added for an entry that is gone."""
+    cache, _ = _cache()
+    _cleanup(cache)
+    client = cache.valkey_client
+    baseline = _tracked_bytes(cache)
+    
+    alias_key = f"semantic:prompt:{SQL_HASHES[1]}:alias"
+    assert not cache._add_alias(alias_key, f"db:query:{SQL_HASHES[1]}")
+    assert client.exists(alias_key, f"semantic:entry:{SQL_HASHES[1]}") == 0
+    assert client.zscore(SIZE_KEY, SQL_HASHES[1]) is None
+    assert _tracked_bytes(cache) == baseline
+    
+    print("✓ Alias of expired entry test passed")
+
+
+def test_expired_entry_unindexed():
+    """Test that the janitor unindexes embeddings that expired before eviction."""
+    cache, removed = _cache(entry_ttl=1)
+    _cleanup(cache)
+    client = cache.valkey_client
+    
+    _, _, embedding_key = _write_entry(cache, SQL_HASHES[2])
+    time.sleep(1.5)
+    assert client.exists(embedding_key) == 0, "The embedding has expired"
+    
+    report = cache.enforce_budget()
+    assert report["expired"] >= 1
+    assert embedding_key in removed, "Expired embeddings still leave the local index"
+    assert client.zscore(EXPIRY_KEY, SQL_HASHES[2]) is None and client.zscore(SIZE_KEY, SQL_HASHES[2]) is None
+    assert client.exists(f"semantic:entry:{SQL_HASHES[2]}") == 0
+    
+    print("✓ Expired entry test passed")
+
+
+def test_budget_loop():
+    """Test that the least recently hit entries are evicted down to max_entries."""
+    cache, _ = _cache()
+    _cleanup(cache)
+    client = cache.valkey_client
+    
+    for position, sql_hash in enumerate(SQL_HASHES, 1):
+        _write_entry(cache, sql_hash)
+        # Older than any real entry (scores are unix times)
+        client.zadd(LRU_KEY, {sql_hash: position})
+    
+    cache.max_entries = client.zcard(LRU_KEY) - 2
+    report = cache.enforce_budget(batch_size=1)
+    assert report["evicted"] == 2, "One victim per batch until within budget"
+    assert client.exists(f"db:query:{SQL_HASHES[0]}", f"db:query:{SQL_HASHES[1]}") == 0
+    assert client.exists(f"db:query:{SQL_HASHES[2]}") == 1, "The most recently hit entry is kept"
+    assert report["entries"] == cache.max_entries
+    
+    _cleanup(cache)
+    print("✓ Budget loop test passed")
+
+
+def test_scopes_do_not_collide():
+    """Test that two tenants caching the same prompt and SQL both keep hitting."""
+    prompt = "test scoped prompt: flights leaving today"
+    generated = []
+    caches = []
+    for tenant in ("test-acme", "test-globex"):
+        cache, _ = _cache(tenant=tenant)
+        cache._semantic_search = SimpleNamespace(
+            unindex_embedding=lambda prefix, key: None,
+            index_embedding=lambda prefix, key, embedding, fields: None,
+            vector_bytes=lambda embedding: embedding.tobytes(),
+            vector_type="FLOAT32"
+        )
+        cache._generate_embedding = lambda text: np.zeros(4, dtype=np.float32)
+        cache._search_similar_prompts = lambda embedding, k=5: []
+        cache.nlp_converter = SimpleNamespace(
+            model="test-model",
+            generate_sql=lambda text: generated.append(text) or {"sql": "SELECT 1", "tokens": 0}
+        )
+        cache.evict([cache._scoped_hash("SELECT 1")])
+        caches.append(cache)
+    
+    acme, globex = caches
+    assert acme._scoped_hash(prompt) != globex._scoped_hash(prompt)
+    assert acme._scoped_hash("SELECT 1") != globex._scoped_hash("SELECT 1")
+    
+    for cache in caches:
+        assert not cache.get_or_generate_sql(prompt, verbose=False)["cache_hit"]
+    assert len(generated) == 2, "Another tenant's entry is not reused"
+    
+    for _ in range(2):
+        for cache in caches:
+            result = cache.get_or_generate_sql(prompt, verbose=False)
+            assert result["cache_hit"] and result["cache_type"] == "exact", \
+                f"{cache.tenant} still hits after the other tenant cached the prompt"
+            assert result["tenant"] == cache.tenant
+    assert len(generated) == 2
+    
+    for cache in caches:
+        assert cache.evict([cache._scoped_hash("SELECT 1")]) == 1
+    print("✓ Scoped keys test passed")
+
+
+if __name__ == "__main__":
+    print("Running semantic cache tests...")
+    print()
+    
+    try:
+        test_alias_and_evict()
+        test_alias_of_expired_entry()
+        test_expired_entry_unindexed()
+        test_budget_loop()
+        test_scopes_do_not_collide()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -0,0 +1,101 @@
+"""
+Tests for the hybrid query filters and index field checks of SemanticSearch.
+
+These tests need no Valkey server or embedding model.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.semantic_search import SemanticSearch
+
+
+def test_escape_tag():
+    """Test that TAG punctuation and spaces are escaped."""
+    assert SemanticSearch.escape_tag("codellama:7b") == "codellama\\:7b"
+    assert SemanticSearch.escape_tag("acme corp") == "acme\\ corp"
+    assert SemanticSearch.escape_tag("v1.2-beta") == "v1\\.2\\-beta"
+    assert SemanticSearch.escape_tag(3) == "3"
+    assert SemanticSearch.escape_tag("plain") == "plain"
+    print("✓ TAG escaping test passed")
+
+
+def test_build_filter():
+    """Test TAG, TAG-any, NUMERIC range and NUMERIC equality clauses."""
+    assert SemanticSearch.build_filter(None) == "*"
+    assert SemanticSearch.build_filter({}) == "*"
+    
+    assert SemanticSearch.build_filter({"model": "codellama:7b"}) == "(@model:{codellama\\:7b})"
+    assert SemanticSearch.build_filter({"tenant": ["acme", "globex"]}) == "(@tenant:{acme | globex})"
+    assert SemanticSearch.build_filter({"tenant": ("acme", "globex")}) == "(@tenant:{acme | globex})", \
+        "A tuple of strings is a TAG list, not a range"
+    assert SemanticSearch.build_filter({"created_at": (100, None)}) == "(@created_at:[100 +inf])"
+    assert SemanticSearch.build_filter({"created_at": (None, 200.5)}) == "(@created_at:[-inf 200.5])"
+    assert SemanticSearch.build_filter({"schema_version": 3}) == "(@schema_version:[3 3])"
+    assert SemanticSearch.build_filter({"model": "llama", "schema_version": 2}) == \
+        "(@model:{llama} @schema_version:[2 2])"
+    print("✓ Filter building test passed")
+
+
+def test_matches_filters():
+    """Test the brute-force evaluation of the same conditions."""
+    fields = {"model": b"codellama:7b", "tenant": "acme", "created_at": "150", "schema_version": "3"}
+    
+    assert SemanticSearch.matches_filters(fields, None)
+    assert SemanticSearch.matches_filters(fields, {"model": "codellama:7b"}), "bytes values are decoded"
+    assert not SemanticSearch.matches_filters(fields, {"model": "llama"})
+    assert SemanticSearch.matches_filters(fields, {"tenant": ["globex", "acme"]})
+    assert not SemanticSearch.matches_filters(fields, {"tenant": ("globex", "initech")})
+    assert SemanticSearch.matches_filters(fields, {"created_at": (100, None)})
+    assert not SemanticSearch.matches_filters(fields, {"created_at": (None, 149)})
+    assert SemanticSearch.matches_filters(fields, {"schema_version": 3})
+    assert not SemanticSearch.matches_filters(fields, {"schema_version": 4})
+    assert not SemanticSearch.matches_filters(fields, {"region": "eu"}), "Missing fields never match"
+    print("✓ Filter matching test passed")
+
+
+def test_index_attributes():
+    """Test reading field names from RESP2 and RESP3 FT.INFO replies."""
+    resp2 = [
+        b"index_name", b"prompt_embeddings",
+        b"attributes", [
+            [b"identifier", b"embedding", b"attribute", b"embedding", b"type", b"VECTOR"],
+            [b"identifier", b"model", b"attribute", b"model", b"type", b"TAG"],
+        ],
+        b"num_docs", 10,
+    ]
+    assert SemanticSearch._index_attributes(resp2) == {"embedding", "model"}
+    
+    resp3 = {
+        "index_name": "prompt_embeddings",
+        "attributes": [{"identifier": "embedding", "type": "VECTOR"}, {"identifier": "tenant", "type": "TAG"}],
+    }
+    assert SemanticSearch._index_attributes(resp3) == {"embedding", "tenant"}
+    assert SemanticSearch._index_attributes([b"index_name", b"x"]) == set(), "No attributes: nothing is reported missing"
+    print("✓ Index attributes test passed")
+
+
+if __name__ == "__main__":
+    print("Running semantic filter tests...")
+    print()
+    
+    try:
+        test_escape_tag()
+        test_build_filter()
+        test_matches_filters()
+        test_index_attributes()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)
@@ -85,6 +85,162 @@ def test_double_check_pattern():
     print("✓ Double-check pattern test passed")
 
 
+def test_wait_for_fill_wakeups():
+    """Test that waiters wake on a fill, and on a release without a fill."""
+    import threading
+    import time
+    
+    cache = WeatherAPICache(verbose=False)
+    key = "test:weather:us:fill"
+    cache.delete(key)
+    
+    # Nobody holds the lock: no point waiting
+    assert cache.wait_for_fill(key, timeout=5) is None
+    
+    def wait_in_thread(outcome):
+        start = time.perf_counter()
+        outcome["value"] = cache.wait_for_fill(key, timeout=10)
+        outcome["elapsed"] = time.perf_counter() - start
+    
+    # The holder fails and releases without filling: the waiter retries early
+    lock = cache.lock(key, timeout=10)
+    assert lock.acquire()
+    outcome = {}
+    waiter = threading.Thread(target=wait_in_thread, args=(outcome,))
+    waiter.start()
+    time.sleep(0.2)
+    lock.release()
+    waiter.join()
+    assert outcome["value"] is None, "Release without a fill wakes with no value"
+    assert outcome["elapsed"] < 10, "Waiter should not wait out the timeout"
+    
+    # The holder fills the key: the waiter gets the published value
+    lock = cache.lock(key, timeout=10)
+    assert lock.acquire()
+    outcome = {}
+    waiter = threading.Thread(target=wait_in_thread, args=(outcome,))
+    waiter.start()
+    time.sleep(0.2)
+    cache.set_and_notify(key, {"temp": 70}, ttl=60, lock=lock)
+    lock.release()
+    waiter.join()
+    assert outcome["value"] == {"temp": 70}, "Fill wakes the waiter with the value"
+    
+    cache.delete(key)
+    cache.close()
+    print("✓ Wait-for-fill wake-up test passed")
+
+
+def test_get_weather_many():
+    """Test batch fetch: MGET, deduplicated misses and concurrent fan-out."""
+    import threading
+    
+    cache = WeatherAPICache(verbose=False)
+    
+    locations = [("XX", "00001"), ("XX", "00002"), ("XX", "00003"), ("XX", "00001")]
+    for country, zip_code in locations:
+        cache.delete(cache.weather_key(country, zip_code))
+    
+    calls = []
+    calls_lock = threading.Lock()
+    
+    # Every fetch waits until all 3 are in flight, so a sequential fan-out
+    # breaks the barrier and shows up as errors (no wall-clock assertion)
+    in_flight = threading.Barrier(3, timeout=5)
+    
+    def slow_fetch(country, zip_code):
+        with calls_lock:
+            calls.append((country, zip_code))
+        in_flight.wait()
+        return {"zip": zip_code}
+    
+    # Cold: 3 distinct misses fetched once each, in parallel
+    results, stats = cache.get_weather_many(locations, fetcher=slow_fetch, ttl=60)
+    
+    assert len(calls) == 3, "Duplicate locations should be fetched once"
+    assert stats["misses"] == 4, "Misses count every input location"
+    assert stats["fetched"] == 3, "Should fetch every distinct miss"
+    assert stats["errors"] == 0, "Misses should be fetched concurrently"
+    assert [r["zip"] for r in results] == ["00001", "00002", "00003", "00001"], "Results keep input order"
+    
+    # Warm: everything served from one MGET
+    results, stats = cache.get_weather_many(locations, fetcher=slow_fetch, ttl=60)
+    assert len(calls) == 3, "Warm batch should not call the fetcher"
+    assert stats["hits"] == 4, "All locations should be cache hits"
+    
+    for country, zip_code in locations:
+        cache.delete(cache.weather_key(country, zip_code))
+    cache.close()
+    print("✓ Batch fetch test passed")
+
+
+def test_geo_proximity_reuse():
+    """Test that geo mode reuses a nearby, recent observation instead of calling upstream."""
+    cache = WeatherAPICache(verbose=False, geo_radius_km=5, geo_max_age=60)
+    
+    near_a, near_b, far = ("XX", "10001"), ("XX", "10002"), ("XX", "20001")
+    for country, zip_code in (near_a, near_b, far):
+        key = cache.weather_key(country, zip_code)
+        cache.delete(key)
+        cache.client.zrem(cache.GEO_KEY, key)
+        cache.client.zrem(cache.GEO_OBSERVED_KEY, key)
+    
+    calls = []
+    
+    def fetch(country, zip_code):
+        calls.append(zip_code)
+        return {"zip": zip_code}
+    
+    assert cache.get_weather(*near_a, fetcher=fetch, coord=(-73.99, 40.75)) == {"zip": "10001"}
+    assert cache.get_weather(*near_b, fetcher=fetch, coord=(-73.98, 40.72)) == {"zip": "10001"}, \
+        "Location 3 km away should reuse the nearby observation"
+    assert cache.get_weather(*far, fetcher=fetch, coord=(-77.03, 38.90)) == {"zip": "20001"}, \
+        "Location outside the radius should call upstream"
+    assert calls == ["10001", "20001"], "Only two upstream calls expected"
+    
+    for country, zip_code in (near_a, far):
+        key = cache.weather_key(country, zip_code)
+        cache.delete(key)
+        cache.client.zrem(cache.GEO_KEY, key)
+        cache.client.zrem(cache.GEO_OBSERVED_KEY, key)
+    cache.close()
+    print("✓ Geo proximity reuse test passed")
+
+
+def test_geo_batch():
+    """Test that batch fetches index fresh observations and reuse nearby ones in geo mode."""
+    cache = WeatherAPICache(verbose=False, geo_radius_km=5, geo_max_age=60)
+    
+    near_a, near_b = ("XX", "10011"), ("XX", "10012")
+    for country, zip_code in (near_a, near_b):
+        key = cache.weather_key(country, zip_code)
+        cache.delete(key)
+        cache.client.zrem(cache.GEO_KEY, key)
+        cache.client.zrem(cache.GEO_OBSERVED_KEY, key)
+    
+    calls = []
+    
+    def fetch(country, zip_code):
+        calls.append(zip_code)
+        return {"zip": zip_code}
+    
+    results, stats = cache.get_weather_many([near_a], fetcher=fetch, coords=[(-73.99, 40.75)])
+    key_a = cache.weather_key(*near_a)
+    assert results == [{"zip": "10011"}] and stats["fetched"] == 1
+    assert cache.client.geopos(cache.GEO_KEY, key_a)[0] is not None, "Batch results are indexed"
+    
+    results, stats = cache.get_weather_many([near_b], fetcher=fetch, coords=[(-73.98, 40.72)])
+    assert results == [{"zip": "10011"}], "Nearby observation should be reused"
+    assert stats["geo_reused"] == 1 and stats["fetched"] == 0
+    assert calls == ["10011"], "Only one upstream call expected"
+    
+    cache.delete(key_a)
+    cache.client.zrem(cache.GEO_KEY, key_a)
+    cache.client.zrem(cache.GEO_OBSERVED_KEY, key_a)
+    cache.close()
+    print("✓ Geo batch test passed")
+
+
 if __name__ == "__main__":
     print("Running stampede prevention tests...")
     print()
@@ -93,6 +249,10 @@ if __name__ == "__main__":
         test_lock_acquisition()
         test_cache_operations()
         test_double_check_pattern()
+        test_wait_for_fill_wakeups()
+        test_get_weather_many()
+        test_geo_proximity_reuse()
+        test_geo_batch()
         
         print()
         print("=" * 50)
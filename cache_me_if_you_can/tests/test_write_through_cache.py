@@ -0,0 +1,114 @@
+"""
+Tests for write-through updates when the cache refresh fails.
+
+These tests require a running Valkey/Redis server and the flughafendb
+database. Flights are "rescheduled" to their current times, so the flight
+table is left unchanged (flight_log receives the audit rows).
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from daos.write_through_cache import WriteThroughCache
+
+
+def _current_flights(cache, limit=2):
+    with cache.db_engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT flight_id, departure, arrival FROM flight ORDER BY flight_id LIMIT :limit"
+        ), {"limit": limit})
+        return [
+            {"flight_id": row.flight_id, "new_departure": row.departure, "new_arrival": row.arrival}
+            for row in rows
+        ]
+
+
+def test_cache_refresh_failure_deletes_entries():
+    """A failed refresh keeps the DB result and drops the stale entries."""
+    cache = WriteThroughCache()
+    updates = _current_flights(cache)
+    keys = [f"flight:{update['flight_id']}" for update in updates]
+    for key in keys:
+        cache.cache.set(key, '{"stale": true}', 60)
+    
+    # Every SET in the refresh fails
+    cache.cache.set_many = lambda items, ttl=None: list(items)
+    results, latency_ms, _ = cache.update_flights_bulk(updates, user="test", comment="write-through test")
+    
+    assert all(results.values()), "Committed flights are reported as updated"
+    assert all(cache.cache.get(key) is None for key in keys), "Stale entries are deleted"
+    assert cache.last_cache_failures == [], "Deleted entries are not failures"
+    assert latency_ms["cache"] > 0
+    
+    cache.close()
+    print("✓ Cache refresh failure test passed")
+
+
+def test_cache_unreachable_reports_failures():
+    """When neither SET nor DEL reaches the cache, the flights are reported."""
+    cache = WriteThroughCache()
+    updates = _current_flights(cache)
+    moves = []
+    cache.leaderboard = type("Leaderboard", (), {"apply_reschedules": lambda self, m: moves.append(m)})()
+    
+    cache.cache.set_many = lambda items, ttl=None: list(items)
+    cache.cache.delete_many = lambda keys: False
+    results, _, _ = cache.update_flights_bulk(updates, user="test", comment="write-through test")
+    
+    assert all(results.values()), "The database update still succeeded"
+    assert cache.last_cache_failures == sorted(update["flight_id"] for update in updates)
+    assert len(moves) == 1 and set(moves[0]) == set(results), "Leaderboards are still updated"
+    
+    cache.close()
+    print("✓ Unreachable cache test passed")
+
+
+def test_single_update_cache_failure():
+    """A single update reports the commit, not the cache refresh."""
+    cache = WriteThroughCache()
+    update = _current_flights(cache, limit=1)[0]
+    key = f"flight:{update['flight_id']}"
+    cache.cache.set(key, '{"stale": true}', 60)
+    
+    cache.cache.set_many = lambda items, ttl=None: list(items)
+    success, _ = cache.update_flight_departure(
+        update["flight_id"], update["new_departure"], update["new_arrival"], user="test", comment="write-through test"
+    )
+    assert success, "The committed update is reported as successful"
+    assert cache.cache.get(key) is None, "The stale entry is deleted"
+    assert cache.last_cache_failures == []
+    
+    cache.cache.delete_many = lambda keys: False
+    success, _ = cache.update_flight_departure(
+        update["flight_id"], update["new_departure"], update["new_arrival"], user="test", comment="write-through test"
+    )
+    assert success and cache.last_cache_failures == [update["flight_id"]]
+    
+    cache.close()
+    print("✓ Single update cache failure test passed")
+
+
+if __name__ == "__main__":
+    print("Running write-through cache tests...")
+    print()
+    
+    try:
+        test_cache_refresh_failure_deletes_entries()
+        test_cache_unreachable_reports_failures()
+        test_single_update_cache_failure()
+        
+        print()
+        print("=" * 50)
+        print("✅ All tests passed!")
+        print("=" * 50)
+    
+    except AssertionError as e:
+        print()
+        print("=" * 50)
+        print(f"❌ Test failed: {e}")
+        print("=" * 50)
+        sys.exit(1)